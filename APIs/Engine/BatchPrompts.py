@@ -0,0 +1,345 @@
+"""
+Prompts por lotes: K modismos por petición con salida en arreglo JSON indexado por id
+Detecta items faltantes, duplicados o cambiados de lugar y reencola sólo esos
+"""
+
+import os
+import sys
+import json
+import random
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from LLMEngine import LLMJob
+from ResponseParser import extract_json, parse_stored, validate_output
+
+
+PROMPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Straico')
+
+# Modismos por petición
+DEFAULT_BATCH_SIZE = 20
+
+# Rondas de reintento por lotes para los items faltantes antes de pasar a un item por petición
+DEFAULT_MAX_ROUNDS = 2
+
+# Campos de entrada y de salida de cada prompt
+PROMPT_FIELDS = {
+    'prompt_1': (('modismo',), ('es_modismo',)),
+    'prompt_2': (('modismo',), ('definicion',)),
+    'prompt_3': (('modismo', 'ejemplo'), ('sinonimo', 'definicion')),
+}
+
+def load_prompts() -> Dict[str, str]:
+    """prompt_N y prompt_N_batch de Straico/prompts.py."""
+    if PROMPTS_DIR not in sys.path:
+        sys.path.insert(0, PROMPTS_DIR)
+    import prompts as p
+
+    return {name: getattr(p, name) for name in dir(p) if name.startswith('prompt_')}
+
+
+def render_single(template: str, row: Dict[str, Any], prompt_name: str) -> str:
+    """Renderiza el prompt de un item igual que los notebooks."""
+    message = template
+    for field in PROMPT_FIELDS[prompt_name][0]:
+        message = message.replace('{{' + field + '}}', str(row.get(field, '')).strip())
+    return message
+
+
+def render_batch(template: str, rows: Sequence[Dict[str, Any]], prompt_name: str) -> str:
+    """
+    Renderiza un prompt por lotes.
+
+    Los ids son la posición dentro del lote (1..K): cortos y fáciles de
+    repetir para el modelo. Cada item va en una línea para no gastar tokens
+    de entrada en indentación.
+    """
+    fields = PROMPT_FIELDS[prompt_name][0]
+    items = [json.dumps({'id': i, **{f: str(row.get(f, '')).strip() for f in fields}}, ensure_ascii=False)
+             for i, row in enumerate(rows, 1)]
+    return template.replace('{{items}}', '[\n  ' + ',\n  '.join(items) + '\n]')
+
+
+def _valid_output(output: Any, prompt_name: str) -> Optional[Dict[str, str]]:
+    """Salida normalizada de un item, o None si no cumple el esquema."""
+    parsed = validate_output(output, prompt_name)
+    return parsed.fields if parsed.ok else None
+
+
+def _echoed_modismo(item: Dict[str, Any]) -> Optional[str]:
+    echoed = item.get('input')
+    if isinstance(echoed, dict):
+        echoed = echoed.get('modismo')
+    if echoed is None:
+        echoed = item.get('modismo')
+    return echoed.strip() if isinstance(echoed, str) else None
+
+
+def parse_batch(content: Any, rows: Sequence[Dict[str, Any]],
+                prompt_name: str) -> Tuple[Dict[int, Dict[str, str]], List[int], Dict[str, int]]:
+    """
+    Interpreta la respuesta de un lote.
+
+    Cada item se asigna por su id; si el modelo repite el modismo ("input")
+    y no coincide con el del id pero sí con el de otro, se reasigna (items
+    cambiados de lugar). Los ids faltantes, duplicados, con salida inválida
+    o con un modismo que no corresponde a ningún item quedan pendientes.
+
+    Args:
+        content: Respuesta del modelo (str) o error (dict)
+        rows: Items del lote, en el orden en que se enviaron
+        prompt_name: 'prompt_1', 'prompt_2' o 'prompt_3'
+
+    Returns:
+        Tupla (salidas {índice en rows: output}, índices pendientes, contadores de problemas)
+    """
+    problems = {'missing': 0, 'duplicated': 0, 'invalid': 0, 'reassigned': 0, 'unparseable': 0}
+    if not isinstance(content, str):
+        problems['unparseable'] = len(rows)
+        return {}, list(range(len(rows))), problems
+    try:
+        data = extract_json(content)
+    except ValueError:
+        problems['unparseable'] = len(rows)
+        return {}, list(range(len(rows))), problems
+
+    # Formas aceptadas: [...], {"items"/"results": [...]} o {"<id>": {...}}
+    if isinstance(data, dict):
+        listed = next((v for v in data.values() if isinstance(v, list)), None)
+        if listed is not None:
+            data = listed
+        else:
+            data = [{'id': k, **v} for k, v in data.items() if isinstance(v, dict)]
+    if not isinstance(data, list):
+        problems['unparseable'] = len(rows)
+        return {}, list(range(len(rows))), problems
+
+    by_modismo = {}
+    for index, row in enumerate(rows):
+        by_modismo.setdefault(str(row.get('modismo', '')).strip().casefold(), []).append(index)
+
+    outputs: Dict[int, Dict[str, str]] = {}
+    seen = set()
+    for item in data:
+        if not isinstance(item, dict):
+            problems['invalid'] += 1
+            continue
+        try:
+            index = int(item.get('id')) - 1
+        except (TypeError, ValueError):
+            index = -1
+
+        echoed = _echoed_modismo(item)
+        if echoed is not None:
+            expected = str(rows[index].get('modismo', '')).strip() if 0 <= index < len(rows) else None
+            if expected is None or echoed.casefold() != expected.casefold():
+                candidates = [i for i in by_modismo.get(echoed.casefold(), []) if i not in seen]
+                if not candidates:
+                    problems['invalid'] += 1
+                    continue
+                index = candidates[0]
+                problems['reassigned'] += 1
+        if not 0 <= index < len(rows):
+            problems['invalid'] += 1
+            continue
+        if index in seen:
+            problems['duplicated'] += 1
+            outputs.pop(index, None)
+            continue
+        seen.add(index)
+
+        output = _valid_output(item.get('output'), prompt_name)
+        if output is None:
+            problems['invalid'] += 1
+            continue
+        outputs[index] = output
+
+    # Un id duplicado es ambiguo: se descarta y se vuelve a pedir
+    pending = [i for i in range(len(rows)) if i not in outputs]
+    problems['missing'] = sum(1 for i in pending if i not in seen)
+    return outputs, pending, problems
+
+
+def item_entry(row: Dict[str, Any], model: str, prompt_name: str, output: Dict[str, str]) -> Dict[str, Any]:
+    """Entrada en el formato de los notebooks para un item resuelto por lotes."""
+    entry = {'modismo': row['modismo']}
+    if prompt_name == 'prompt_3':
+        entry['ejemplo'] = row.get('ejemplo', '')
+        echoed: Any = {'modismo': row['modismo'], 'ejemplo': row.get('ejemplo', '')}
+    else:
+        echoed = row['modismo']
+    return {**entry, 'model': model, 'response': {'input': echoed, 'output': output}}
+
+
+def _chunks(items: Sequence[Any], size: int) -> List[List[Any]]:
+    return [list(items[i:i + size]) for i in range(0, len(items), size)]
+
+
+async def run_batched(engine: Any, models: Sequence[str], rows: Sequence[Dict[str, Any]], prompt_name: str,
+                      batch_size: int = DEFAULT_BATCH_SIZE, max_rounds: int = DEFAULT_MAX_ROUNDS,
+                      prompts: Optional[Dict[str, str]] = None, on_entry: Optional[Any] = None,
+                      verbose: bool = True) -> Dict[str, Any]:
+    """
+    Ejecuta un prompt por lotes para varios modelos con LLMEngine.
+
+    Cada ronda empaqueta los items pendientes de cada modelo en lotes de
+    batch_size y reencola sólo los items que faltaron o llegaron mal. Tras
+    max_rounds rondas, lo que quede se pide con el prompt de un item, de modo
+    que todos los items terminan con respuesta (o con el error de la petición
+    individual).
+
+    Args:
+        engine: LLMEngine
+        models: Modelos a evaluar
+        rows: Items del dataset (dicts con 'modismo' y, en el Prompt 3, 'ejemplo')
+        prompt_name: 'prompt_1', 'prompt_2' o 'prompt_3'
+        batch_size: Modismos por petición (K)
+        max_rounds: Rondas por lotes antes de pasar a un item por petición
+        prompts: Templates (default: load_prompts())
+        on_entry: Función llamada con cada entrada resuelta apenas llega su respuesta (ej: journal.append)
+        verbose: Imprime el resumen de cada ronda
+
+    Returns:
+        Dict con 'entries' {modelo: [entradas]}, 'requests', 'input_chars' y 'problems'
+    """
+    from Journal import result_entry
+
+    prompts = prompts or load_prompts()
+    batch_template = prompts[f'{prompt_name}_batch']
+    single_template = prompts[prompt_name]
+
+    entries: Dict[str, List[Dict[str, Any]]] = {model: [] for model in models}
+    pending: Dict[str, List[Dict[str, Any]]] = {model: list(rows) for model in models}
+    problems = {'missing': 0, 'duplicated': 0, 'invalid': 0, 'reassigned': 0, 'unparseable': 0}
+    stats = {'requests': 0, 'input_chars': 0}
+
+    def emit(model: str, entry: Dict[str, Any]):
+        entries[model].append(entry)
+        if on_entry is not None:
+            on_entry(entry)
+
+    for round_number in range(1, max_rounds + 1):
+        jobs = []
+        for model in models:
+            for chunk in _chunks(pending[model], batch_size):
+                jobs.append(LLMJob(model, render_batch(batch_template, chunk, prompt_name), key=chunk,
+                                   template=batch_template))
+        if not jobs:
+            break
+        stats['requests'] += len(jobs)
+        stats['input_chars'] += sum(len(job.message) for job in jobs)
+
+        # Cada lote se interpreta apenas llega; tras la ronda sólo queda reencolar lo que faltó
+        missing_items: Dict[str, List[Dict[str, Any]]] = {model: [] for model in models}
+
+        def on_batch(result: Any):
+            chunk = result.job.key
+            outputs, missing, batch_problems = parse_batch(result.response, chunk, prompt_name)
+            for name, count in batch_problems.items():
+                problems[name] += count
+            for index, output in outputs.items():
+                emit(result.job.model, item_entry(chunk[index], result.job.model, prompt_name, output))
+            missing_items[result.job.model].extend(chunk[i] for i in missing)
+
+        await engine.run(jobs, on_result=on_batch)
+        pending = missing_items
+
+        if verbose:
+            remaining = sum(len(v) for v in pending.values())
+            print(f"Ronda {round_number}: {len(jobs):,} peticiones, {remaining:,} items pendientes")
+
+    # Último recurso: un item por petición con el prompt original
+    ejemplos = {row['modismo']: row.get('ejemplo', '') for model in models for row in pending[model]}
+    jobs = [LLMJob(model, render_single(single_template, row, prompt_name), key=row['modismo'],
+                   template=single_template) for model in models for row in pending[model]]
+    if jobs:
+        stats['requests'] += len(jobs)
+        stats['input_chars'] += sum(len(job.message) for job in jobs)
+        def on_single(result: Any):
+            fields = {'ejemplo': ejemplos[result.job.key]} if prompt_name == 'prompt_3' else {}
+            emit(result.job.model, result_entry(result, **fields))
+
+        await engine.run(jobs, on_result=on_single)
+        if verbose:
+            print(f"Individuales: {len(jobs):,} peticiones")
+
+    return {'entries': entries, 'problems': problems, **stats}
+
+
+def _es_modismo(entry: Dict[str, Any]) -> Optional[str]:
+    """Valor Sí/No de una entrada del Prompt 1 (None si no se pudo interpretar)."""
+    return parse_stored(entry.get('response'), 'prompt_1').fields.get('es_modismo')
+
+
+async def compare_batched(engine: Any, model: str, rows: Sequence[Dict[str, Any]], prompt_name: str = 'prompt_1',
+                          batch_size: int = DEFAULT_BATCH_SIZE, sample: Optional[int] = 200, seed: int = 42,
+                          prompts: Optional[Dict[str, str]] = None, verbose: bool = True) -> Dict[str, Any]:
+    """
+    Modo de evaluación: mismo modelo y mismos items, por lotes vs. un item por petición.
+
+    Reporta peticiones y caracteres de entrada de cada modo, cobertura (items
+    con salida válida) y, en el Prompt 1, el accuracy de cada modo (todos los
+    items del dataset son modismos, así que la respuesta correcta es "Sí") y
+    la concordancia entre ambos.
+
+    Args:
+        engine: LLMEngine (conviene sin caché, o con caché si se repite la comparación)
+        model: Modelo a evaluar
+        rows: Items del dataset
+        prompt_name: 'prompt_1', 'prompt_2' o 'prompt_3'
+        batch_size: Modismos por petición en el modo por lotes
+        sample: Número de items a muestrear (None = todos)
+        seed: Semilla del muestreo
+        prompts: Templates (default: load_prompts())
+        verbose: Imprime el reporte
+
+    Returns:
+        Dict con las métricas de cada modo
+    """
+    from Journal import result_entry
+
+    prompts = prompts or load_prompts()
+    rows = list(rows)
+    if sample is not None and sample < len(rows):
+        rows = random.Random(seed).sample(rows, sample)
+
+    single_template = prompts[prompt_name]
+    jobs = [LLMJob(model, render_single(single_template, row, prompt_name), key=row['modismo'],
+                   template=single_template) for row in rows]
+    single = {r.job.key: result_entry(r) for r in await engine.run(jobs)}
+    batched = await run_batched(engine, [model], rows, prompt_name, batch_size, max_rounds=1,
+                                prompts=prompts, verbose=False)
+    batched_entries = {e['modismo']: e for e in batched['entries'][model]}
+
+    report = {
+        'model': model, 'prompt': prompt_name, 'items': len(rows), 'batch_size': batch_size,
+        'single_requests': len(jobs), 'batched_requests': batched['requests'],
+        'single_input_chars': sum(len(j.message) for j in jobs), 'batched_input_chars': batched['input_chars'],
+        'batched_problems': batched['problems'],
+    }
+    report['request_reduction'] = report['single_requests'] / max(report['batched_requests'], 1)
+    report['input_reduction'] = report['single_input_chars'] / max(report['batched_input_chars'], 1)
+
+    if prompt_name == 'prompt_1':
+        single_labels = {m: _es_modismo(e) for m, e in single.items()}
+        batched_labels = {m: _es_modismo(e) for m, e in batched_entries.items()}
+        keys = [row['modismo'] for row in rows]
+        report['single_accuracy'] = sum(single_labels.get(k) == 'Sí' for k in keys) / len(keys)
+        report['batched_accuracy'] = sum(batched_labels.get(k) == 'Sí' for k in keys) / len(keys)
+        both = [k for k in keys if single_labels.get(k) and batched_labels.get(k)]
+        report['agreement'] = (sum(single_labels[k] == batched_labels[k] for k in both) / len(both)) if both else 0.0
+
+    if verbose:
+        print(f"\n{'='*60}")
+        print(f"Lotes (K={batch_size}) vs. individual - {model} - {prompt_name} ({len(rows)} items)")
+        print(f"{'='*60}")
+        print(f"Peticiones:          {report['single_requests']:,} -> {report['batched_requests']:,} "
+              f"({report['request_reduction']:.1f}x)")
+        print(f"Caracteres entrada:  {report['single_input_chars']:,} -> {report['batched_input_chars']:,} "
+              f"({report['input_reduction']:.1f}x)")
+        print(f"Problemas por lotes: {report['batched_problems']}")
+        if prompt_name == 'prompt_1':
+            print(f"Accuracy individual: {report['single_accuracy']:.4f}")
+            print(f"Accuracy por lotes:  {report['batched_accuracy']:.4f}")
+            print(f"Concordancia:        {report['agreement']:.4f}")
+        print(f"{'='*60}\n")
+    return report
@@ -0,0 +1,333 @@
+"""
+Journal append-only de respuestas por (proveedor, prompt, modelo)
+Reemplaza checkpoint.json: cada item se agrega al final de un JSONL y se hace fsync por lotes
+"""
+
+import os
+import json
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+
+# Items por lote: un crash pierde como mucho los items del lote sin fsync
+DEFAULT_BATCH_SIZE = 100
+
+JOURNAL_FILE = 'journal.jsonl'
+INDEX_FILE = 'journal.idx'
+
+
+def sanitize_model_name(model_name: str) -> str:
+    """Convierte nombres de modelos en nombres válidos para nombres de archivos (igual que los notebooks)."""
+    return model_name.replace('/', '_').replace(':', '_').replace('-', '_').replace('.', '_')
+
+
+def _save_json(filepath: str, data: Any):
+    """Escritura atómica con archivo temporal, en el mismo formato que save_json de los notebooks."""
+    os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+    temp_filepath = f"{filepath}.tmp"
+    with open(temp_filepath, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(temp_filepath, filepath)
+
+
+class ResultsJournal:
+    """
+    Journal de respuestas de un modelo para un prompt.
+
+    Cada respuesta ({"modismo", "model", "response", ...}) se agrega como una
+    línea de Results/<prompt>/<modelo>/journal.jsonl. Las líneas se acumulan
+    en memoria y se escriben con un solo write + fsync cada batch_size items,
+    así que el costo por item es constante (no se reescribe todo el archivo
+    como con checkpoint.json) y un crash pierde como mucho un lote. Después
+    de cada fsync se agrega a journal.idx una línea "items\\toffset" con el
+    tamaño confirmado; al abrir, lo que haya después del último offset se
+    valida línea a línea y una línea cortada por el crash se descarta.
+
+    Cada journal tiene su propio lock: los modelos no se esperan entre sí.
+    Reanudar es leer las claves del journal (processed_keys) y el
+    <modelo>.json del notebook se genera a demanda con compact().
+
+    Si no existe el journal pero sí un checkpoint.json o un <modelo>.json de
+    una corrida anterior, sus respuestas se importan al abrir.
+
+    Args:
+        base_dir: Directorio de resultados del proveedor (ej: '../Results')
+        prompt_name: Nombre del prompt (ej: 'Prompt 1')
+        model: Nombre del modelo (ej: 'openai/gpt-4.1')
+        batch_size: Items por fsync
+        key: Campo (o función entry -> clave) que identifica un item (default: 'modismo')
+        output_path: Archivo que genera compact() (default: <modelo>/<modelo>.json como save_model_response)
+    """
+
+    def __init__(self, base_dir: str, prompt_name: str, model: str, batch_size: int = DEFAULT_BATCH_SIZE,
+                 key: Union[str, Callable[[Dict[str, Any]], Any]] = 'modismo',
+                 output_path: Optional[str] = None):
+        self.model = model
+        self.prompt_name = prompt_name
+        self.batch_size = max(1, batch_size)
+        self._key = key if callable(key) else (lambda entry, field=key: entry.get(field))
+
+        safe = sanitize_model_name(model)
+        self.directory = os.path.join(base_dir, prompt_name, safe)
+        self.path = os.path.join(self.directory, JOURNAL_FILE)
+        self.index_path = os.path.join(self.directory, INDEX_FILE)
+        self.output_path = output_path or os.path.join(self.directory, f"{safe}.json")
+
+        self._lock = threading.Lock()
+        self._pending: List[bytes] = []
+        self._keys: Optional[Set[Any]] = None
+        os.makedirs(self.directory, exist_ok=True)
+
+        if not os.path.exists(self.path):
+            self._import_legacy()
+        self._items, self._offset = self._recover()
+        self._file = open(self.path, 'ab')
+
+    # -- apertura ----------------------------------------------------------
+
+    def _read_index(self) -> Tuple[int, int]:
+        """Último (items, offset) confirmado en el índice."""
+        last = (0, 0)
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    parts = line.split('\t')
+                    if len(parts) == 2:
+                        try:
+                            last = (int(parts[0]), int(parts[1]))
+                        except ValueError:
+                            break
+        return last
+
+    def _recover(self) -> Tuple[int, int]:
+        """
+        Valida la cola del journal después del último offset del índice.
+
+        Las líneas completas se aceptan (se escribieron aunque no se alcanzara
+        a actualizar el índice) y desde la primera línea incompleta o inválida
+        se trunca el archivo.
+        """
+        items, offset = self._read_index()
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if offset > size:
+            # Índice de un journal que se reemplazó: se reconstruye desde cero
+            items, offset = 0, 0
+        if size == offset:
+            return items, offset
+
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            valid = offset
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    json.loads(line)
+                except ValueError:
+                    break
+                valid += len(line)
+                items += 1
+        if valid < size:
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid)
+        if valid != offset:
+            self._append_index(items, valid)
+        return items, valid
+
+    def _import_legacy(self):
+        """Importa las respuestas de checkpoint.json o <modelo>.json de una corrida con los notebooks."""
+        entries = None
+        checkpoint_path = os.path.join(self.directory, 'checkpoint.json')
+        for path, field in ((checkpoint_path, 'responses'), (self.output_path, None)):
+            if os.path.exists(path):
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                except ValueError:
+                    continue
+                entries = data.get(field, []) if field else data
+                break
+        if not entries:
+            return
+        with open(self.path, 'wb') as f:
+            for entry in entries:
+                f.write(self._encode(entry))
+            f.flush()
+            os.fsync(f.fileno())
+            offset = f.tell()
+        self._append_index(len(entries), offset)
+
+    # -- escritura ---------------------------------------------------------
+
+    @staticmethod
+    def _encode(entry: Dict[str, Any]) -> bytes:
+        return (json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+
+    def _append_index(self, items: int, offset: int):
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            f.write(f"{items}\t{offset}\n")
+
+    def append(self, entry: Dict[str, Any], timestamp: bool = False):
+        """
+        Agrega una respuesta. Se escribe a disco al completar el lote.
+
+        Args:
+            entry: Dict con al menos el campo clave (ej: {"modismo", "model", "response"})
+            timestamp: Si True, agrega 'timestamp' (como los notebooks de Azure)
+        """
+        if timestamp:
+            entry = {**entry, 'timestamp': datetime.now().isoformat()}
+        line = self._encode(entry)
+        with self._lock:
+            self._pending.append(line)
+            if self._keys is not None:
+                self._keys.add(self._key(entry))
+            if len(self._pending) >= self.batch_size:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._pending:
+            return
+        self._file.write(b''.join(self._pending))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._items += len(self._pending)
+        self._offset = self._file.tell()
+        self._pending = []
+        self._append_index(self._items, self._offset)
+
+    def flush(self):
+        """Escribe y sincroniza el lote pendiente."""
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        """Escribe el lote pendiente y cierra el journal."""
+        with self._lock:
+            if not self._file.closed:
+                self._flush_locked()
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # -- lectura -----------------------------------------------------------
+
+    def entries(self) -> Iterator[Dict[str, Any]]:
+        """Recorre las respuestas en orden de escritura (incluye el lote pendiente)."""
+        self.flush()
+        with open(self.path, 'rb') as f:
+            for line in f:
+                yield json.loads(line)
+
+    def processed_keys(self) -> Set[Any]:
+        """Claves ya respondidas (equivalente a processed_modismos del checkpoint)."""
+        if self._keys is None:
+            self.flush()
+            self._keys = {self._key(entry) for entry in self.entries()}
+        return set(self._keys)
+
+    def latest(self) -> List[Dict[str, Any]]:
+        """
+        Respuestas únicas por clave, en el orden de la primera aparición.
+
+        Si un item se respondió más de una vez (ej: se reintentó un error),
+        queda la última respuesta válida; un error sólo queda si el item
+        nunca tuvo respuesta.
+        """
+        latest: Dict[Any, Dict[str, Any]] = {}
+        for entry in self.entries():
+            key = self._key(entry)
+            if key in latest and _is_error(entry) and not _is_error(latest[key]):
+                continue
+            # Reasignar una clave existente conserva su posición en el dict
+            latest[key] = entry
+        return list(latest.values())
+
+    def compact(self, output_path: Optional[str] = None) -> str:
+        """
+        Genera el <modelo>.json (lista de respuestas, formato de save_model_response) desde el journal.
+
+        Returns:
+            Ruta del archivo escrito
+        """
+        path = output_path or self.output_path
+        _save_json(path, self.latest())
+        return path
+
+    def stats(self) -> Dict[str, Any]:
+        """Items escritos, pendientes y tamaño del journal."""
+        with self._lock:
+            return {'model': self.model, 'prompt': self.prompt_name, 'items': self._items,
+                    'pending': len(self._pending), 'bytes': self._offset}
+
+
+def _is_error(entry: Dict[str, Any]) -> bool:
+    response = entry.get('response')
+    return isinstance(response, dict) and 'error' in response
+
+
+def result_entry(result: Any, key_field: str = 'modismo', **fields) -> Dict[str, Any]:
+    """
+    Convierte un LLMResult en la entrada que guardan los notebooks.
+
+    Igual que "Procesar respuesta" en los notebooks: un str con JSON válido se
+    guarda parseado, otro str como {"raw_response": ...} y un error tal cual.
+
+    Args:
+        result: LLMResult del motor (job.key es el valor de key_field)
+        key_field: Nombre del campo clave (default: 'modismo')
+        **fields: Campos adicionales (ej: ejemplo=... en el Prompt 3)
+
+    Returns:
+        Dict {key_field, **fields, "model", "response"}
+    """
+    response = result.response
+    if isinstance(response, str):
+        try:
+            response = json.loads(response)
+        except ValueError:
+            response = {"raw_response": response}
+    elif not isinstance(response, dict):
+        response = {"raw_response": str(response)}
+    return {key_field: result.job.key, **fields, "model": result.job.model, "response": response}
+
+
+def journal_models(base_dir: str, prompt_name: str) -> List[str]:
+    """Carpetas de modelo (nombres sanitizados) que tienen journal en un prompt."""
+    prompt_dir = os.path.join(base_dir, prompt_name)
+    if not os.path.isdir(prompt_dir):
+        return []
+    return sorted(name for name in os.listdir(prompt_dir)
+                  if os.path.exists(os.path.join(prompt_dir, name, JOURNAL_FILE)))
+
+
+def compact_prompt(base_dir: str, prompt_name: str, models: List[str],
+                   consolidated: bool = True) -> Dict[str, int]:
+    """
+    Compacta los journals de varios modelos y, opcionalmente, el all_models.json del prompt.
+
+    Args:
+        base_dir: Directorio de resultados del proveedor
+        prompt_name: Nombre del prompt (ej: 'Prompt 1')
+        models: Modelos a compactar (nombres originales, ej: DEFAULT_MODELS)
+        consolidated: Si True, escribe <prompt>/all_models.json como save_consolidated_response
+
+    Returns:
+        Dict {modelo: número de respuestas}
+    """
+    all_models_data = {}
+    for model in models:
+        journal = ResultsJournal(base_dir, prompt_name, model)
+        try:
+            all_models_data[model] = journal.latest()
+            _save_json(journal.output_path, all_models_data[model])
+        finally:
+            journal.close()
+    if consolidated:
+        _save_json(os.path.join(base_dir, prompt_name, 'all_models.json'), all_models_data)
+    return {model: len(data) for model, data in all_models_data.items()}
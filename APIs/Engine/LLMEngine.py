@@ -0,0 +1,796 @@
+"""
+Motor asíncrono de peticiones a LLMs (Straico y Azure OpenAI)
+Conexiones keep-alive compartidas, token buckets por proveedor y por modelo,
+y concurrencia adaptativa que retrocede ante 429 en lugar de abortar
+"""
+
+import json
+import time
+import random
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+# Mismo endpoint que usan los notebooks de Straico
+STRAICO_API_URL = "https://api.straico.com/v1/prompt/completion"
+
+# Mensaje de sistema de los notebooks de Azure
+AZURE_SYSTEM_MESSAGE = "You are a helpful assistant specialized in Spanish idioms."
+
+# Reintentos ante errores de red o 5xx (los 429 no cuentan: se espera y se reintenta)
+DEFAULT_MAX_RETRIES = 3
+
+# Tope de reintentos por 429 de una misma petición antes de darla por fallida
+DEFAULT_MAX_THROTTLES = 50
+
+# Timeout por petición (mismo valor que requests.post en los notebooks)
+DEFAULT_TIMEOUT = 120
+
+
+class DailyAPILimitReached(Exception):
+    """El proveedor informó que se agotó la cuota diaria: no tiene sentido seguir enviando."""
+    pass
+
+
+class _Throttled(Exception):
+    """Respuesta 429 (o equivalente) con el tiempo de espera sugerido."""
+
+    def __init__(self, retry_after: Optional[float]):
+        super().__init__(f"throttled (retry_after={retry_after})")
+        self.retry_after = retry_after
+
+
+class _Retryable(Exception):
+    """Error transitorio (red, timeout, 5xx) que se puede reintentar."""
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Control de tasa
+# ---------------------------------------------------------------------------
+
+class TokenBucket:
+    """
+    Token bucket asíncrono.
+
+    Se rellena a razón de `rate` fichas por segundo hasta `capacity`; cada
+    petición consume una ficha y espera si no hay. pause() vacía el bucket y
+    bloquea las fichas durante unos segundos (ej: el Retry-After de un 429).
+    Con rate=None no limita la tasa, pero sigue respetando las pausas.
+
+    Args:
+        rate: Fichas por segundo (ej: 60 peticiones/minuto -> 1.0), o None
+        capacity: Ráfaga máxima (default: max(1, rate))
+    """
+
+    def __init__(self, rate: Optional[float], capacity: Optional[float] = None):
+        if rate is not None and rate <= 0:
+            raise ValueError("rate debe ser positivo")
+        self.rate = float(rate) if rate is not None else None
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate or 1.0))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """Espera hasta obtener una ficha. Las esperas se atienden en orden de llegada."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+                if self.rate is None:
+                    return
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Bloquea el bucket durante `seconds` y descarta las fichas acumuladas."""
+        now = time.monotonic()
+        self._blocked_until = max(self._blocked_until, now + seconds)
+        self._tokens = 0.0
+        self._updated = max(self._updated, now)
+
+
+class AdaptiveConcurrency:
+    """
+    Límite de peticiones en vuelo con ajuste AIMD.
+
+    Cada éxito suma 1/limit al límite (crece ~1 por cada ventana completa de
+    éxitos) y cada 429 lo reduce a la mitad, como el control de congestión de
+    TCP. Así el motor encuentra solo la concurrencia que tolera el proveedor
+    en vez de fijar MAX_WORKERS a mano.
+
+    Args:
+        initial: Límite inicial
+        minimum: Límite mínimo (nunca se baja de aquí)
+        maximum: Límite máximo (también es el tamaño del pool de conexiones)
+    """
+
+    def __init__(self, initial: int = 8, minimum: int = 1, maximum: int = 64):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    async def on_success(self):
+        async with self._condition:
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+    def on_throttle(self, cooldown: float = 1.0):
+        """Reduce el límite a la mitad (como mucho una vez por `cooldown` segundos)."""
+        now = time.monotonic()
+        if now - self._last_decrease >= cooldown:
+            self.limit = max(float(self.minimum), self.limit / 2)
+            self._last_decrease = now
+
+
+# ---------------------------------------------------------------------------
+# Proveedores
+# ---------------------------------------------------------------------------
+
+def _retry_after(headers: Any) -> Optional[float]:
+    """Segundos de espera sugeridos en los headers de un 429 (Retry-After o retry-after-ms)."""
+    for name, scale in (('retry-after-ms', 0.001), ('Retry-After', 1.0)):
+        value = headers.get(name)
+        if value is not None:
+            try:
+                return max(0.0, float(value) * scale)
+            except ValueError:
+                pass
+    return None
+
+
+class StraicoProvider:
+    """
+    Petición y respuesta de Straico (mismo formato que send_prompt de los notebooks).
+
+    Args:
+        api_key: API key de Straico
+        url: Endpoint de completions (default: STRAICO_API_URL)
+    """
+
+    name = 'straico'
+
+    def __init__(self, api_key: str, url: str = STRAICO_API_URL):
+        self.api_key = api_key
+        self.url = url
+
+    def build_request(self, model: str, message: str) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+        headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+        return self.url, headers, {"models": [model], "message": message}
+
+    def parse_response(self, model: str, status: int, data: Any, text: str) -> Any:
+        """
+        Extrae el contenido de una respuesta.
+
+        Returns:
+            str con el contenido, o dict {"error": ...} como send_prompt
+        """
+        if 200 <= status < 300:
+            if isinstance(data, dict):
+                completions = data.get('data', {}).get('completions', {})
+                if isinstance(completions, dict):
+                    model_key = model if model in completions else next(iter(completions), None)
+                    try:
+                        return completions[model_key]['completion']['choices'][0]['message']['content']
+                    except (KeyError, IndexError, TypeError):
+                        pass
+            return text if data is None else json.dumps(data, ensure_ascii=False)
+
+        if isinstance(data, dict):
+            error_msg = str(data).lower()
+            if "daily api limit" in error_msg and "spending coins has been reached" in error_msg:
+                raise DailyAPILimitReached(f"Straico daily API limit reached: {data}")
+        return {"error": f"status={status}", "response": data if data is not None else text}
+
+
+class AzureProvider:
+    """
+    Chat completions de Azure OpenAI por REST (lo mismo que client.chat.completions.create).
+
+    Args:
+        endpoint: Endpoint del recurso (ej: "https://<recurso>.openai.azure.com/")
+        deployment: Nombre del deployment (ej: "gpt-5.1-grande")
+        api_key: Subscription key
+        api_version: Versión de la API
+        system_message: Mensaje de sistema de cada petición
+    """
+
+    name = 'azure'
+
+    def __init__(self, endpoint: str, deployment: str, api_key: str,
+                 api_version: str = "2024-12-01-preview", system_message: str = AZURE_SYSTEM_MESSAGE):
+        self.endpoint = endpoint.rstrip('/')
+        self.deployment = deployment
+        self.api_key = api_key
+        self.api_version = api_version
+        self.system_message = system_message
+
+    def build_request(self, model: str, message: str) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+        # En Azure el modelo lo define el deployment; `model` sólo identifica la serie de resultados
+        url = (f"{self.endpoint}/openai/deployments/{self.deployment}/chat/completions"
+               f"?api-version={self.api_version}")
+        headers = {"api-key": self.api_key, "Content-Type": "application/json"}
+        payload = {"messages": [{"role": "system", "content": self.system_message},
+                                {"role": "user", "content": message}]}
+        return url, headers, payload
+
+    def parse_response(self, model: str, status: int, data: Any, text: str) -> Any:
+        if 200 <= status < 300 and isinstance(data, dict):
+            try:
+                return data['choices'][0]['message']['content']
+            except (KeyError, IndexError, TypeError):
+                return json.dumps(data, ensure_ascii=False)
+        if isinstance(data, dict) and 'insufficient_quota' in str(data).lower():
+            raise DailyAPILimitReached(f"Azure quota exhausted: {data}")
+        return {"error": f"status={status}", "response": data if data is not None else text}
+
+
+# ---------------------------------------------------------------------------
+# Motor
+# ---------------------------------------------------------------------------
+
+@dataclass
+class LLMJob:
+    """
+    Una petición: mensaje ya renderizado para un modelo.
+
+    `key` identifica el item (ej: el modismo) y `template` es el template sin
+    renderizar, que versiona las entradas de la caché de respuestas.
+    """
+    model: str
+    message: str
+    key: Any = None
+    template: Optional[str] = None
+
+
+@dataclass
+class LLMResult:
+    """Resultado de un LLMJob. `response` es str o dict {"error": ...} como send_prompt."""
+    job: LLMJob
+    response: Any
+    attempts: int = 1
+    throttles: int = 0
+    latency: float = 0.0
+    cached: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return not (isinstance(self.response, dict) and 'error' in self.response)
+
+
+@dataclass
+class EngineStats:
+    """Contadores de una ejecución."""
+    requests: int = 0
+    completed: int = 0
+    errors: int = 0
+    retries: int = 0
+    throttled: int = 0
+    cached: int = 0
+    started: float = field(default_factory=time.monotonic)
+
+    def as_dict(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self.started
+        return {'requests': self.requests, 'completed': self.completed, 'errors': self.errors,
+                'retries': self.retries, 'throttled': self.throttled, 'cached': self.cached, 'elapsed': elapsed,
+                'items_per_sec': self.completed / elapsed if elapsed > 0 else 0.0}
+
+
+class LLMEngine:
+    """
+    Envía miles de peticiones a un proveedor limitadas por cuota, no por hilos.
+
+    Todas las peticiones comparten una sesión aiohttp con conexiones
+    keep-alive (el pool tiene max_concurrency conexiones). Antes de enviar,
+    cada petición toma una ficha del bucket de su modelo y otra del bucket
+    del proveedor, y un lugar en la concurrencia adaptativa de su modelo.
+    Ante un 429 se reduce la concurrencia de ese modelo, se pausa su bucket
+    (Retry-After si viene, backoff exponencial si no) y la petición se
+    reintenta sin ocupar lugar mientras espera; los errores de red y 5xx se
+    reintentan hasta max_retries. Si el proveedor reporta cuota diaria
+    agotada se dejan de enviar peticiones, se esperan las que están en vuelo
+    y run() lanza DailyAPILimitReached (los resultados ya entregados quedan
+    guardados por quien los recibe).
+
+    Con una ResponseCache, las peticiones ya respondidas (mismo proveedor,
+    modelo, template y mensaje) se entregan sin red ni cuota.
+
+    Uso (en un notebook, con await de nivel superior):
+
+        engine = LLMEngine(StraicoProvider(API_KEY), provider_rpm=600, model_rpm=120)
+        jobs = [LLMJob(model, prompt_1.replace('{{modismo}}', m), key=m)
+                for model in models for m in modismos]
+        await engine.run(jobs, on_result=lambda r: ...)
+
+    Args:
+        provider: StraicoProvider, AzureProvider o cualquier objeto con build_request/parse_response
+        provider_rpm: Peticiones por minuto para todo el proveedor (None = sin límite)
+        model_rpm: Peticiones por minuto por modelo: un número para todos o un dict {modelo: rpm}
+        max_concurrency: Máximo de peticiones en vuelo (tamaño del pool de conexiones)
+        initial_concurrency: Concurrencia inicial de cada modelo antes de adaptarse
+        max_retries: Reintentos ante errores de red, timeout o 5xx
+        max_throttles: Máximo de 429 por petición antes de darla por fallida
+        timeout: Timeout por petición en segundos
+        cache: ResponseCache opcional para no repetir peticiones ya respondidas
+    """
+
+    def __init__(self, provider: Any, provider_rpm: Optional[float] = None,
+                 model_rpm: Optional[Any] = None, max_concurrency: int = 64,
+                 initial_concurrency: int = 8, max_retries: int = DEFAULT_MAX_RETRIES,
+                 max_throttles: int = DEFAULT_MAX_THROTTLES, timeout: float = DEFAULT_TIMEOUT,
+                 cache: Optional[Any] = None):
+        self.provider = provider
+        self.provider_rpm = provider_rpm
+        self.model_rpm = model_rpm
+        self.max_concurrency = max_concurrency
+        self.initial_concurrency = initial_concurrency
+        self.max_retries = max_retries
+        self.max_throttles = max_throttles
+        self.timeout = timeout
+        self.cache = cache
+
+        self.stats = EngineStats()
+        self._session = None
+        self._provider_bucket: Optional[TokenBucket] = None
+        self._model_buckets: Dict[str, TokenBucket] = {}
+        self._model_concurrency: Dict[str, AdaptiveConcurrency] = {}
+        self._stop: Optional[DailyAPILimitReached] = None
+
+    # -- recursos --------------------------------------------------------
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def open(self):
+        """Crea la sesión con el pool de conexiones y los limitadores (run y complete la abren solos)."""
+        if self._session is not None:
+            return
+        try:
+            import aiohttp
+        except ImportError as e:
+            raise ImportError("LLMEngine requiere aiohttp: pip install aiohttp") from e
+
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=60)
+        self._session = aiohttp.ClientSession(connector=connector,
+                                              timeout=aiohttp.ClientTimeout(total=self.timeout))
+        self._provider_bucket = TokenBucket(self.provider_rpm / 60) if self.provider_rpm else None
+        self._model_buckets = {}
+        self._model_concurrency = {}
+        self._stop = None
+        self.stats = EngineStats()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _model_bucket(self, model: str) -> TokenBucket:
+        # Sin rpm configurado el bucket no limita la tasa, pero permite pausar el modelo tras un 429
+        if model not in self._model_buckets:
+            rpm = self.model_rpm.get(model) if isinstance(self.model_rpm, dict) else self.model_rpm
+            self._model_buckets[model] = TokenBucket(rpm / 60 if rpm else None)
+        return self._model_buckets[model]
+
+    def _concurrency(self, model: str) -> AdaptiveConcurrency:
+        if model not in self._model_concurrency:
+            self._model_concurrency[model] = AdaptiveConcurrency(self.initial_concurrency, 1, self.max_concurrency)
+        return self._model_concurrency[model]
+
+    async def _acquire(self, model: str):
+        """Espera cuota (modelo y proveedor) y un lugar en la concurrencia del modelo."""
+        # Primero el bucket del modelo (el más lento) para no gastar fichas del proveedor esperando
+        await self._model_bucket(model).acquire()
+        if self._provider_bucket is not None:
+            await self._provider_bucket.acquire()
+        await self._concurrency(model).acquire()
+
+    def concurrency_limits(self) -> Dict[str, int]:
+        """Límite de concurrencia al que llegó cada modelo."""
+        return {model: int(c.limit) for model, c in self._model_concurrency.items()}
+
+    # -- una petición ----------------------------------------------------
+
+    def _cached(self, job: LLMJob) -> Optional[LLMResult]:
+        """Resultado desde la caché de respuestas, o None."""
+        if self.cache is None:
+            return None
+        response = self.cache.get(self.provider.name, job.model, job.template, job.message)
+        if response is None:
+            return None
+        self.stats.completed += 1
+        self.stats.cached += 1
+        return LLMResult(job, response, attempts=0, cached=True)
+
+    async def _send(self, job: LLMJob) -> Any:
+        import aiohttp
+
+        url, headers, payload = self.provider.build_request(job.model, job.message)
+        self.stats.requests += 1
+        try:
+            async with self._session.post(url, headers=headers, json=payload) as resp:
+                text = await resp.text()
+                status = resp.status
+                retry_after = _retry_after(resp.headers)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            raise _Retryable(str(exc) or type(exc).__name__) from exc
+
+        try:
+            data = json.loads(text)
+        except ValueError:
+            data = None
+        if status == 429:
+            # Straico también puede usar 429 para la cuota diaria: se revisa antes de reintentar
+            self.provider.parse_response(job.model, status, data, text)
+            raise _Throttled(retry_after)
+        if status >= 500:
+            raise _Retryable(f"status={status}")
+        return self.provider.parse_response(job.model, status, data, text)
+
+    async def _execute(self, job: LLMJob) -> LLMResult:
+        """
+        Envía una petición con reintentos y backoff.
+
+        Se llama con un lugar ya tomado en la concurrencia del modelo (ver
+        _acquire) y lo devuelve al terminar. Durante las esperas entre
+        reintentos el lugar se libera para no frenar al resto del modelo.
+        """
+        concurrency = self._concurrency(job.model)
+        start = time.monotonic()
+        attempts, throttles, failures = 0, 0, 0
+        try:
+            while True:
+                attempts += 1
+                try:
+                    response = await self._send(job)
+                    await concurrency.on_success()
+                    break
+                except _Throttled as exc:
+                    throttles += 1
+                    self.stats.throttled += 1
+                    concurrency.on_throttle()
+                    if throttles > self.max_throttles:
+                        response = {"error": "status=429", "response": f"{throttles} reintentos por límite de tasa"}
+                        break
+                    wait = exc.retry_after if exc.retry_after is not None else min(60.0, 2 ** min(throttles, 6))
+                    wait += random.random() * 0.1 * wait
+                    self._model_bucket(job.model).pause(wait)
+                except _Retryable as exc:
+                    failures += 1
+                    if failures > self.max_retries:
+                        response = {"error": str(exc)}
+                        break
+                    # Backoff exponencial con jitter (igual que los notebooks)
+                    wait = 2 ** (failures - 1) + random.random()
+
+                self.stats.retries += 1
+                await concurrency.release()
+                await asyncio.sleep(wait)
+                await self._acquire(job.model)
+        finally:
+            await concurrency.release()
+
+        result = LLMResult(job, response, attempts, throttles, time.monotonic() - start)
+        self.stats.completed += 1
+        if not result.ok:
+            self.stats.errors += 1
+        elif self.cache is not None:
+            self.cache.put(self.provider.name, job.model, job.template, job.message, response)
+        return result
+
+    async def complete(self, model: str, message: str, template: Optional[str] = None) -> Any:
+        """
+        Envía un solo mensaje respetando los límites (equivalente asíncrono de send_prompt).
+
+        La sesión queda abierta para las siguientes llamadas: usar dentro de
+        `async with engine:` o cerrar con `await engine.close()`.
+
+        Returns:
+            str con el contenido o dict {"error": ...}
+        """
+        job = LLMJob(model, message, template=template)
+        cached = self._cached(job)
+        if cached is not None:
+            return cached.response
+        await self.open()
+        await self._acquire(model)
+        return (await self._execute(job)).response
+
+    # -- muchas peticiones -----------------------------------------------
+
+    async def run(self, jobs: Iterable[LLMJob], on_result: Optional[Callable[[LLMResult], Any]] = None,
+                  progress_every: float = 0) -> List[LLMResult]:
+        """
+        Ejecuta todas las peticiones respetando cuotas y concurrencia.
+
+        Las peticiones se agrupan por modelo y cada modelo avanza en su propio
+        alimentador, de modo que un modelo lento o limitado no frena a los
+        demás. Sólo existen tantas tareas como peticiones en vuelo o en espera
+        de reintento.
+
+        Args:
+            jobs: Peticiones a enviar
+            on_result: Función llamada con cada LLMResult apenas termina (ej: guardar)
+            progress_every: Si > 0, imprime el progreso cada tantos segundos
+
+        Returns:
+            Lista de LLMResult en orden de finalización
+
+        Raises:
+            DailyAPILimitReached: Si el proveedor agotó la cuota diaria; los
+                resultados anteriores ya pasaron por on_result
+            Exception: El primer error de on_result (u otro inesperado), después
+                de esperar las peticiones en vuelo y sin enviar nuevas
+        """
+        owns_session = self._session is None
+        await self.open()
+        by_model: Dict[str, List[LLMJob]] = {}
+        for job in jobs:
+            by_model.setdefault(job.model, []).append(job)
+        total = sum(len(v) for v in by_model.values())
+
+        results: List[LLMResult] = []
+        in_flight = set()
+        # Errores distintos a la cuota diaria (ej: on_result no pudo guardar):
+        # se dejan de enviar peticiones y se relanzan al terminar las que están en vuelo
+        errors: List[Exception] = []
+
+        def deliver(result: LLMResult):
+            results.append(result)
+            if on_result is not None:
+                try:
+                    on_result(result)
+                except Exception as exc:
+                    errors.append(exc)
+
+        async def execute(job: LLMJob):
+            try:
+                result = await self._execute(job)
+            except DailyAPILimitReached as exc:
+                self._stop = exc
+                return
+            except Exception as exc:
+                errors.append(exc)
+                return
+            deliver(result)
+
+        async def feed(model_jobs: List[LLMJob]):
+            for job in model_jobs:
+                if self._stop is not None or errors:
+                    return
+                cached = self._cached(job)
+                if cached is not None:
+                    deliver(cached)
+                    continue
+                await self._acquire(job.model)
+                if self._stop is not None or errors:
+                    await self._concurrency(job.model).release()
+                    return
+                task = asyncio.ensure_future(execute(job))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+
+        async def report():
+            while True:
+                await asyncio.sleep(progress_every)
+                s = self.stats.as_dict()
+                print(f"\r[{s['completed']:,}/{total:,}] {s['items_per_sec']:.1f} items/s | "
+                      f"en vuelo: {len(in_flight)} | caché: {s['cached']} | 429: {s['throttled']} | "
+                      f"errores: {s['errors']}", end='', flush=True)
+
+        reporter = asyncio.ensure_future(report()) if progress_every > 0 else None
+        try:
+            await asyncio.gather(*(feed(v) for v in by_model.values()))
+            while in_flight:
+                await asyncio.gather(*list(in_flight), return_exceptions=True)
+        finally:
+            if reporter is not None:
+                reporter.cancel()
+                print()
+            if owns_session:
+                await self.close()
+
+        if errors:
+            if len(errors) > 1:
+                print(f"⚠ {len(errors)} errores durante la ejecución; se relanza el primero")
+            raise errors[0]
+        if self._stop is not None:
+            raise self._stop
+        return results
+
+
+def run_jobs(engine: LLMEngine, jobs: Iterable[LLMJob],
+             on_result: Optional[Callable[[LLMResult], Any]] = None, progress_every: float = 0) -> List[LLMResult]:
+    """
+    Versión síncrona de LLMEngine.run para scripts.
+
+    En Jupyter ya hay un event loop corriendo: ahí se usa `await engine.run(...)`.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(engine.run(jobs, on_result, progress_every))
+    raise RuntimeError("Hay un event loop activo (Jupyter): usa `await engine.run(jobs, ...)`")
+
+
+# ---------------------------------------------------------------------------
+# Servidor de prueba
+# ---------------------------------------------------------------------------
+
+class MockLLMServer:
+    """
+    Servidor HTTP local que imita Straico y Azure para probar el motor sin gastar créditos.
+
+    Responde en las mismas rutas y con el mismo formato que los proveedores
+    reales, con una latencia fija, un límite de peticiones por segundo por
+    modelo (devuelve 429 con Retry-After al excederlo) y, opcionalmente, el
+    error de cuota diaria de Straico después de N peticiones.
+
+    Uso:
+
+        async with MockLLMServer(rps_per_model=20) as server:
+            engine = LLMEngine(StraicoProvider('test', url=server.straico_url))
+            await engine.run(jobs)
+
+    Args:
+        latency: Segundos que tarda cada respuesta
+        rps_per_model: Peticiones por segundo aceptadas por modelo (None = sin límite)
+        retry_after: Valor del header Retry-After de los 429 (None = no se envía)
+        daily_limit: Peticiones aceptadas antes de responder el error de cuota diaria
+        responder: Función (modelo, mensaje) -> contenido (default: JSON de Prompt 1 con "Sí")
+        port: Puerto (0 = uno libre)
+    """
+
+    def __init__(self, latency: float = 0.05, rps_per_model: Optional[float] = None,
+                 retry_after: Optional[float] = 0.5, daily_limit: Optional[int] = None,
+                 responder: Optional[Callable[[str, str], str]] = None, port: int = 0):
+        self.latency = latency
+        self.rps_per_model = rps_per_model
+        self.retry_after = retry_after
+        self.daily_limit = daily_limit
+        self.responder = responder or (lambda model, message: '{"output": {"es_modismo": "Sí"}}')
+        self.port = port
+        self.requests = 0
+        self.accepted = 0
+        self.throttled = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._windows: Dict[str, List[float]] = {}
+        self._runner = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def straico_url(self) -> str:
+        return f"{self.base_url}/v1/prompt/completion"
+
+    def _over_limit(self, model: str) -> bool:
+        if not self.rps_per_model:
+            return False
+        now = time.monotonic()
+        window = [t for t in self._windows.get(model, []) if now - t < 1.0]
+        if len(window) >= self.rps_per_model:
+            self._windows[model] = window
+            return True
+        window.append(now)
+        self._windows[model] = window
+        return False
+
+    async def _handle(self, request, provider: str):
+        from aiohttp import web
+
+        body = await request.json()
+        if provider == 'straico':
+            model, message = body['models'][0], body['message']
+        else:
+            model, message = request.match_info['deployment'], body['messages'][-1]['content']
+
+        self.requests += 1
+        if self.daily_limit is not None and self.accepted >= self.daily_limit:
+            return web.json_response({"success": False, "error": "Daily API limit of spending coins has been reached"},
+                                     status=429)
+        if self._over_limit(model):
+            self.throttled += 1
+            headers = {'Retry-After': str(self.retry_after)} if self.retry_after is not None else None
+            return web.json_response({"error": "Too many requests"}, status=429, headers=headers)
+
+        self.accepted += 1
+        self._in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self._in_flight -= 1
+
+        content = self.responder(model, message)
+        choice = {"message": {"role": "assistant", "content": content}}
+        if provider == 'straico':
+            data = {"data": {"completions": {model: {"completion": {"choices": [choice]}}}}, "success": True}
+        else:
+            data = {"choices": [choice], "model": model}
+        return web.json_response(data)
+
+    async def start(self):
+        from aiohttp import web
+
+        async def straico(request):
+            return await self._handle(request, 'straico')
+
+        async def azure(request):
+            return await self._handle(request, 'azure')
+
+        app = web.Application()
+        app.router.add_post('/v1/prompt/completion', straico)
+        app.router.add_post('/openai/deployments/{deployment}/chat/completions', azure)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+
+async def _demo(n_items: int, n_models: int, rps_per_model: float):
+    """Corre el motor contra el servidor de prueba y muestra el resultado."""
+    async with MockLLMServer(latency=0.05, rps_per_model=rps_per_model) as server:
+        engine = LLMEngine(StraicoProvider('test', url=server.straico_url), max_concurrency=64)
+        jobs = [LLMJob(f"modelo/{j}", f"mensaje {i}", key=i) for j in range(n_models) for i in range(n_items)]
+        results = await engine.run(jobs, progress_every=1.0)
+        stats = engine.stats.as_dict()
+
+    print(f"Peticiones: {len(jobs):,} | completadas: {len(results):,} | errores: {stats['errors']}")
+    print(f"Tiempo: {stats['elapsed']:.1f}s | {stats['items_per_sec']:.1f} items/s "
+          f"(cota por cuota: {rps_per_model * n_models:.0f}/s)")
+    print(f"429 recibidos: {server.throttled} | concurrencia máxima en el servidor: {server.max_in_flight}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Prueba del motor contra un servidor local")
+    parser.add_argument('--items', type=int, default=200, help="Items por modelo")
+    parser.add_argument('--models', type=int, default=5, help="Número de modelos")
+    parser.add_argument('--rps', type=float, default=20, help="Peticiones por segundo por modelo en el servidor")
+    args = parser.parse_args()
+    asyncio.run(_demo(args.items, args.models, args.rps))
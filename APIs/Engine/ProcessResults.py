@@ -0,0 +1,423 @@
+"""
+Procesamiento de resultados a Results/Clean (la lógica de ProcessResults.ipynb como módulo)
+Cada archivo de modelo se lee una sola vez: registros limpios, errores, exclusión y estadísticas en una pasada
+"""
+
+import os
+import json
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from json.encoder import encode_basestring
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from Journal import sanitize_model_name
+
+
+APIS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+DEFAULT_OUTPUT_DIR = os.path.join(APIS_DIR, 'Results', 'Clean')
+
+DEFAULT_MODELS_FILE = os.path.join(APIS_DIR, 'Results', 'models.txt')
+
+# Directorios Results de cada proveedor; si un modelo está en varios gana el último (como all_models.json)
+DEFAULT_RESULTS_DIRS = (os.path.join(APIS_DIR, 'Straico', 'Results'), os.path.join(APIS_DIR, 'Azure', 'Results'))
+
+# Dataset de referencia de cada prompt (Prompt 1 no lo necesita: todos son modismos)
+GROUND_TRUTH = {
+    'Prompt 2': os.path.join(APIS_DIR, 'DataSet', 'DataSet_PrimeraOcurrencia.json'),
+    'Prompt 3': os.path.join(APIS_DIR, 'DataSet', 'DataSet_ConEjemplos.json'),
+}
+
+OUTPUT_FILES = {
+    'Prompt 1': 'prompt_1_metrics_data.json',
+    'Prompt 2': 'prompt_2_metrics_data.json',
+    'Prompt 3': 'prompt_3_metrics_data.json',
+}
+
+TITLES = {
+    'Prompt 1': 'Modismo → Es Modismo (Sí/No)',
+    'Prompt 2': 'Modismo → Definición',
+    'Prompt 3': 'Modismo + Ejemplo → Literal + Definición',
+}
+
+# Modelos con más de este porcentaje de errores no se incluyen en Clean/
+MAX_ERROR_PERCENTAGE = 50
+
+# Índice del ground truth en cada proceso del pool (se asigna en _init_worker)
+_INDEXES: Dict[str, Dict[str, Dict[str, str]]] = {}
+
+
+def load_models_from_file(filepath: str = DEFAULT_MODELS_FILE) -> List[str]:
+    """Carga los nombres de modelos desde un archivo de texto."""
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return [line.strip() for line in f if line.strip()]
+    except FileNotFoundError:
+        print(f"ERROR: No se encontró el archivo {filepath}")
+        return []
+
+
+def normalize_modismo(modismo: str) -> str:
+    """Clave normalizada de un modismo: minúsculas, sin tildes (conserva la ñ) y espacios colapsados."""
+    text = unicodedata.normalize('NFD', (modismo or '').casefold())
+    text = ''.join(c for i, c in enumerate(text)
+                   if not unicodedata.combining(c) or (c == '\u0303' and i and text[i - 1] == 'n'))
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+def build_ground_truth_index(json_path: str, full: bool = False) -> Dict[str, Dict[str, Any]]:
+    """
+    Índice hash del dataset de referencia.
+
+    Conserva la primera ocurrencia de cada modismo (igual que load_ground_truth
+    del notebook) bajo su clave exacta sin espacios y, si no choca con otra,
+    bajo su clave normalizada, para que variaciones de mayúsculas, tildes o
+    espacios en las respuestas encuentren su referencia.
+
+    Args:
+        json_path: Dataset de referencia
+        full: Conserva todos los campos del item (ej: región, Fuente), no sólo significado y ejemplo
+
+    Returns:
+        Dict {modismo: {significado, ejemplo}}
+    """
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    items = data.items() if isinstance(data, dict) else ((item.get('modismo'), item) for item in data)
+
+    index: Dict[str, Dict[str, str]] = {}
+    normalized: Dict[str, Dict[str, str]] = {}
+    for modismo, item in items:
+        modismo = (modismo or '').strip()
+        if not modismo or modismo in index:
+            continue
+        index[modismo] = {
+            **(item if full else {}),
+            'significado': (item.get('significado') or '').strip(),
+            'ejemplo': (item.get('ejemplo') or '').strip(),
+        }
+        normalized.setdefault(normalize_modismo(modismo), index[modismo])
+    for key, value in normalized.items():
+        index.setdefault(key, value)
+    return index
+
+
+def lookup(index: Dict[str, Dict[str, str]], modismo: str) -> Dict[str, str]:
+    """Referencia de un modismo: primero la clave exacta y luego la normalizada."""
+    modismo = (modismo or '').strip()
+    return index.get(modismo) or index.get(normalize_modismo(modismo)) or {}
+
+
+def extract_output_field(response: Dict, field: str) -> str:
+    """Extrae un campo del output de la respuesta del modelo.
+
+    Maneja múltiples formatos:
+    1. Formato directo: {"output": {"campo": "valor"}}
+    2. Formato raw_response: {"raw_response": "```json\\n{...}\\n```"}
+    3. Errores: {"error": "..."}
+
+    Args:
+        response: Dict con la respuesta completa
+        field: Campo a extraer del output
+
+    Returns:
+        Valor del campo como string, vacío si hay error o no se encuentra
+    """
+    try:
+        if not isinstance(response, dict):
+            return ''
+
+        # Verificar si hay error
+        if 'error' in response:
+            return ''
+
+        # Caso 1: Formato directo con output
+        output = response.get('output', {})
+        if isinstance(output, dict) and field in output:
+            return str(output.get(field, '')).strip()
+
+        # Caso 2: raw_response con JSON anidado
+        raw_response = response.get('raw_response', '')
+        if raw_response:
+            # Limpiar markdown code blocks
+            raw_response = raw_response.strip()
+            if raw_response.startswith('```json'):
+                raw_response = raw_response[7:]  # Remover ```json
+            if raw_response.startswith('```'):
+                raw_response = raw_response[3:]  # Remover ```
+            if raw_response.endswith('```'):
+                raw_response = raw_response[:-3]  # Remover ```
+
+            raw_response = raw_response.strip()
+
+            # Parsear el JSON anidado
+            try:
+                parsed = json.loads(raw_response)
+                if isinstance(parsed, dict):
+                    output = parsed.get('output', {})
+                    if isinstance(output, dict) and field in output:
+                        return str(output.get(field, '')).strip()
+            except json.JSONDecodeError:
+                return ''
+
+        return ''
+    except Exception as e:
+        print(f"⚠ Error extrayendo campo '{field}': {e}")
+        return ''
+
+
+def clean_record(prompt_name: str, model: str, entry: Dict[str, Any],
+                 index: Dict[str, Dict[str, str]]) -> Optional[Dict[str, str]]:
+    """
+    Registro limpio de una entrada, o None si la respuesta es un error.
+
+    Las respuestas que no son un dict, que tienen 'error' o de las que no se
+    extrae el campo esperado (en Prompt 3, ni sinonimo ni definicion) cuentan
+    como error.
+    """
+    modismo = entry.get('modismo', '')
+    response = entry.get('response', {})
+    if not isinstance(response, dict) or 'error' in response:
+        return None
+
+    if prompt_name == 'Prompt 1':
+        es_modismo_generado = extract_output_field(response, 'es_modismo')
+        if not es_modismo_generado:
+            return None
+        return {
+            'modismo': modismo,
+            'es_modismo_real': 'Sí',  # Todos los del dataset son modismos
+            'modelo': model,
+            'es_modismo_generado': es_modismo_generado,
+        }
+
+    if prompt_name == 'Prompt 2':
+        definicion_generada = extract_output_field(response, 'definicion')
+        if not definicion_generada:
+            return None
+        return {
+            'modismo': modismo,
+            'definicion_real': lookup(index, modismo).get('significado', ''),
+            'modelo': model,
+            'definicion_generada': definicion_generada,
+        }
+
+    # NOTA: El campo es 'sinonimo' no 'literal' en Prompt 3
+    literal_generado = extract_output_field(response, 'sinonimo')
+    definicion_generada = extract_output_field(response, 'definicion')
+    if not (literal_generado or definicion_generada):
+        return None
+    return {
+        'modismo': modismo,
+        'ejemplo': entry.get('ejemplo', ''),
+        'significado_real': lookup(index, modismo).get('significado', ''),
+        'modelo': model,
+        'literal_generado': literal_generado,
+        'definicion_generada': definicion_generada,
+    }
+
+
+def _init_worker(indexes: Dict[str, Dict[str, Dict[str, str]]]):
+    """Recibe los índices del ground truth una sola vez por proceso."""
+    _INDEXES.update(indexes)
+
+
+def _encode(value: Any) -> str:
+    return encode_basestring(value) if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+
+
+def _format_records(records: List[Dict[str, str]]) -> str:
+    """
+    Registros con el mismo formato que json.dump(..., indent=2) dentro de la lista.
+
+    Los registros son planos, así que cada valor se serializa por separado
+    (con el codificador en C) en lugar de usar el indentado en Python.
+    """
+    return ',\n'.join('  {\n' + ',\n'.join(f'    {_encode(key)}: {_encode(value)}' for key, value in record.items())
+                      + '\n  }' for record in records)
+
+
+def process_model(task: Tuple[str, str, str]) -> Dict[str, Any]:
+    """
+    Procesa el archivo de resultados de un modelo (se ejecuta en el pool).
+
+    Args:
+        task: (prompt, modelo, ruta del archivo)
+
+    Returns:
+        Dict con el modelo, total, errores, válidos y los registros ya
+        serializados ('chunk'), para que el proceso principal sólo los escriba
+    """
+    prompt_name, model, path = task
+    with open(path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    if isinstance(entries, dict):
+        # all_models.json: {modelo: [entradas]}
+        entries = entries.get(model, [])
+
+    index = _INDEXES.get(prompt_name, {})
+    records = []
+    errors = 0
+    for entry in entries:
+        record = clean_record(prompt_name, model, entry, index) if isinstance(entry, dict) else None
+        if record is None:
+            errors += 1
+        else:
+            records.append(record)
+
+    total = len(entries)
+    return {
+        'model': model,
+        'total': total,
+        'errors': errors,
+        'valid': len(records),
+        'error_percentage': (errors / total * 100) if total > 0 else 0,
+        'chunk': _format_records(records),
+    }
+
+
+def find_model_files(prompt_name: str, models: Sequence[str],
+                     base_dirs: Iterable[str] = DEFAULT_RESULTS_DIRS) -> Dict[str, str]:
+    """
+    Archivo de resultados de cada modelo para un prompt.
+
+    Straico guarda Results/Prompt N/<modelo>/<modelo>.json y Azure
+    Results/Prompt N/<modelo>_responses.json. Si un modelo aparece en más de
+    un directorio se usa el último, igual que al combinar en all_models.json.
+
+    Returns:
+        Dict {modelo: ruta} con los modelos encontrados
+    """
+    files = {}
+    for base_dir in base_dirs:
+        prompt_dir = os.path.join(base_dir, prompt_name)
+        for model in models:
+            safe_model = sanitize_model_name(model)
+            for path in (os.path.join(prompt_dir, safe_model, f"{safe_model}.json"),
+                         os.path.join(prompt_dir, f"{model}_responses.json")):
+                if os.path.exists(path):
+                    files[model] = path
+    return files
+
+
+def _stats_row(result: Dict[str, Any]) -> Dict[str, Any]:
+    total, valid = result['total'], result['valid']
+    return {
+        'Modelo': result['model'],
+        'Errores': result['errors'],
+        'Válidos': valid,
+        'Válidos/Total': f"{valid}/{total}",
+        '% Válidos': f"{(valid / total * 100):.1f}%" if total > 0 else "0.0%",
+    }
+
+
+def process_prompt(prompt_name: str, models: Optional[Sequence[str]] = None,
+                   base_dirs: Iterable[str] = DEFAULT_RESULTS_DIRS, output_dir: str = DEFAULT_OUTPUT_DIR,
+                   max_workers: Optional[int] = None, verbose: bool = True):
+    """
+    Genera Clean/prompt_N_metrics_data.json y la tabla de resultados de un prompt.
+
+    Cada modelo se procesa en un proceso del pool y los registros se escriben
+    en el orden de models a medida que llegan, de modo que en memoria sólo
+    están los de los modelos en curso.
+
+    Args:
+        prompt_name: 'Prompt 1', 'Prompt 2' o 'Prompt 3'
+        models: Modelos a incluir (default: Results/models.txt)
+        base_dirs: Directorios Results de cada proveedor
+        output_dir: Carpeta de salida (default: Results/Clean)
+        max_workers: Procesos del pool (default: número de CPUs)
+        verbose: Imprime el progreso y la tabla
+
+    Returns:
+        pandas.DataFrame con Modelo, Errores, Válidos, Válidos/Total y % Válidos
+    """
+    import pandas as pd
+
+    models = load_models_from_file() if models is None else list(models)
+    indexes = {prompt_name: build_ground_truth_index(GROUND_TRUTH[prompt_name])} if prompt_name in GROUND_TRUTH else {}
+    files = find_model_files(prompt_name, models, base_dirs)
+    tasks = [(prompt_name, model, files[model]) for model in models if model in files]
+    skipped_models = [model for model in models if model not in files]
+
+    if verbose:
+        print("=" * 60)
+        print(f"PROCESANDO {prompt_name.upper()}: {TITLES[prompt_name]}")
+        print("=" * 60)
+        for model in skipped_models:
+            print(f"⚠ Advertencia: Modelo {model} no encontrado en {prompt_name}")
+
+    if max_workers == 1 or len(tasks) <= 1:
+        _init_worker(indexes)
+        executor = None
+        results = map(process_model, tasks)
+    else:
+        executor = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(indexes,))
+        results = executor.map(process_model, tasks)
+
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(output_dir, OUTPUT_FILES[prompt_name])
+    stats = []
+    excluded_models = []
+    errors_count = records_count = 0
+    try:
+        with open(f"{output_path}.tmp", 'w', encoding='utf-8') as f:
+            f.write('[')
+            for result in results:
+                stats.append(_stats_row(result))
+                errors_count += result['errors']
+                model, errors, total = result['model'], result['errors'], result['total']
+                if result['error_percentage'] > MAX_ERROR_PERCENTAGE:
+                    excluded_models.append(model)
+                    if verbose:
+                        print(f"  {model}: EXCLUIDO ({errors}/{total} errores = {result['error_percentage']:.1f}%)")
+                    continue
+                if verbose and errors > 0:
+                    print(f"  {model}: {errors} errores omitidos ({result['error_percentage']:.1f}%)")
+                if result['chunk']:
+                    f.write(',\n' if records_count else '\n')
+                    f.write(result['chunk'])
+                    records_count += result['valid']
+            f.write('\n]' if records_count else ']')
+        os.replace(f"{output_path}.tmp", output_path)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    table = pd.DataFrame(stats, columns=['Modelo', 'Errores', 'Válidos', 'Válidos/Total', '% Válidos'])
+    if verbose:
+        print(f"✓ Guardado: {output_path} ({records_count} registros)")
+        print(f"\n✓ Procesados {records_count} registros válidos")
+        print(f"✗ Omitidos {errors_count} registros con errores")
+        if excluded_models:
+            print(f"⊗ Modelos excluidos (>{MAX_ERROR_PERCENTAGE}% errores): {', '.join(excluded_models)}")
+        if skipped_models:
+            print(f"⚠ Modelos no encontrados: {', '.join(skipped_models)}")
+        print(f"\nTABLA {prompt_name.upper()}: {TITLES[prompt_name]}")
+        print("=" * 80)
+        print(table.to_string(index=False))
+        print("=" * 80)
+    return table
+
+
+def process_all(prompts: Iterable[str] = tuple(OUTPUT_FILES), models: Optional[Sequence[str]] = None,
+                base_dirs: Iterable[str] = DEFAULT_RESULTS_DIRS, output_dir: str = DEFAULT_OUTPUT_DIR,
+                max_workers: Optional[int] = None, verbose: bool = True) -> Dict[str, Any]:
+    """
+    Regenera Clean/ para todos los prompts.
+
+    Returns:
+        Dict {prompt: DataFrame de estadísticas}
+    """
+    start = time.time()
+    models = load_models_from_file() if models is None else list(models)
+    tables = {prompt_name: process_prompt(prompt_name, models, base_dirs, output_dir, max_workers, verbose)
+              for prompt_name in prompts}
+    if verbose:
+        print(f"\n✓ Procesamiento completado ({time.time() - start:.1f}s)")
+    return tables
+
+
+if __name__ == "__main__":
+    process_all()
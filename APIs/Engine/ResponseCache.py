@@ -0,0 +1,200 @@
+"""
+Caché local de respuestas de LLMs direccionada por contenido (SQLite)
+Evita pagar dos veces la misma petición: (proveedor, modelo, hash del template, prompt renderizado)
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, Iterable, Optional
+
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Cache', 'responses.sqlite')
+
+
+def template_hash(template: Optional[str]) -> str:
+    """Versión de un template: SHA-1 de su texto (cambia con cualquier edición de prompts.py)."""
+    if not template:
+        return ''
+    return hashlib.sha1(template.encode('utf-8')).hexdigest()
+
+
+def _cache_key(provider: str, model: str, template_version: str, rendered: str) -> bytes:
+    payload = '\x00'.join((provider, model, template_version, rendered))
+    return hashlib.sha256(payload.encode('utf-8')).digest()
+
+
+def _is_error(response: Any) -> bool:
+    return isinstance(response, dict) and 'error' in response
+
+
+class ResponseCache:
+    """
+    Respuestas ya obtenidas, indexadas por el contenido exacto de la petición.
+
+    La clave es SHA-256 de (proveedor, modelo, hash del template, prompt
+    renderizado), así que una misma petición repetida entre corridas,
+    notebooks o después de clear_checkpoints se responde sin red. Sólo se
+    guardan respuestas exitosas: los errores se vuelven a intentar.
+
+    Cada template se registra con un nombre (ej: 'prompt_1'); cuando su texto
+    cambia en prompts.py, sync_templates borra las respuestas de la versión
+    anterior.
+
+    Es seguro usarla desde varios hilos y desde el event loop de LLMEngine.
+
+    Args:
+        path: Archivo SQLite (default: APIs/Cache/responses.sqlite)
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key BLOB PRIMARY KEY,
+                provider TEXT NOT NULL,
+                model TEXT NOT NULL,
+                template_hash TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_template ON responses (template_hash);
+            CREATE INDEX IF NOT EXISTS responses_model ON responses (provider, model);
+            CREATE TABLE IF NOT EXISTS templates (
+                name TEXT PRIMARY KEY,
+                template_hash TEXT NOT NULL,
+                updated REAL NOT NULL
+            );
+        """)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, provider: str, model: str, template: Optional[str], rendered: str) -> Optional[Any]:
+        """
+        Respuesta guardada para una petición, o None si no está.
+
+        Args:
+            provider: Nombre del proveedor (ej: 'straico')
+            model: Modelo
+            template: Template sin renderizar (ej: prompt_1), o None
+            rendered: Mensaje enviado
+        """
+        key = _cache_key(provider, model, template_hash(template), rendered)
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, provider: str, model: str, template: Optional[str], rendered: str, response: Any) -> bool:
+        """
+        Guarda una respuesta (str o dict). Los errores no se guardan.
+
+        Returns:
+            True si se guardó
+        """
+        if _is_error(response):
+            return False
+        version = template_hash(template)
+        key = _cache_key(provider, model, version, rendered)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, provider, model, version, json.dumps(response, ensure_ascii=False), time.time()))
+        return True
+
+    def sync_templates(self, templates: Dict[str, str]) -> int:
+        """
+        Registra la versión actual de cada template y borra las respuestas de versiones anteriores.
+
+        Args:
+            templates: {nombre: texto} (ej: el PROMPTS de los notebooks)
+
+        Returns:
+            Número de respuestas borradas
+        """
+        removed = 0
+        with self._lock:
+            for name, template in templates.items():
+                version = template_hash(template)
+                row = self._conn.execute("SELECT template_hash FROM templates WHERE name = ?", (name,)).fetchone()
+                if row is not None and row[0] != version:
+                    removed += self._conn.execute("DELETE FROM responses WHERE template_hash = ?",
+                                                  (row[0],)).rowcount
+                self._conn.execute("INSERT OR REPLACE INTO templates VALUES (?, ?, ?)", (name, version, time.time()))
+        return removed
+
+    def evict(self, provider: Optional[str] = None, model: Optional[str] = None,
+              older_than_days: Optional[float] = None) -> int:
+        """
+        Borra respuestas por proveedor, modelo y/o antigüedad (sin filtros borra todo).
+
+        Returns:
+            Número de respuestas borradas
+        """
+        conditions, params = [], []
+        if provider is not None:
+            conditions.append("provider = ?")
+            params.append(provider)
+        if model is not None:
+            conditions.append("model = ?")
+            params.append(model)
+        if older_than_days is not None:
+            conditions.append("created < ?")
+            params.append(time.time() - older_than_days * 86400)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock:
+            return self._conn.execute(f"DELETE FROM responses{where}", params).rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        """Aciertos y fallos de esta sesión, y respuestas guardadas por modelo."""
+        with self._lock:
+            by_model = dict(self._conn.execute(
+                "SELECT provider || ':' || model, COUNT(*) FROM responses GROUP BY provider, model").fetchall())
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': sum(by_model.values()), 'by_model': by_model,
+                'size_mb': os.path.getsize(self.path) / 1024 / 1024 if os.path.exists(self.path) else 0.0}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def warm_from_results(cache: ResponseCache, provider: str, template: str, entries: Iterable[Dict[str, Any]],
+                      render: Any) -> int:
+    """
+    Carga en la caché las respuestas de resultados ya guardados (ej: un <modelo>.json).
+
+    Args:
+        cache: Caché destino
+        provider: Proveedor de las respuestas
+        template: Template con el que se generaron
+        entries: Entradas {"modismo", "model", "response", ...}
+        render: Función entry -> mensaje renderizado (la misma usada al enviar)
+
+    Returns:
+        Número de respuestas cargadas
+    """
+    loaded = 0
+    for entry in entries:
+        response = entry.get('response')
+        # Las respuestas se guardaron parseadas: se cachea el texto equivalente
+        if isinstance(response, dict) and 'raw_response' in response:
+            response = response['raw_response']
+        elif isinstance(response, dict) and not _is_error(response):
+            response = json.dumps(response, ensure_ascii=False)
+        if cache.put(provider, entry['model'], template, render(entry), response):
+            loaded += 1
+    return loaded
@@ -0,0 +1,485 @@
+"""
+Parser tolerante de las respuestas de los LLMs (esquema output.es_modismo / definicion / sinonimo)
+Funciona sobre texto completo, sobre tokens en streaming y en lote sobre Results/Prompt N/*/*.json
+"""
+
+import os
+import re
+import json
+import glob
+import unicodedata
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+# Campos de salida de cada prompt
+OUTPUT_FIELDS = {
+    'prompt_1': ('es_modismo',),
+    'prompt_2': ('definicion',),
+    'prompt_3': ('sinonimo', 'definicion'),
+}
+
+# Carpeta de resultados -> prompt
+PROMPT_DIRS = {'Prompt 1': 'prompt_1', 'Prompt 2': 'prompt_2', 'Prompt 3': 'prompt_3'}
+
+# Clasificación de cada respuesta:
+#   ok:            salida válida (repaired=True si hubo que repararla)
+#   api_error:     la petición falló ({"error": ...})
+#   no_json:       texto sin JSON (ej: el modelo pide el input o se niega)
+#   truncated:     el JSON empieza pero no termina y faltan campos
+#   malformed:     JSON inválido del que no se pudieron rescatar los campos
+#   schema:        JSON válido sin los campos del prompt
+#   invalid_value: campos presentes con un valor fuera del esquema (ej: es_modismo="Tal vez")
+STATUSES = ('ok', 'api_error', 'no_json', 'truncated', 'malformed', 'schema', 'invalid_value')
+
+# Estados que se deben volver a pedir
+REQUEUE_STATUSES = ('api_error', 'no_json', 'truncated', 'malformed', 'schema', 'invalid_value')
+
+_ES_MODISMO = {'sí': 'Sí', 'si': 'Sí', 'no': 'No'}
+_OPEN = re.compile(r"[\[{]")
+
+
+@dataclass
+class ParsedResponse:
+    """Resultado de interpretar una respuesta."""
+    status: str
+    fields: Dict[str, str] = field(default_factory=dict)
+    repaired: bool = False
+    detail: str = ''
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 'ok'
+
+
+# ---------------------------------------------------------------------------
+# Validación
+# ---------------------------------------------------------------------------
+
+def _normalize_key(key: str) -> str:
+    """Clave sin tildes ni mayúsculas: "Definición" -> "definicion"."""
+    decomposed = unicodedata.normalize('NFKD', key.strip())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def _normalize_es_modismo(value: str) -> Optional[str]:
+    return _ES_MODISMO.get(value.strip().strip('.').strip().lower())
+
+
+def validate_output(output: Any, prompt_name: str) -> ParsedResponse:
+    """
+    Valida el objeto "output" de un prompt.
+
+    Las claves se aceptan con tildes o mayúsculas ("definición"),
+    es_modismo se normaliza a "Sí"/"No" (acepta "si", "SÍ", "No.") y los
+    textos deben ser no vacíos y distintos del placeholder del template.
+    """
+    if not isinstance(output, dict):
+        return ParsedResponse('schema', detail='output no es un objeto')
+    fields = {}
+    repaired = False
+    for name in OUTPUT_FIELDS[prompt_name]:
+        value = output.get(name)
+        if value is None:
+            value = next((v for k, v in output.items() if isinstance(k, str) and _normalize_key(k) == name), None)
+            repaired = value is not None or repaired
+        if value is None:
+            return ParsedResponse('schema', detail=f'falta {name}')
+        if not isinstance(value, str):
+            value = str(value)
+        value = value.strip()
+        if name == 'es_modismo':
+            normalized = _normalize_es_modismo(value)
+            if normalized is None:
+                return ParsedResponse('invalid_value', detail=f'es_modismo={value[:40]!r}')
+            value = normalized
+        elif not value or (value.startswith('<') and value.endswith('>')):
+            return ParsedResponse('invalid_value', detail=f'{name} vacío')
+        fields[name] = value
+    return ParsedResponse('ok', fields, repaired=repaired)
+
+
+def _from_json(data: Any, prompt_name: str) -> ParsedResponse:
+    """Valida un valor JSON ya decodificado, reparando las variantes conocidas."""
+    repaired = False
+    if isinstance(data, list):
+        # Algunas respuestas vienen envueltas en un arreglo de un elemento
+        data = next((d for d in data if isinstance(d, dict)), None)
+        repaired = True
+    if not isinstance(data, dict):
+        return ParsedResponse('schema', detail='no es un objeto')
+    if 'error' in data and 'output' not in data:
+        return ParsedResponse('api_error', detail=str(data['error'])[:200])
+
+    output = data.get('output')
+    if isinstance(output, list):
+        output = next((o for o in output if isinstance(o, dict)), None)
+        repaired = True
+    if not isinstance(output, dict):
+        # Campos en el nivel superior: {"es_modismo": "Sí"}
+        keys = {_normalize_key(k) for k in data if isinstance(k, str)}
+        if any(name in keys for name in OUTPUT_FIELDS[prompt_name]):
+            output, repaired = data, True
+    parsed = validate_output(output, prompt_name)
+    parsed.repaired = parsed.ok and (repaired or parsed.repaired)
+    return parsed
+
+
+# ---------------------------------------------------------------------------
+# Escáner incremental
+# ---------------------------------------------------------------------------
+
+class StreamingParser:
+    """
+    Parser incremental para respuestas en streaming.
+
+    feed() recibe los fragmentos a medida que llegan y avanza sólo sobre el
+    texto nuevo (costo lineal en total). Ignora el texto antes del primer
+    '{' o '[' (prosa, ```json), sigue el anidamiento y las cadenas, y captura
+    los campos del esquema en cuanto se cierra su valor, de modo que se
+    puede usar la respuesta (o cortar el stream) sin esperar al final.
+    close() devuelve el ParsedResponse definitivo.
+
+    Args:
+        prompt_name: 'prompt_1', 'prompt_2' o 'prompt_3'
+    """
+
+    def __init__(self, prompt_name: str):
+        self.prompt_name = prompt_name
+        self._wanted = set(OUTPUT_FIELDS[prompt_name])
+        self._chunks: List[str] = []
+        self.fields: Dict[str, str] = {}
+        self.started = False
+        self.complete = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string: List[str] = []
+        self._last_string: Optional[str] = None
+        self._key: Optional[str] = None
+
+    @property
+    def text(self) -> str:
+        return ''.join(self._chunks)
+
+    def feed(self, chunk: str) -> Dict[str, str]:
+        """
+        Agrega un fragmento.
+
+        Returns:
+            Campos del esquema completos hasta ahora
+        """
+        self._chunks.append(chunk)
+        if self.complete:
+            return self.fields
+        for ch in chunk:
+            if not self.started:
+                if ch in '{[':
+                    self.started = True
+                    self._depth = 1
+                continue
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    self._string.append(ch)
+                elif ch == '\\':
+                    self._escape = True
+                    self._string.append(ch)
+                elif ch == '"':
+                    self._in_string = False
+                    self._close_string(''.join(self._string))
+                else:
+                    self._string.append(ch)
+            elif ch == '"':
+                self._in_string = True
+                self._string = []
+            elif ch == ':':
+                self._key = self._last_string
+            elif ch == ',':
+                self._key = None
+                self._last_string = None
+            elif ch in '{[':
+                self._depth += 1
+                self._key = None
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    self.complete = True
+                    break
+            elif not ch.isspace():
+                self._last_string = None
+        return self.fields
+
+    def _close_string(self, raw: str):
+        if self._key is not None:
+            # Es un valor: "<clave>": "<valor>"
+            key = _normalize_key(self._key)
+            if key in self._wanted:
+                try:
+                    self.fields[key] = json.loads(f'"{raw}"')
+                except ValueError:
+                    self.fields[key] = raw
+            self._key = None
+            self._last_string = None
+        else:
+            self._last_string = raw
+
+    def close(self) -> ParsedResponse:
+        """Interpreta el texto completo recibido."""
+        return parse_text(self.text, self.prompt_name, scanner=self)
+
+
+# ---------------------------------------------------------------------------
+# Texto completo
+# ---------------------------------------------------------------------------
+
+def _json_values(text: str) -> Iterable[Tuple[int, Any]]:
+    """(posición, valor) de cada valor JSON completo del texto, de izquierda a derecha."""
+    decoder = json.JSONDecoder()
+    pos = 0
+    while True:
+        match = _OPEN.search(text, pos)
+        if match is None:
+            return
+        try:
+            value, end = decoder.raw_decode(text, match.start())
+        except ValueError:
+            pos = match.start() + 1
+            continue
+        yield match.start(), value
+        pos = end
+
+
+def extract_json(text: str) -> Any:
+    """
+    Primer valor JSON completo del texto (admite ```json``` y prosa antes o después).
+
+    Raises:
+        ValueError: si no hay ningún valor JSON decodificable
+    """
+    for _, value in _json_values(text):
+        return value
+    raise ValueError("sin JSON")
+
+
+def _salvage(text: str, prompt_name: str) -> Dict[str, str]:
+    """Campos rescatados con expresiones regulares de un JSON inválido (ej: "es_modismo: Sí")."""
+    fields = {}
+    if prompt_name == 'prompt_1':
+        match = re.search(r'"?es_modismo"?\s*:\s*"?\s*(S[íi]|SÍ|No|NO)\b', text, re.I)
+        if match:
+            fields['es_modismo'] = match.group(1)
+    for key, value in re.findall(r'"([^"\n]{1,40})"\s*:\s*"((?:[^"\\]|\\.)+)"', text):
+        key = _normalize_key(key)
+        if key in OUTPUT_FIELDS[prompt_name] and key not in fields:
+            fields[key] = value
+    return fields
+
+
+def parse_text(text: str, prompt_name: str, scanner: Optional[StreamingParser] = None) -> ParsedResponse:
+    """
+    Interpreta el contenido devuelto por un modelo.
+
+    Args:
+        text: Contenido (choices[0].message.content o raw_response)
+        prompt_name: 'prompt_1', 'prompt_2' o 'prompt_3'
+        scanner: StreamingParser que ya recorrió el texto (evita recorrerlo de nuevo)
+
+    Returns:
+        ParsedResponse clasificado
+    """
+    stripped = text.strip()
+    if not stripped:
+        return ParsedResponse('no_json', detail='vacío')
+
+    # Valores JSON completos: primero el más externo; si no sirve, los anidados
+    first = _OPEN.search(stripped)
+    outer = None
+    for start, value in _json_values(stripped):
+        parsed = _from_json(value, prompt_name)
+        if parsed.ok:
+            # Bloque ```json```, prosa alrededor u objeto anidado: se aceptó, pero hubo que buscarlo
+            parsed.repaired = parsed.repaired or start != 0
+            return parsed
+        if start == first.start():
+            outer = parsed
+    if outer is not None:
+        return outer
+
+    if scanner is None:
+        scanner = StreamingParser(prompt_name)
+        scanner.feed(stripped)
+
+    # Prompt 1: respuesta de una palabra ("Sí", "No.")
+    if prompt_name == 'prompt_1' and not scanner.started:
+        value = _normalize_es_modismo(stripped)
+        if value is not None:
+            return ParsedResponse('ok', {'es_modismo': value}, repaired=True)
+        return ParsedResponse('no_json', detail=stripped[:80])
+    if not scanner.started:
+        return ParsedResponse('no_json', detail=stripped[:80])
+
+    fields = {**_salvage(stripped, prompt_name), **scanner.fields}
+    if all(name in fields for name in OUTPUT_FIELDS[prompt_name]):
+        parsed = validate_output(fields, prompt_name)
+        parsed.repaired = parsed.ok
+        if not parsed.ok:
+            parsed.status = 'malformed' if scanner.complete else 'truncated'
+        return parsed
+    if not scanner.complete:
+        return ParsedResponse('truncated', fields, detail=f'{len(stripped)} caracteres')
+    return ParsedResponse('malformed', fields, detail=stripped[:80])
+
+
+def parse_stored(response: Any, prompt_name: str) -> ParsedResponse:
+    """
+    Interpreta un 'response' guardado por los notebooks.
+
+    Admite las formas que quedaron en Results: {"input", "output"},
+    {"raw_response": "..."}, {"error": ...}, los campos sin "output", una
+    lista con el objeto y un str suelto.
+    """
+    if isinstance(response, dict):
+        if 'error' in response:
+            return ParsedResponse('api_error', detail=str(response['error'])[:200])
+        if 'raw_response' in response:
+            return parse_text(str(response['raw_response']), prompt_name)
+        return _from_json(response, prompt_name)
+    if isinstance(response, list):
+        return _from_json(response, prompt_name)
+    if isinstance(response, str):
+        return parse_text(response, prompt_name)
+    return ParsedResponse('schema', detail=type(response).__name__)
+
+
+# ---------------------------------------------------------------------------
+# Modo en lote
+# ---------------------------------------------------------------------------
+
+# Columnas de la tabla normalizada
+TABLE_COLUMNS = ('provider', 'prompt', 'model', 'modismo', 'ejemplo', 'status', 'repaired',
+                 'es_modismo', 'definicion', 'sinonimo', 'detail')
+
+
+def _locate(path: str) -> Tuple[str, str]:
+    """(proveedor, carpeta del prompt) de un archivo de resultados."""
+    parts = os.path.normpath(os.path.abspath(path)).split(os.sep)
+    prompt_dir = next(p for p in reversed(parts) if p in PROMPT_DIRS)
+    index = parts.index('Results') if 'Results' in parts else 1
+    return parts[index - 1], prompt_dir
+
+
+def parse_results_file(path: str) -> Dict[str, List[Any]]:
+    """
+    Interpreta todas las entradas de un archivo de resultados.
+
+    Returns:
+        Dict de columnas (TABLE_COLUMNS) con una fila por entrada
+    """
+    provider, prompt_dir = _locate(path)
+    prompt_name = PROMPT_DIRS[prompt_dir]
+    default_model = os.path.basename(os.path.dirname(path)) if os.path.basename(os.path.dirname(path)) \
+        not in PROMPT_DIRS else os.path.splitext(os.path.basename(path))[0].replace('_responses', '')
+
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        # all_models.json: {modelo: [entradas]}
+        entries = [e for v in data.values() if isinstance(v, list) for e in v]
+    else:
+        entries = data
+
+    columns: Dict[str, List[Any]] = {name: [] for name in TABLE_COLUMNS}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        parsed = parse_stored(entry.get('response'), prompt_name)
+        columns['provider'].append(provider)
+        columns['prompt'].append(prompt_dir)
+        columns['model'].append(entry.get('model') or default_model)
+        columns['modismo'].append(entry.get('modismo', ''))
+        columns['ejemplo'].append(entry.get('ejemplo'))
+        columns['status'].append(parsed.status)
+        columns['repaired'].append(parsed.repaired)
+        for name in ('es_modismo', 'definicion', 'sinonimo'):
+            columns[name].append(parsed.fields.get(name))
+        columns['detail'].append(parsed.detail)
+    return columns
+
+
+def find_results_files(base_dirs: Iterable[str], prompts: Iterable[str] = tuple(PROMPT_DIRS)) -> List[str]:
+    """
+    Archivos de resultados por modelo de uno o más directorios Results.
+
+    Straico guarda Results/Prompt N/<modelo>/<modelo>.json y Azure
+    Results/Prompt N/<modelo>_responses.json; no se incluyen all_models.json,
+    checkpoint.json ni los temporales.
+    """
+    files = []
+    for base_dir in base_dirs:
+        for prompt in prompts:
+            prompt_dir = os.path.join(base_dir, prompt)
+            files += glob.glob(os.path.join(glob.escape(prompt_dir), '*', '*.json'))
+            files += glob.glob(os.path.join(glob.escape(prompt_dir), '*_responses.json'))
+    return sorted(f for f in files if os.path.basename(f) not in ('all_models.json', 'checkpoint.json'))
+
+
+def parse_results(base_dirs: Iterable[str], prompts: Iterable[str] = tuple(PROMPT_DIRS),
+                  max_workers: Optional[int] = None, verbose: bool = True):
+    """
+    Reinterpreta en paralelo todos los resultados y los une en una tabla columnar.
+
+    Cada archivo se procesa en un proceso del pool y devuelve columnas; la
+    tabla final tiene provider/prompt/model/status como categorías.
+
+    Args:
+        base_dirs: Directorios Results (ej: ['../Straico/Results', '../Azure/Results'])
+        prompts: Carpetas de prompt a incluir
+        max_workers: Procesos del pool (default: número de CPUs)
+        verbose: Imprime el resumen por estado
+
+    Returns:
+        pandas.DataFrame con TABLE_COLUMNS
+    """
+    import pandas as pd
+
+    files = find_results_files(base_dirs, prompts)
+    columns: Dict[str, List[Any]] = {name: [] for name in TABLE_COLUMNS}
+    if max_workers == 1 or len(files) <= 1:
+        parts = map(parse_results_file, files)
+        for part in parts:
+            for name in TABLE_COLUMNS:
+                columns[name].extend(part[name])
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for part in executor.map(parse_results_file, files):
+                for name in TABLE_COLUMNS:
+                    columns[name].extend(part[name])
+
+    table = pd.DataFrame(columns, columns=list(TABLE_COLUMNS))
+    for name in ('provider', 'prompt', 'model'):
+        table[name] = table[name].astype('category')
+    table['status'] = pd.Categorical(table['status'], categories=STATUSES)
+
+    if verbose:
+        print(f"Archivos: {len(files)} | respuestas: {len(table):,}")
+        print(table.groupby(['prompt', 'status'], observed=True).size().unstack(fill_value=0).to_string())
+    return table
+
+
+def requeue_items(table) -> Dict[Tuple[str, str, str], List[str]]:
+    """
+    Items a volver a pedir, por (proveedor, prompt, modelo).
+
+    Sólo incluye los estados de REQUEUE_STATUSES y descarta los items que
+    tienen además una respuesta válida (ej: se reintentaron con éxito).
+    """
+    ok = set(zip(*(table.loc[table['status'] == 'ok', c] for c in ('provider', 'prompt', 'model', 'modismo'))))
+    failed = table[table['status'].isin(REQUEUE_STATUSES)]
+    pending: Dict[Tuple[str, str, str], List[str]] = {}
+    for provider, prompt, model, modismo in zip(failed['provider'], failed['prompt'], failed['model'],
+                                                failed['modismo']):
+        if (provider, prompt, model, modismo) not in ok:
+            pending.setdefault((provider, prompt, model), []).append(modismo)
+    return pending
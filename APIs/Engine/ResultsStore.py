@@ -0,0 +1,417 @@
+"""
+Almacén columnar de resultados (Parquet/Arrow) particionado por proveedor, prompt y modelo
+Reemplaza los all_models.json: cada análisis lee sólo las columnas y particiones que necesita
+"""
+
+import os
+import json
+import time
+import hashlib
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from ResponseParser import PROMPT_DIRS, TABLE_COLUMNS, find_results_files, parse_results_file
+from Journal import sanitize_model_name
+from ProcessResults import MAX_ERROR_PERCENTAGE, build_ground_truth_index, clean_record, lookup
+
+
+APIS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+DEFAULT_STORE_DIR = os.path.join(APIS_DIR, 'Results', 'Store')
+
+DEFAULT_RESULTS_DIRS = (os.path.join(APIS_DIR, 'Straico', 'Results'), os.path.join(APIS_DIR, 'Azure', 'Results'))
+
+# Dataset de referencia de cada prompt (el mismo que usa ProcessResults)
+REFERENCE_DATASETS = {
+    'Prompt 1': os.path.join(APIS_DIR, 'DataSet', 'DataSet_PrimeraOcurrencia.json'),
+    'Prompt 2': os.path.join(APIS_DIR, 'DataSet', 'DataSet_PrimeraOcurrencia.json'),
+    'Prompt 3': os.path.join(APIS_DIR, 'DataSet', 'DataSet_ConEjemplos.json'),
+}
+
+# Campos de ProcessResults.clean_record (sin normalizar) que usa metrics_data
+CLEAN_FIELDS = ('es_modismo', 'definicion', 'sinonimo')
+
+# Columnas del almacén: las de ResponseParser, la referencia del dataset y, por fila, su
+# posición en el archivo y el registro limpio de ProcessResults (clean=False si es un error)
+STORE_COLUMNS = TABLE_COLUMNS + ('significado', 'region', 'source', 'row', 'clean') \
+    + tuple(f'clean_{name}' for name in CLEAN_FIELDS)
+
+# Versión del esquema: las particiones de una versión anterior se reconvierten en build()
+SCHEMA_VERSION = 3
+
+PARTITIONS = ('provider', 'prompt', 'model_dir')
+
+MANIFEST_FILE = 'manifest.json'
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise ImportError("ResultsStore requiere pyarrow: pip install pyarrow") from e
+
+
+def _part_name(source: str) -> str:
+    """Archivo Parquet de un archivo de resultados: dos fuentes del mismo modelo no se pisan."""
+    return f"part-{hashlib.sha1(os.path.abspath(source).encode('utf-8')).hexdigest()[:16]}.parquet"
+
+
+def _signature(path: str) -> List[float]:
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime]
+
+
+def _load_references(prompt_dir: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Primera ocurrencia de cada modismo en el dataset de referencia del prompt.
+
+    Se indexa como build_ground_truth_index de ProcessResults (clave exacta y
+    normalizada), para que lookup() encuentre los mismos items.
+    """
+    return build_ground_truth_index(REFERENCE_DATASETS[prompt_dir], full=True)
+
+
+def _build_partition(path: str) -> Dict[str, List[Any]]:
+    """
+    Columnas de un archivo de resultados (se ejecuta en el pool).
+
+    Además de la interpretación de ResponseParser, cada fila guarda el
+    registro de ProcessResults.clean_record con los mismos criterios y
+    valores que Clean/prompt_N_metrics_data.json.
+    """
+    columns = parse_results_file(path)
+    for name in STORE_COLUMNS[len(TABLE_COLUMNS):]:
+        columns[name] = []
+    if not columns['prompt']:
+        return columns
+
+    prompt_dir = columns['prompt'][0]
+    references = _load_references(prompt_dir)
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    entries = [e for v in data.values() if isinstance(v, list) for e in v] if isinstance(data, dict) else data
+    # parse_results_file omite las entradas que no son dict: se recorren en el mismo orden
+    entries = [entry for entry in entries if isinstance(entry, dict)]
+
+    for row, (entry, model) in enumerate(zip(entries, columns['model'])):
+        item = lookup(references, entry.get('modismo', ''))
+        columns['significado'].append(item.get('significado', '') if item else None)
+        columns['region'].append(item.get('región'))
+        columns['source'].append(item.get('Fuente'))
+        columns['row'].append(row)
+        record = clean_record(prompt_dir, model, entry, references)
+        columns['clean'].append(record is not None)
+        record = record or {}
+        columns['clean_es_modismo'].append(record.get('es_modismo_generado'))
+        columns['clean_definicion'].append(record.get('definicion_generada'))
+        columns['clean_sinonimo'].append(record.get('literal_generado'))
+    return columns
+
+
+class ResultsStore:
+    """
+    Resultados de todos los proveedores en un dataset Parquet particionado.
+
+    Estructura (particiones estilo Hive):
+
+        Store/provider=Straico/prompt=Prompt 1/model_dir=openai_gpt_4_1/part-<hash>.parquet
+
+    Cada archivo de resultados (<modelo>.json o <modelo>_responses.json) se
+    convierte en un archivo Parquet, nombrado por el hash de su ruta, dentro
+    de la partición de su modelo, con una fila por respuesta: la salida ya
+    interpretada por ResponseParser (status, es_modismo, definicion,
+    sinonimo...) y la referencia del dataset (significado, region, source).
+    Las filas se ordenan por source y region para que las estadísticas de
+    los row groups permitan descartar bloques al filtrar.
+
+    build() sólo reconvierte los archivos que cambiaron desde la última vez
+    (tamaño y fecha en manifest.json) y borra los Parquet cuyo archivo de
+    resultados ya no existe. load() filtra por proveedor, prompt y
+    modelo a nivel de partición (no abre los demás archivos) y por region y
+    source dentro del escaneo, leyendo sólo las columnas pedidas.
+
+    Args:
+        root: Directorio del almacén (default: APIs/Results/Store)
+    """
+
+    def __init__(self, root: str = DEFAULT_STORE_DIR):
+        _require_pyarrow()
+        self.root = root
+        self.manifest_path = os.path.join(root, MANIFEST_FILE)
+
+    # -- escritura -----------------------------------------------------------
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {}
+
+    def _partition_dir(self, provider: str, prompt: str, model_dir: str) -> str:
+        return os.path.join(self.root, f"provider={provider}", f"prompt={prompt}", f"model_dir={model_dir}")
+
+    def _write_partition(self, columns: Dict[str, List[Any]], source: str) -> str:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.table({name: columns[name] for name in STORE_COLUMNS if name not in ('provider', 'prompt')},
+                         schema=_schema())
+        table = table.sort_by([('source', 'ascending'), ('region', 'ascending')])
+        model = columns['model'][0]
+        directory = self._partition_dir(columns['provider'][0], columns['prompt'][0], sanitize_model_name(model))
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, _part_name(source))
+        pq.write_table(table, path + '.tmp', compression='zstd', row_group_size=2048)
+        os.replace(path + '.tmp', path)
+        return path
+
+    def _prune(self, manifest: Dict[str, Any]) -> int:
+        """
+        Quita del manifest los archivos de resultados borrados (y las entradas
+        de otra versión del esquema) y elimina los Parquet que ya no
+        corresponden a ninguna entrada, junto con las particiones vacías.
+
+        Returns:
+            Número de archivos Parquet eliminados
+        """
+        for source in [source for source, entry in manifest.items()
+                       if not os.path.exists(source) or entry.get('schema') != SCHEMA_VERSION]:
+            del manifest[source]
+        keep = {os.path.abspath(entry['file']) for entry in manifest.values()}
+
+        removed = 0
+        for directory, _, filenames in os.walk(self.root, topdown=False):
+            for filename in filenames:
+                path = os.path.abspath(os.path.join(directory, filename))
+                if filename.endswith('.parquet') and path not in keep:
+                    os.remove(path)
+                    removed += 1
+            if directory != self.root and not os.listdir(directory):
+                os.rmdir(directory)
+        return removed
+
+    def build(self, base_dirs: Iterable[str] = DEFAULT_RESULTS_DIRS, prompts: Iterable[str] = tuple(PROMPT_DIRS),
+              max_workers: Optional[int] = None, force: bool = False, verbose: bool = True) -> Dict[str, int]:
+        """
+        Convierte los archivos de resultados nuevos o modificados.
+
+        Args:
+            base_dirs: Directorios Results de cada proveedor
+            prompts: Carpetas de prompt a incluir
+            max_workers: Procesos del pool (default: número de CPUs)
+            force: Reconvierte todo aunque no haya cambios
+            verbose: Imprime el resumen
+
+        Returns:
+            Dict con archivos 'converted', 'unchanged', 'removed' (Parquet sin
+            archivo de resultados) y 'rows' escritas
+        """
+        from concurrent.futures import ProcessPoolExecutor
+
+        start = time.time()
+        manifest = self._read_manifest()
+        files = find_results_files(base_dirs, prompts)
+        stale = [f for f in files if force or manifest.get(os.path.abspath(f), {}).get('signature') != _signature(f)
+                 or manifest[os.path.abspath(f)].get('schema') != SCHEMA_VERSION]
+
+        rows = 0
+        if stale:
+            if max_workers == 1 or len(stale) == 1:
+                parts = map(_build_partition, stale)
+                executor = None
+            else:
+                executor = ProcessPoolExecutor(max_workers=max_workers)
+                parts = executor.map(_build_partition, stale)
+            try:
+                for path, columns in zip(stale, parts):
+                    if not columns['model']:
+                        # Archivo vacío: su Parquet anterior (si lo había) se elimina en _prune
+                        manifest.pop(os.path.abspath(path), None)
+                        continue
+                    part = self._write_partition(columns, path)
+                    manifest[os.path.abspath(path)] = {'signature': _signature(path), 'schema': SCHEMA_VERSION,
+                                                       'file': part, 'rows': len(columns['model'])}
+                    rows += len(columns['model'])
+            finally:
+                if executor is not None:
+                    executor.shutdown()
+
+        removed = self._prune(manifest) if os.path.isdir(self.root) else 0
+        if stale or removed:
+            os.makedirs(self.root, exist_ok=True)
+            with open(self.manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+            os.replace(self.manifest_path + '.tmp', self.manifest_path)
+
+        report = {'converted': len(stale), 'unchanged': len(files) - len(stale), 'removed': removed, 'rows': rows}
+        if verbose:
+            print(f"Almacén: {report['converted']} archivos convertidos, {report['unchanged']} sin cambios, "
+                  f"{removed} eliminados, {rows:,} filas ({time.time() - start:.1f}s)")
+        return report
+
+    # -- lectura -------------------------------------------------------------
+
+    def dataset(self):
+        """pyarrow.dataset.Dataset del almacén (particiones provider/prompt/model_dir)."""
+        import pyarrow.dataset as ds
+
+        return ds.dataset(self.root, format='parquet', partitioning='hive',
+                          exclude_invalid_files=True, ignore_prefixes=['.', '_', MANIFEST_FILE])
+
+    @staticmethod
+    def _filter(providers, prompts, models, regions, sources, statuses):
+        import pyarrow.compute as pc
+        import pyarrow.dataset as ds
+
+        conditions = []
+        if providers is not None:
+            conditions.append(ds.field('provider').isin(list(providers)))
+        if prompts is not None:
+            conditions.append(ds.field('prompt').isin(list(prompts)))
+        if models is not None:
+            # La partición descarta archivos; la columna desambigua nombres que sanitizan igual
+            conditions.append(ds.field('model_dir').isin([sanitize_model_name(m) for m in models]))
+            conditions.append(ds.field('model').isin(list(models)))
+        if sources is not None:
+            conditions.append(ds.field('source').isin(list(sources)))
+        if statuses is not None:
+            conditions.append(ds.field('status').isin(list(statuses)))
+        if regions is not None:
+            # 'región' es texto libre ("Boyacá, Cundinamarca"): basta con que contenga alguna
+            region = None
+            for name in regions:
+                match = pc.match_substring(ds.field('region'), name, ignore_case=True)
+                region = match if region is None else (region | match)
+            conditions.append(region)
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else (expression & condition)
+        return expression
+
+    def scan(self, columns: Optional[Sequence[str]] = None, providers: Optional[Iterable[str]] = None,
+             prompts: Optional[Iterable[str]] = None, models: Optional[Iterable[str]] = None,
+             regions: Optional[Iterable[str]] = None, sources: Optional[Iterable[str]] = None,
+             statuses: Optional[Iterable[str]] = ('ok',)):
+        """
+        Lee una tabla Arrow con las columnas y filas pedidas.
+
+        Args:
+            columns: Columnas a leer (default: todas)
+            providers: Proveedores (ej: ['Straico'])
+            prompts: Prompts (ej: ['Prompt 2'])
+            models: Modelos (nombres originales, ej: 'openai/gpt-4.1')
+            regions: Regiones; una fila pasa si su 'región' contiene alguna (sin distinguir mayúsculas)
+            sources: Fuentes del dataset (ej: ['BDC'])
+            statuses: Estados de ResponseParser (default: sólo 'ok'; None = todos)
+
+        Returns:
+            pyarrow.Table
+        """
+        expression = self._filter(providers, prompts, models, regions, sources, statuses)
+        return self.dataset().to_table(columns=list(columns) if columns else None, filter=expression)
+
+    def load(self, columns: Optional[Sequence[str]] = None, **filters):
+        """
+        Igual que scan() pero devuelve un DataFrame de pandas.
+
+        Los textos se entregan como columnas respaldadas por Arrow (sin copiar
+        a objetos de Python) y provider/prompt/model/status como categorías.
+        """
+        import pandas as pd
+
+        table = self.scan(columns, **filters)
+        df = table.to_pandas(types_mapper=pd.ArrowDtype, self_destruct=True)
+        for name in ('provider', 'prompt', 'model_dir', 'model', 'status'):
+            if name in df.columns:
+                df[name] = df[name].astype(str).astype('category')
+        return df
+
+    def column(self, name: str, **filters):
+        """Una columna como array de NumPy (sin copia para columnas numéricas sin nulos)."""
+        return self.scan([name], **filters).column(name).to_numpy()
+
+    def models(self, prompt: Optional[str] = None) -> List[str]:
+        """Modelos presentes en el almacén (opcionalmente, de un prompt)."""
+        import pyarrow.compute as pc
+
+        table = self.scan(['model'], prompts=[prompt] if prompt else None, statuses=None)
+        return sorted(pc.unique(table.column('model')).to_pylist())
+
+    def metrics_data(self, prompt: str, providers: Optional[Iterable[str]] = None,
+                     models: Optional[Sequence[str]] = None, max_error_rate: float = MAX_ERROR_PERCENTAGE / 100,
+                     **filters):
+        """
+        Registros de métricas de un prompt, iguales a los de prompt_N_metrics_data.json.
+
+        Usa el registro de ProcessResults.clean_record guardado en cada fila
+        (mismo filtro de errores, etiquetas sin normalizar y referencia por
+        lookup), excluye los modelos con más de max_error_rate de errores y,
+        si un modelo está en varios proveedores, usa el último de providers
+        (como find_model_files). Las filas salen en el orden de models y, dentro
+        de cada modelo, en el del archivo de resultados; con models y providers
+        de ProcessResults el resultado es fila por fila el de process_prompt.
+
+        Args:
+            prompt: Carpeta del prompt (ej: 'Prompt 2')
+            providers: Proveedores, de menor a mayor prioridad (default: Straico, Azure)
+            models: Modelos a incluir, en el orden de salida (default: todos, por nombre)
+            max_error_rate: Fracción máxima de errores por modelo
+            **filters: regions / sources, como en scan() (la tasa de errores se calcula sobre lo filtrado)
+
+        Returns:
+            pandas.DataFrame (modismo, modelo, ... según el prompt)
+        """
+        import pandas as pd
+
+        providers = list(providers) if providers is not None else \
+            [os.path.basename(os.path.dirname(os.path.normpath(d))) for d in DEFAULT_RESULTS_DIRS]
+        table = self.scan(['provider', 'model', 'row', 'modismo', 'ejemplo', 'significado', 'clean']
+                          + [f'clean_{name}' for name in CLEAN_FIELDS],
+                          providers=providers, prompts=[prompt], models=models, statuses=None, **filters)
+        df = table.to_pandas()
+        df['provider'] = df['provider'].astype(str)
+        df['model'] = df['model'].astype(str)
+
+        # Un modelo en varios proveedores: gana el último, igual que al combinar en all_models.json
+        rank = df['provider'].map({provider: i for i, provider in enumerate(providers)})
+        df = df[rank == rank.groupby(df['model']).transform('max')]
+
+        totals = df.groupby('model')['clean'].agg(['size', 'sum'])
+        error_percentage = (totals['size'] - totals['sum']) / totals['size'] * 100
+        keep = error_percentage[~(error_percentage > max_error_rate * 100)].index
+        df = df[df['clean'] & df['model'].isin(keep)]
+
+        order = list(models) if models is not None else sorted(df['model'].unique())
+        df = df.assign(model=pd.Categorical(df['model'], categories=order, ordered=True))
+        df = df.sort_values(['model', 'row'], kind='stable')
+        df = df.assign(model=df['model'].astype(str)).rename(columns={'model': 'modelo'})
+
+        if prompt == 'Prompt 1':
+            df = df.assign(es_modismo_real='Sí', es_modismo_generado=df['clean_es_modismo'])
+            return df[['modismo', 'es_modismo_real', 'modelo', 'es_modismo_generado']].reset_index(drop=True)
+        if prompt == 'Prompt 2':
+            df = df.assign(definicion_real=df['significado'].fillna(''), definicion_generada=df['clean_definicion'])
+            return df[['modismo', 'definicion_real', 'modelo', 'definicion_generada']].reset_index(drop=True)
+        df = df.assign(significado_real=df['significado'].fillna(''), literal_generado=df['clean_sinonimo'],
+                       definicion_generada=df['clean_definicion'], ejemplo=df['ejemplo'].fillna(''))
+        return df[['modismo', 'ejemplo', 'significado_real', 'modelo', 'literal_generado',
+                   'definicion_generada']].reset_index(drop=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Archivos, filas y tamaño en disco."""
+        manifest = self._read_manifest()
+        size = sum(os.path.getsize(os.path.join(d, f)) for d, _, fs in os.walk(self.root) for f in fs)
+        return {'files': len(manifest), 'rows': sum(m['rows'] for m in manifest.values()),
+                'size_mb': size / 1024 / 1024}
+
+
+def _schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ('model', pa.string()), ('modismo', pa.string()), ('ejemplo', pa.string()),
+        ('status', pa.dictionary(pa.int8(), pa.string())), ('repaired', pa.bool_()),
+        ('es_modismo', pa.dictionary(pa.int32(), pa.string())), ('definicion', pa.string()),
+        ('sinonimo', pa.string()), ('detail', pa.string()), ('significado', pa.string()),
+        ('region', pa.string()), ('source', pa.string()), ('row', pa.int32()), ('clean', pa.bool_()),
+        ('clean_es_modismo', pa.string()), ('clean_definicion', pa.string()), ('clean_sinonimo', pa.string()),
+    ])
@@ -0,0 +1,73 @@
+"""
+Pruebas de BatchPrompts.run_batched: entradas entregadas a medida que llegan y reencolado de faltantes
+"""
+
+import os
+import sys
+import json
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from BatchPrompts import run_batched
+from LLMEngine import LLMResult
+
+PROMPTS = {'prompt_1': '{{modismo}}', 'prompt_1_batch': '{{items}}'}
+
+
+class ScriptedEngine:
+    """Responde cada lote con todos sus items salvo los de drop, registrando el orden de los eventos."""
+
+    def __init__(self, drop=()):
+        self.drop = set(drop)
+        self.events = []
+
+    async def run(self, jobs, on_result=None):
+        results = []
+        for job in jobs:
+            if isinstance(job.key, list):
+                items = json.loads(job.message)
+                answer = [{'id': item['id'], 'input': item['modismo'], 'output': {'es_modismo': 'Sí'}}
+                          for item in items if item['modismo'] not in self.drop]
+                response = json.dumps(answer, ensure_ascii=False)
+            else:
+                response = json.dumps({'input': job.key, 'output': {'es_modismo': 'No'}})
+            result = LLMResult(job, response)
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+            await asyncio.sleep(0)
+        self.events.append('run')
+        return results
+
+
+def _rows(n):
+    return [{'modismo': f"modismo {i}"} for i in range(n)]
+
+
+def test_entries_are_delivered_before_the_round_ends():
+    engine = ScriptedEngine()
+    received = []
+
+    def on_entry(entry):
+        engine.events.append('entry')
+        received.append(entry)
+
+    out = asyncio.run(run_batched(engine, ['modelo/a'], _rows(10), 'prompt_1', batch_size=4,
+                                  prompts=PROMPTS, on_entry=on_entry, verbose=False))
+    assert len(received) == 10
+    assert engine.events.index('entry') < engine.events.index('run')
+    assert [e['modismo'] for e in out['entries']['modelo/a']] == [e['modismo'] for e in received]
+
+
+def test_missing_items_fall_back_to_single_requests():
+    engine = ScriptedEngine(drop={'modismo 3'})
+    received = []
+    out = asyncio.run(run_batched(engine, ['modelo/a', 'modelo/b'], _rows(6), 'prompt_1', batch_size=3,
+                                  max_rounds=2, prompts=PROMPTS, on_entry=received.append, verbose=False))
+    assert len(received) == 12
+    assert out['problems']['missing'] == 4
+    singles = [e for e in received if e['modismo'] == 'modismo 3']
+    assert sorted(e['model'] for e in singles) == ['modelo/a', 'modelo/b']
+    # 2 lotes x 2 modelos, 1 lote de reintento x 2 modelos y 1 petición individual x 2 modelos
+    assert out['requests'] == 8
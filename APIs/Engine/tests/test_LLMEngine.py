@@ -0,0 +1,87 @@
+"""
+Pruebas de LLMEngine.run contra MockLLMServer: 429, cuota diaria y errores de on_result
+"""
+
+import os
+import sys
+import asyncio
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from LLMEngine import AdaptiveConcurrency, DailyAPILimitReached, LLMEngine, LLMJob, MockLLMServer, StraicoProvider
+
+pytest.importorskip('aiohttp')
+
+
+def _jobs(n_items: int, n_models: int = 1):
+    return [LLMJob(f"modelo/{j}", f"mensaje {i}", key=(j, i)) for j in range(n_models) for i in range(n_items)]
+
+
+async def _run(server_kwargs, jobs, on_result, **engine_kwargs):
+    async with MockLLMServer(latency=0.01, **server_kwargs) as server:
+        engine = LLMEngine(StraicoProvider('test', url=server.straico_url), **engine_kwargs)
+        return await engine.run(jobs, on_result=on_result)
+
+
+def test_run_delivers_every_result():
+    saved = []
+    results = asyncio.run(_run({}, _jobs(20, 2), saved.append, max_concurrency=4))
+    assert len(results) == 40
+    assert sorted(r.job.key for r in saved) == sorted(job.key for job in _jobs(20, 2))
+    assert all(r.ok for r in results)
+
+
+def test_throttling_backs_off_and_recovers(monkeypatch):
+    # Límite del modelo después de cada éxito o 429
+    trace = []
+    on_success, on_throttle = AdaptiveConcurrency.on_success, AdaptiveConcurrency.on_throttle
+
+    async def traced_success(self):
+        await on_success(self)
+        trace.append(self.limit)
+
+    def traced_throttle(self, cooldown=1.0):
+        on_throttle(self, cooldown)
+        trace.append(self.limit)
+
+    monkeypatch.setattr(AdaptiveConcurrency, 'on_success', traced_success)
+    monkeypatch.setattr(AdaptiveConcurrency, 'on_throttle', traced_throttle)
+
+    async def run():
+        # 8 en vuelo con 0.1 s de latencia son ~80 peticiones/s: el servidor acepta 20
+        async with MockLLMServer(latency=0.1, rps_per_model=20, retry_after=0.2) as server:
+            engine = LLMEngine(StraicoProvider('test', url=server.straico_url), initial_concurrency=8)
+            results = await engine.run(_jobs(80))
+            return server, engine, results
+
+    server, engine, results = asyncio.run(run())
+    assert len(results) == 80 and all(r.ok for r in results)
+    assert server.throttled > 0 and engine.stats.throttled > 0
+    lowest = trace.index(min(trace))
+    assert trace[lowest] < 8
+    assert max(trace[lowest:]) > trace[lowest]
+
+
+def test_daily_limit_stops_and_keeps_delivered_results():
+    saved = []
+    with pytest.raises(DailyAPILimitReached):
+        asyncio.run(_run({'daily_limit': 5}, _jobs(30), saved.append, max_concurrency=2))
+    # Todo lo que el servidor aceptó llegó a on_result antes de relanzar el límite
+    assert len(saved) == 5
+    assert all(r.ok for r in saved)
+
+
+def test_on_result_error_is_raised_after_draining():
+    saved = []
+
+    def on_result(result):
+        if len(saved) == 2:
+            raise OSError("no se pudo escribir el journal")
+        saved.append(result)
+
+    with pytest.raises(OSError, match="journal"):
+        asyncio.run(_run({}, _jobs(50), on_result, max_concurrency=4))
+    # Se dejan de enviar peticiones: no se procesan las 50
+    assert len(saved) < 50
@@ -0,0 +1,120 @@
+"""
+Pruebas de ResultsStore: metrics_data igual a ProcessResults, un Parquet por fuente y limpieza de huérfanos
+"""
+
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+pytest.importorskip('pyarrow')
+pytest.importorskip('pandas')
+
+from Journal import sanitize_model_name
+from ProcessResults import process_all, OUTPUT_FILES
+from ResultsStore import REFERENCE_DATASETS, ResultsStore
+
+MODELS = ['openai/gpt-4.1', 'google/gemini-2.5-flash', 'meta/llama-3-8b', 'gpt-5.1']
+
+
+def _modismos(prompt, n=6):
+    with open(REFERENCE_DATASETS[prompt], 'r', encoding='utf-8') as f:
+        return [item for item in json.load(f)[:n]]
+
+
+def _response(prompt, item, variant):
+    """Respuestas con las formas que se encuentran en los resultados reales."""
+    if variant == 'error':
+        return {'error': 'HTTP 500'}
+    if variant == 'empty':
+        return {'input': item['modismo'], 'output': {}}
+    output = {'Prompt 1': {'es_modismo': 'si'},
+              'Prompt 2': {'definicion': f"definición de {item['modismo']}"},
+              'Prompt 3': {'sinonimo': f"literal {item['modismo']}", 'definicion': ' otra definición '}}[prompt]
+    if variant == 'raw':
+        return {'raw_response': '```json\n' + json.dumps({'output': output}, ensure_ascii=False) + '\n```'}
+    return {'input': item['modismo'], 'output': output}
+
+
+def _entries(prompt, model, variants):
+    entries = []
+    for item, variant in zip(_modismos(prompt), variants):
+        # Modismo con otras mayúsculas: la referencia se encuentra por la clave normalizada
+        modismo = item['modismo'].upper() if variant == 'upper' else item['modismo']
+        entry = {'modismo': modismo, 'model': model, 'response': _response(prompt, item, variant)}
+        if prompt == 'Prompt 3':
+            entry = {'modismo': modismo, 'ejemplo': item.get('ejemplo', ''), **entry}
+        entries.append(entry)
+    return entries
+
+
+def _write(path, entries):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(entries, f, ensure_ascii=False)
+
+
+@pytest.fixture
+def results_dirs(tmp_path):
+    straico = tmp_path / 'Straico' / 'Results'
+    azure = tmp_path / 'Azure' / 'Results'
+    variants = {
+        'openai/gpt-4.1': ['ok', 'raw', 'error', 'upper', 'ok', 'empty'],
+        'google/gemini-2.5-flash': ['error', 'error', 'error', 'empty', 'ok', 'ok'],  # > 50% errores
+        'meta/llama-3-8b': ['raw', 'ok', 'ok', 'ok', 'error', 'upper'],
+    }
+    for prompt in OUTPUT_FILES:
+        for model, model_variants in variants.items():
+            safe = sanitize_model_name(model)
+            _write(str(straico / prompt / safe / f'{safe}.json'), _entries(prompt, model, model_variants))
+        # gpt-5.1 en ambos proveedores: gana Azure, el último directorio
+        _write(str(straico / prompt / 'gpt_5_1' / 'gpt_5_1.json'), _entries(prompt, 'gpt-5.1', ['error'] * 6))
+        _write(str(azure / prompt / 'gpt-5.1_responses.json'), _entries(prompt, 'gpt-5.1', ['ok', 'upper', 'raw']))
+    return [str(straico), str(azure)]
+
+
+def test_metrics_data_matches_process_results_row_by_row(results_dirs, tmp_path):
+    clean_dir = str(tmp_path / 'Clean')
+    process_all(models=MODELS, base_dirs=results_dirs, output_dir=clean_dir, max_workers=1, verbose=False)
+
+    store = ResultsStore(str(tmp_path / 'Store'))
+    store.build(results_dirs, max_workers=1, verbose=False)
+
+    for prompt, filename in OUTPUT_FILES.items():
+        with open(os.path.join(clean_dir, filename), 'r', encoding='utf-8') as f:
+            expected = json.load(f)
+        records = store.metrics_data(prompt, models=MODELS).to_dict('records')
+        assert records == expected, prompt
+        assert expected
+
+
+def test_sources_of_the_same_partition_are_kept_apart(tmp_path):
+    azure = tmp_path / 'Azure' / 'Results'
+    # Ambos archivos terminan en provider=Azure/prompt=Prompt 1/model_dir=gpt_5_1
+    _write(str(azure / 'Prompt 1' / 'gpt-5.1_responses.json'), _entries('Prompt 1', 'gpt-5.1', ['ok'] * 4))
+    _write(str(azure / 'Prompt 1' / 'gpt_5_1' / 'gpt_5_1.json'), _entries('Prompt 1', 'gpt-5.1', ['ok'] * 3))
+
+    store = ResultsStore(str(tmp_path / 'Store'))
+    store.build([str(azure)], max_workers=1, verbose=False)
+    assert store.scan(['model'], statuses=None).num_rows == 7
+    assert store.stats()['files'] == 2
+
+
+def test_build_removes_parquet_of_deleted_sources(tmp_path):
+    straico = tmp_path / 'Straico' / 'Results'
+    kept = straico / 'Prompt 2' / 'modelo_a' / 'modelo_a.json'
+    deleted = straico / 'Prompt 2' / 'modelo_b' / 'modelo_b.json'
+    _write(str(kept), _entries('Prompt 2', 'modelo/a', ['ok'] * 5))
+    _write(str(deleted), _entries('Prompt 2', 'modelo/b', ['ok'] * 5))
+
+    store = ResultsStore(str(tmp_path / 'Store'))
+    store.build([str(straico)], max_workers=1, verbose=False)
+    os.remove(str(deleted))
+    report = store.build([str(straico)], max_workers=1, verbose=False)
+
+    assert report['removed'] == 1 and report['converted'] == 0
+    assert store.models() == ['modelo/a']
+    assert not os.path.exists(str(tmp_path / 'Store' / 'provider=Straico' / 'prompt=Prompt 2' / 'model_dir=modelo_b'))
@@ -79,4 +79,94 @@ FORMATO DE SALIDA (JSON estricto):
     "definicion": "<definición breve del sinonimo>"
   }
 }
-"""
\ No newline at end of file
+"""
+
+# Variantes por lotes: K modismos por petición, respuesta como arreglo JSON indexado por id.
+# {{items}} se reemplaza por un arreglo JSON de objetos {"id", "modismo"} ({"id", "modismo", "ejemplo"} en el Prompt 3).
+
+prompt_1_batch = """
+Eres un clasificador experto en modismos y expresiones idiomáticas de Colombia.
+
+Instrucciones:
+1. Siempre responde ÚNICAMENTE con JSON válido y nada más.
+2. Para CADA expresión de la lista, clasifica si es un modismo colombiano o no.
+3. Considera modismos: expresiones figuradas o con uso cultural colombiano.
+4. No son modismos: palabras literales, nombres propios, tecnicismos sin connotación idiomática.
+5. Usa solo tu conocimiento interno (sin búsquedas externas).
+6. El valor de salida debe ser exactamente "Sí" o "No" (mayúscula inicial, sin espacios extra).
+7. Responde un objeto por cada elemento de la lista, con el mismo "id", sin omitir ni agregar elementos.
+
+INPUT (arreglo JSON):
+{{items}}
+
+FORMATO DE SALIDA (arreglo JSON estricto, un objeto por id):
+[
+  {
+    "id": <id>,
+    "input": "<modismo>",
+    "output": {
+      "es_modismo": "<Sí o No>"
+    }
+  }
+]
+"""
+
+prompt_2_batch = """
+Eres un modelo experto en modismos y expresiones idiomáticas colombianas.
+
+Instrucciones:
+1. Siempre responde ÚNICAMENTE con JSON válido y nada más.
+2. Define CADA modismo de la lista con una sola oración, breve, clara y objetiva en español, máx. 60 palabras.
+3. No incluyas ejemplos, sinónimos ni explicaciones adicionales.
+4. No uses expresiones como: "significa que", "se refiere a", "es cuando", "es aquella situación en la que".
+5. Usa solo tu conocimiento interno (sin búsquedas externas).
+6. Responde un objeto por cada elemento de la lista, con el mismo "id", sin omitir ni agregar elementos.
+
+INPUT (arreglo JSON):
+{{items}}
+
+FORMATO DE SALIDA (arreglo JSON estricto, un objeto por id):
+[
+  {
+    "id": <id>,
+    "input": "<modismo>",
+    "output": {
+      "definicion": "<definición breve en español formal>"
+    }
+  }
+]
+"""
+
+prompt_3_batch = """
+Eres un modelo experto en modismos y expresiones idiomáticas colombianas.
+
+Instrucciones:
+1. Siempre responde ÚNICAMENTE con JSON válido y nada más.
+2. Para CADA elemento de la lista, identifica el modismo en el ejemplo proporcionado.
+3. Genera el SINONIMO MÁS PLAUSIBLE que mantenga el MISMO sentido del modismo en el contexto dado.
+4. El SINONIMO MÁS PLAUSIBLE debe:
+   - Ser una palabra o frase simple y directa.
+   - Tener máximo 10 palabras.
+5. Define el sinónimo identificado.
+6. No uses expresiones como: "significa", "se refiere a", "es cuando", "es aquella situación en la que".
+7. Usa solo tu conocimiento interno (sin búsquedas externas).
+8. Si desconoces el modismo, infiere el SINONIMO MÁS PLAUSIBLE según el contexto del ejemplo.
+9. Responde un objeto por cada elemento de la lista, con el mismo "id", sin omitir ni agregar elementos.
+
+INPUT (arreglo JSON):
+{{items}}
+
+FORMATO DE SALIDA (arreglo JSON estricto, un objeto por id):
+[
+  {
+    "id": <id>,
+    "input": {
+      "modismo": "<modismo>"
+    },
+    "output": {
+      "sinonimo": "<sinonimo más plausible>",
+      "definicion": "<definición breve del sinonimo>"
+    }
+  }
+]
+"""
@@ -0,0 +1,1123 @@
+"""
+Parser del Breve Diccionario de Colombianismos (BDC).
+
+Convierte el markdown que genera Marker (Diccionario_breve_de_Colombiaismos_slown_text.txt)
+en las filas de BDC.json. Es el mismo proceso de GenerateDB.ipynb, organizado
+para procesar el archivo en streaming:
+
+1. Una pasada barata por las primeras líneas de los artículos arma el índice
+   de lemas que necesitan las referencias "Véase **X**".
+2. Los artículos se leen como generador, se resuelven sus referencias y la
+   extracción por artículo (regiones, etiquetas gramaticales, acepciones
+   numeradas, derivados con || y ~) se reparte en un pool de procesos.
+3. Las filas se limpian una a una (sin DataFrame) y se escriben en BDC.json,
+   que es la entrada del pipeline de createDataSet.py. Si las filas son las
+   mismas que las del BDC.json actual no se escribe nada, y las que siguen
+   igual conservan su orden (los empates deciden la primera ocurrencia).
+"""
+
+import os
+import re
+import sys
+import json
+import unicodedata
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# Obtener el directorio del script
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+path_source = os.path.join(SCRIPT_DIR, "Diccionario_breve_de_Colombiaismos_slown_text.txt")
+out_file_json = os.path.join(SCRIPT_DIR, "../BDC.json")
+
+# ============================================================================
+# FUNCIONES BÁSICAS DE NORMALIZACIÓN Y LIMPIEZA DE TEXTO
+# ============================================================================
+
+def nfc(s: str) -> str:
+    """Normaliza texto a forma canónica de composición Unicode (NFC)."""
+    return unicodedata.normalize("NFC", s or "")
+
+def norm_spaces(s: str) -> str:
+    """Reemplaza espacios no separables y de ancho cero, y normaliza múltiples espacios."""
+    s = (s or "").replace("\u00A0", " ").replace("\u200b", "")
+    s = re.sub(r"[ \t]+", " ", s)
+    return s.strip()
+
+st_end_punt_re = re.compile(r"^[¡!¿?«»\"'()\[\]{}·•.,;:—–-]+|[¡!¿?«»\"'()\[\]{}·•.,;:—–-]+$")
+def strip_punct(s: str) -> str:
+    """
+    Elimina signos de puntuación ubicados al inicio o al final de la cadena.
+    No afecta la puntuación que está en el medio.
+
+    Ejemplo:
+
+    Entrada: "**¡ahijuelita!**"
+    Salida:  "ahijuelita"
+    """
+    return st_end_punt_re.sub("", s or "").strip()
+
+
+def clean_curs(s: str) -> str:
+    """
+    Quita el marcado de negrita y cursiva en Markdown, dejando solo el texto limpio.
+
+    - Elimina `**` (negrita)
+    - Elimina `__` (subrayado)
+    - Reemplaza `*palabra*` por `palabra` (estaba en cursiva)
+
+    Ejemplo:
+
+    Entrada: "**¡ahijuelita!**  *bonita*"
+    Salida:  "¡ahijuelita!  bonita"
+    """
+    s = (s or "").replace("**", "").replace("__", "")
+    s = re.sub(r"\*(.*?)\*", r"\1", s)
+    return s
+
+remove_trailing_pipes_pattern = re.compile(r"\s*\|+\s*$")
+
+def remove_trailing_pipes(s: str) -> str:
+    """
+    Elimina las barras verticales '|' que aparecen al final de la cadena.
+    También remueve los espacios que puedan estar antes de las barras.
+
+    Ejemplo:
+
+    Entrada: "ser vivo ||"
+    Salida:  "ser vivo"
+
+    Entrada: "abeja |"
+    Salida:  "abeja"
+    """
+    return remove_trailing_pipes_pattern.sub("", s or "").strip()
+
+remove_gender_suffix_pattern = re.compile(r"\s*,\s*(?:a|da)\b\.?\s*$", re.IGNORECASE)
+
+def remove_gender_suffix(token: str) -> str:
+    """
+    Quita el sufijo literal ", a" o ", da" al final de un lema para quedarse con la forma base.
+    Si no encuentra el sufijo, deja el texto sin cambios.
+
+    Ejemplo:
+
+    Entrada: "bacano, a"
+    Salida:  "bacano"
+
+    Entrada: "cansado, da"
+    Salida:  "cansado"
+
+    Entrada: "árbol"
+    Salida:  "árbol"
+    """
+    before = token
+    after = remove_gender_suffix_pattern.sub("", token)
+    return (after.strip() or before.strip())
+
+# ============================================================================
+# EXPANSIÓN DE TILDES (~) EN FRASES DERIVADAS
+# ============================================================================
+
+def replace_tilde_with_base(text: str, base: str) -> str:
+    """
+    Reemplaza la tilde "~" en una frase derivada por la palabra base del lema.
+    Mantiene correctamente sufijos, espacios y signos de puntuación.
+
+    Ejemplos:
+
+    - Entrada: texto="~ de encostalados", palabra_base="carrera"
+      Salida:  "carrera de encostalados"
+
+    - Entrada: texto="echar ~", palabra_base="carreta"
+      Salida:  "echar carreta"
+
+    - Entrada: texto="hablar ~.", palabra_base="carreta"
+      Salida:  "hablar carreta."
+
+    - Entrada: texto="~osa", palabra_base="carranch"
+      Salida:  "carranchosa"
+    """
+    if not text:
+        return text
+    # ~ seguida de letras (sufijos)
+    text = re.sub(r"~([a-záéíóúüñ]+)", lambda m: base + m.group(1), text, flags=re.IGNORECASE)
+    # ~ seguida de espacios y letras
+    text = re.sub(r"~(\s+)([a-záéíóúüñ]+)", lambda m: base + m.group(1) + m.group(2), text, flags=re.IGNORECASE)
+    # ~ seguida de puntuación
+    text = re.sub(r"~([.,;:?!])", lambda m: base + m.group(1), text)
+    # ~ restantes
+    text = text.replace("~", base)
+    return text
+
+# ============================================================================
+# PROCESAMIENTO DE LEMAS CON PIPES (||) Y TILDE (~)
+# ============================================================================
+
+def resolve_pipe_tilde_in_head(head_bold_content: str) -> str:
+    """
+    Resuelve el caso de encabezados que usan "||" (pipes) y tilde "~".
+    Toma la parte DERECHA del "||" y reemplaza "~" por la palabra base que está a la izquierda.
+
+    Ejemplos:
+
+    - Entrada: lema_con_barras = "carrera || ~ de encostalados"
+      Salida:  "carrera de encostalados"
+
+    - Entrada: lema_con_barras = "carraca || echar ~"
+      Salida:  "echar carraca"
+
+    - Entrada: lema_con_barras = "carreta || echar o hablar ~"
+      Salida:  "echar o hablar carreta"
+    """
+    parts = head_bold_content.split("||", 1)
+    if len(parts) != 2:
+        return None
+    left, right = parts[0], parts[1]
+    base = strip_punct(clean_curs(norm_spaces(left)))
+    base = remove_gender_suffix(base)
+    base = strip_punct(base)
+    rhs = norm_spaces(right)
+    rhs = replace_tilde_with_base(rhs, base)
+    rhs = strip_punct(rhs)
+    rhs = remove_trailing_pipes(rhs)
+    rhs = norm_spaces(rhs)
+    return rhs
+
+# ============================================================================
+# EXTRACCIÓN Y NORMALIZACIÓN DE LEMAS
+# ============================================================================
+
+re_bold_head = re.compile(r"^-?\s*\*\*(.*?)\*\*")
+
+def extract_bold_head_general(line: str) -> str:
+    """
+    Extrae el lema (palabra principal) que aparece encerrado entre **negritas** 
+    al inicio de una línea en el diccionario.
+
+    Ejemplos:
+
+    - Entrada: linea = "- **carraca** f. coloq. Mandíbula del hombre o los animales."
+      Salida:  "carraca"
+
+    - Entrada: linea = "- **carreta || echar o hablar ~** fr. coloq. Hablar cosas triviales..."
+      Salida:  "carreta || echar o hablar ~"
+
+    - Entrada: linea = "- **carranchil (carranchín)** m. Enfermedad cutánea caracterizada por un fuerte escozor."
+      Salida:  "carranchil (carranchín)"
+
+    - Entrada: linea = "- **carrera || ~ de encostalados** Competencia deportiva en la cual los participantes..."
+      Salida:  "carrera || ~ de encostalados"
+    """
+    m = re_bold_head.search(line)
+    return m.group(1) if m else None
+
+def remove_optional_plural_suffix(token: str) -> str:
+    """
+    Elimina sufijos de plural opcional "(s)" o "(es)" de un lema.
+
+    Esto es común en el diccionario cuando un lema admite plural, 
+    pero no se quiere que aparezca como parte de la palabra base.
+
+    Ejemplos :
+    
+    - Entrada: "botarata(s)"  
+      Salida:  "botarata"
+
+    - Entrada: "carriel(es)"  
+      Salida:  "carriel"
+
+    - Entrada: "mataburro(s)"  
+      Salida:  "mataburro"
+    """
+    return re.sub(r"\((?:s|es)\)$", "", token, flags=re.IGNORECASE)
+
+def normalize_headword_content(head_content: str) -> str:
+    """
+    Normaliza el lema extraído de la cabecera en **negrita** de un artículo.
+
+    Acciones realizadas:
+    1. Normaliza caracteres Unicode a forma NFC.
+    2. Si el lema contiene '||' (derivados con "~"), los resuelve
+       reemplazando "~" por la palabra base.
+    3. Elimina sufijos de plural opcional "(s)" o "(es)".
+    4. Descarta variantes indicadas entre paréntesis después del lema.
+    5. Elimina colas literales como ", a" o ", da" (marcas de género).
+    6. Limpia signos de puntuación y barras verticales sobrantes.
+    7. Normaliza espacios en blanco.
+
+    Ejemplos :
+    
+    - Entrada: "carranchil (carranchín)"
+      Salida:  "carranchil"
+
+    - Entrada: "carrera || ~ de encostalados"
+      Salida:  "carrera de encostalados"
+
+    - Entrada: "botarata(s)"
+      Salida:  "botarata"
+    """
+    head = nfc(head_content)
+    if "||" in head:
+        resolved = resolve_pipe_tilde_in_head(head)
+        if resolved:
+            return nfc(remove_optional_plural_suffix(resolved))
+    token = norm_spaces(head)
+    token = remove_optional_plural_suffix(token)
+    token = token.split(" (", 1)[0]
+    token = remove_gender_suffix(token)
+    token = strip_punct(token)
+    token = remove_trailing_pipes(token)
+    token = norm_spaces(token)
+    return nfc(token)
+
+# ============================================================================
+# PATRONES Y CONFIGURACIÓN DE LIMPIEZA DE METADATOS
+# ============================================================================
+
+# Detecta ocurrencias externas: "|| **frase_con_tilde** resto_del_texto"
+external_occurrence_pattern = re.compile(
+    r"\|\|\s*\*{2}\s*(.*?)\s*\*{2}\s*([^|]*)(?=(?:\|\||$))",
+    flags=re.DOTALL
+)
+
+# Etiquetas gramaticales a eliminar
+grammatical_tags = [
+    "m", "f", "pl", "sing", "sust",
+    "adj", "adv", "intr", "tr", "prnl", "fr", "interj",
+    "coloq", "pop", "rur", "vulg", "despect", "obsol"
+]
+
+gender_pattern = r"(?:m(?:\s*\.)?\s*(?:y\s*f(?:\s*\.)?)?)"
+utc_pattern_PATTERN = r"U\s*\.\s*t\s*\.\s*c\s*\.\s*(?:s|adj|prnl)\s*\.?"
+
+# Patrón compuesto para eliminar etiquetas gramaticales
+drop_tag = re.compile(
+    r"(?:\b{mf}\b)|(?:\b(?:{base})(?:\s*\.)?\b)|(?:\b{utc_pattern}\b)".format(
+        mf=gender_pattern, base="|".join(grammatical_tags), utc_pattern=utc_pattern_PATTERN
+    ),
+    flags=re.IGNORECASE
+)
+
+# Nombres de regiones colombianas (ordenadas de más largo a más corto para evitar coincidencias parciales)
+region_names = [
+    "Costa del Pacífico","Costa del Pacifico","Costa Atlántica","Costa Atlantica",
+    "Norte de Santander","Valle del Cauca","Llanos Orientales",
+    "Costa Pacíf","Costa Pacif","Costa Atl","La Guajira",
+    "Cundinamarca","Atlántico","Atlantico","Antioquia","Magdalena","Risaralda",
+    "Santander","Putumayo","Caquetá","Caqueta","Casanare","Córdoba","Cordoba",
+    "Bolívar","Bolivar","Boyacá","Boyaca","Nariño","Narino","Quindío","Quindio",
+    "Amazonas","Caldas","Bogotá","Bogota","Chocó","Choco","Tolima","Cauca","Valle","Huila","Meta","Arauca","Llanos",
+    "NStder","Amaz","Stder","Cund","Córd","Cord","Quind","Risar","Magd","Guaj","Tol","Ant","Atl","Bog","Bol","Boy","Cald","Nar"
+]
+
+# Mapeo de abreviaturas a nombres completos de regiones
+region_full_names = {
+    "amaz": "Amazonas",
+    "amazonas": "Amazonas",
+    "ant": "Antioquia",
+    "antioquia": "Antioquia",
+    "atl": "Atlántico",
+    "atlántico": "Atlántico",
+    "atlantico": "Atlántico",
+    "bog": "Bogotá",
+    "bogotá": "Bogotá",
+    "bogota": "Bogotá",
+    "bol": "Bolívar",
+    "bolívar": "Bolívar",
+    "bolivar": "Bolívar",
+    "boy": "Boyacá",
+    "boyacá": "Boyacá",
+    "boyaca": "Boyacá",
+    "cald": "Caldas",
+    "caldas": "Caldas",
+    "chocó": "Chocó",
+    "choco": "Chocó",
+    "córd": "Córdoba",
+    "cord": "Córdoba",
+    "córdoba": "Córdoba",
+    "cordoba": "Córdoba",
+    "costa atl": "Costa Atlántica",
+    "costa atlántica": "Costa Atlántica",
+    "costa atlantica": "Costa Atlántica",
+    "costa pacíf": "Costa del Pacífico",
+    "costa pacif": "Costa del Pacífico",
+    "costa del pacífico": "Costa del Pacífico",
+    "costa del pacifico": "Costa del Pacífico",
+    "cund": "Cundinamarca",
+    "cundinamarca": "Cundinamarca",
+    "guaj": "La Guajira",
+    "la guajira": "La Guajira",
+    "llanos": "Llanos Orientales",
+    "magd": "Magdalena",
+    "magdalena": "Magdalena",
+    "nar": "Nariño",
+    "nariño": "Nariño",
+    "narino": "Nariño",
+    "nstder": "Norte de Santander",
+    "norte de santander": "Norte de Santander",
+    "quind": "Quindío",
+    "quindío": "Quindío",
+    "quindio": "Quindío",
+    "risar": "Risaralda",
+    "risaralda": "Risaralda",
+    "stder": "Santander",
+    "santander": "Santander",
+    "tol": "Tolima",
+    "tolima": "Tolima",
+    "valle": "Valle del Cauca",
+    "valle del cauca": "Valle del Cauca",
+    "cauca": "Cauca",
+    "huila": "Huila",
+    "meta": "Meta",
+    "arauca": "Arauca",
+    "casanare": "Casanare",
+    "putumayo": "Putumayo",
+    "caquetá": "Caquetá",
+    "caqueta": "Caquetá"
+}
+
+region_pattern_union = "|".join(map(re.escape, region_names))
+
+# Detecta bloques de regiones SOLO en cursiva (entre asteriscos)
+# Previene eliminar texto normal como "nar" dentro de "nariz"
+italic_region_block = re.compile(
+    r"\*\s*(?:(?:{REG})(?:\.|\b))(?:\s*[,you]\s*(?:(?:{REG})(?:\.|\b)))*\s*\*".format(REG=region_pattern_union),
+    flags=re.IGNORECASE
+)
+
+# Patrones para detectar citas bibliográficas
+citation_w_paren_re = re.compile(
+    r'(?:-\s*)?\(\s*(?:Carrasquilla|Le[oó]n Rey)\s*,\s*[IVXLCDM]+\s*(?:,\s*(?:copla\s*)?\d+)?\s*"?\s*\)?',
+    flags=re.IGNORECASE
+)
+
+citation_w_quote_re = re.compile(
+    r'(?:-\s*)?[\"""]\s*Le[oó]n Rey\s*,\s*[IVXLCDM]+\s*[\"""]',
+    flags=re.IGNORECASE
+)
+
+# ============================================================================
+# FUNCIONES DE LIMPIEZA DE METADATOS Y EXTRACCIÓN DE REGIONES
+# ============================================================================
+
+def remove_citations(text: str) -> str:
+    """
+    Elimina citas de obras/autor incrustadas en el texto con los formatos detectados.
+
+    Borra patrones como:
+    - (Carrasquilla, I, 150")
+    - (Carrasquilla, II, 291")
+    - (León Rey, II, copla 3932")
+    - "León Rey, I"  /  "León Rey, I"
+
+    Además, corrige espacios dobles y comas sobrantes antes de signos.
+    """
+    if not text:
+        return ""
+    out = citation_w_paren_re.sub("", text)
+    out = citation_w_quote_re.sub("", out)
+    out = re.sub(r"\s*,\s*(?=[.,;:])", "", out)
+    out = re.sub(r"\s{2,}", " ", out)
+    return norm_spaces(out)
+
+def extract_regions_from_text(text: str) -> list:
+    """
+    Extrae las regiones que están EN CURSIVA (*...*) del texto.
+    Retorna una lista de nombres completos de regiones.
+    """
+    if not text:
+        return []
+    
+    regions_found = []
+    for match in italic_region_block.finditer(text):
+        block = match.group(0)
+        block_clean = block.strip("*").strip()
+        # Separar por comas o conjunciones (y, o, u)
+        parts = re.split(r'\s*,\s*|\s+(?:y|o|u)\s+', block_clean, flags=re.IGNORECASE)
+        for part in parts:
+            part = part.strip().rstrip(".").strip()
+            if not part:
+                continue
+            part_lower = part.lower()
+            full_name = region_full_names.get(part_lower, None)
+            # Intentar sin acentos si no se encuentra
+            if full_name is None:
+                part_no_accent = part_lower.replace("á", "a").replace("é", "e").replace("í", "i").replace("ó", "o").replace("ú", "u")
+                full_name = region_full_names.get(part_no_accent, None)
+            
+            # Usar valor original con capitalización si no se encuentra en el diccionario
+            if full_name is None:
+                full_name = part.title()
+            
+            if full_name and full_name not in regions_found:
+                regions_found.append(full_name)
+    
+    return regions_found
+
+def clean_regional_blocks_and_grammar_tags(text: str) -> str:
+    """
+    Limpia del texto:
+    1) Bloques de regiones SOLO cuando están en cursiva *...* 
+       (p. ej., *Cund., Boy., Nar.*; *Ant., Cald., Valle.*).
+    2) Abreviaturas/etiquetas gramaticales con límites de palabra
+       (m., f., adj., intr., tr., prnl., fr., interj., coloq., etc., y "U. t. c. ...").
+    3) Citas bibliográficas mediante `strip_bibliographic_citations`.
+    4) Puntuación/espacios sobrantes tras las limpiezas.
+
+    - No afecta texto normal: no elimina "nar" dentro de "nariz", p ej., 
+      porque los bloques regionales se borran solo si están en *cursiva*.
+    """
+    if not text:
+        return ""
+    out = text
+
+    out = remove_citations(out)
+
+    # Eliminación iterativa de bloques regionales en cursiva
+    while True:
+        new_out = italic_region_block.sub("", out)
+        if new_out == out:
+            break
+        out = new_out
+
+    out = drop_tag.sub("", out)
+
+    # Limpieza de puntuación redundante y normalización de espacios
+    out = re.sub(r"\s*,\s*(?=[.,;:])", "", out)
+    out = re.sub(r"\s*[.,;:—–-]\s*(?=[.,;:—–-])", " ", out)
+    out = re.sub(r"\s{2,}", " ", out)
+    out = norm_spaces(strip_punct(out))
+    return out
+
+# ============================================================================
+# DETECCIÓN Y PROCESAMIENTO DE ACEPCIONES ENUMERADAS
+# ============================================================================
+
+bold_number_pattern = re.compile(r"\*\*\s*(\d+)\.\s*\*\*")
+plain_number_pattern = re.compile(r"(?<!\d)(\d{1,2})\.\s")
+
+def count_enumerations(full_text_after_head: str) -> int:
+    """
+    Cuenta cuántas definiciones enumeradas (2., 3., etc.) aparecen
+    en el texto de un artículo después del lema.
+
+    Se usa para duplicar las filas en el DataFrame por cada acepción enumerada.
+
+    Ejemplos:
+   - count_numbered_definitions("**2.** Segunda acepción. **3.** Tercera acepción.") -> 2
+    - count_numbered_definitions("Definición simple sin numeración.") -> 0
+    """
+    count = 0
+    for g in bold_number_pattern.findall(full_text_after_head):
+        try:
+            if int(g) >= 2: count += 1
+        except: pass
+    for g in plain_number_pattern.findall(full_text_after_head):
+        try:
+            if int(g) >= 2: count += 1
+        except: pass
+    return count
+
+enumeration_marker_pattern = re.compile(r"(?:\*\*\s*(\d+)\.\s*\*\*|(?<!\d)(\d{1,2})\.\s)")
+
+def extract_enumerated_senses_from_first_line(first_line: str, head_end_pos: int):
+    """
+    Extrae y separa las definiciones enumeradas (1., 2., 3., …) de la primera línea del artículo.
+
+    Separa el texto en segmentos para cada acepción numerada, y de cada segmento
+    extrae el significado y el ejemplo usando `extract_meaning_example_from_tail`.
+
+    Parámetros:
+
+    first_line : str
+        Primera línea completa del artículo (incluyendo el lema y las definiciones).
+    head_end_pos : int
+        Índice en el que termina el lema en la línea.
+
+    Retorna:
+
+    list of tuple(str, str)
+        Lista de tuplas (significado, ejemplo) para cada acepción.
+
+    Ejemplos:
+    
+     - first_line = "- **carramán** m. coloq. Vehículo viejo. **2.** Persona vieja, acabada."
+     -> split_enumerated_definitions_from_line(first_line, 11)
+    [('Vehículo viejo.', 'Persona vieja, acabada.')]
+
+     - first_line = "- **carreta** f. Carrete para hilos. **2.** Carretilla para materiales. **3.** Charla trivial."
+     -> split_enumerated_definitions_from_line(first_line, 10)
+    [('Carrete para hilos.', ''), ('Carretilla para materiales.', ''), ('Charla trivial.', '')]
+    """
+    tail_raw = (first_line or "")[head_end_pos:]
+    tail = tail_raw
+    cuts = []
+    for m in enumeration_marker_pattern.finditer(tail):
+        num = m.group(1) or m.group(2)
+        try:
+            if int(num) >= 2:
+                cuts.append((m.start(), m.end()))
+        except:
+            pass
+    segments = []
+    if not cuts:
+        segments = [tail]
+    else:
+        start = 0
+        for (s, e) in cuts:
+            segments.append(tail[start:s])
+            start = e
+        segments.append(tail[start:])
+    senses = []
+    for seg in segments:
+        sig, ej, regions = extract_meaning_example_from_tail(seg)
+        senses.append((sig, ej, regions))
+    return senses
+
+# ============================================================================
+# UTILIDADES PARA EXTRACCIÓN DE COMPONENTES DEL LEMA
+# ============================================================================
+
+def extract_base_from_head(head_bold_content: str) -> str:
+    """
+    Extrae la parte base del lema que aparece ANTES del primer '||'.
+
+    Se utiliza para normalizar la palabra principal,
+    removiendo puntuación, cursivas y sufijos de género.
+
+    Ejemplos:
+    
+    - extract_base_from_head("carrera || ~ de encostalados")
+     ->'carrera'
+
+    - extract_base_from_head("carranchil (carranchín)")
+     ->'carranchil'
+    """
+    left = head_bold_content.split("||", 1)[0] if "||" in head_bold_content else head_bold_content
+    base = strip_punct(clean_curs(norm_spaces(left)))
+    base = remove_gender_suffix(base)
+    base = strip_punct(base)
+    return norm_spaces(base)
+
+
+def check_meaning_before_pipes(first_line: str, head_end_pos: int) -> bool:
+    """
+    Verifica si hay contenido significativo (significado) ANTES del primer '||'
+    en el texto que sigue al lema.
+
+    Esto permite detectar si el lema principal tiene una definición propia,
+    antes de listar ocurrencias derivadas con '||'.
+
+    Ejemplo:
+    
+    - check_meaning_before_pipes("- **carraca** f. Mandíbula. || echar ~.", 11)
+     -> True  # Tiene definición antes de '||'
+
+    - check_meaning_before_pipes("- **carrera || ~ de encostalados** Competencia...", 7)
+     -> False # No hay definición antes de '||'
+    """
+    tail = first_line[head_end_pos:]
+    before = tail.split("||", 1)[0]
+    clean = clean_regional_blocks_and_grammar_tags(before)
+    clean = strip_punct(norm_spaces(clean))
+    return bool(clean)
+
+parenthetical_variants_pattern = re.compile(r"\(([^)]+)\)")
+
+def extract_parenthetical_variants(head_bold_content: str) -> list:
+    """
+    Extrae las variantes indicadas entre paréntesis en el lema principal.
+
+    Ignora los casos en los que el paréntesis solo indica plural opcional (s/es).
+
+    Ejemplos:
+    
+    - extract_variants_from_parentheses("carranchil (carranchín)")
+      -> ['carranchín']
+
+    - extract_variants_from_parentheses("carriel(es)")
+      ->  # Ignora plural opcional
+    """
+    left = head_bold_content.split("||", 1)[0] if "||" in head_bold_content else head_bold_content
+    m = parenthetical_variants_pattern.search(left)
+    if not m:
+        return []
+    content = m.group(1)
+    if re.fullmatch(r"(?:s|es)", content.strip(), flags=re.IGNORECASE):
+        return []
+    parts = re.split(r"\s*(?:,|/|;|\bo\b|\bu\b|\by\b)\s*", content, flags=re.IGNORECASE)
+    variants = []
+    for raw in parts:
+        v = norm_spaces(raw)
+        if not v: continue
+        if re.fullmatch(r"(?:s|es)", v, flags=re.IGNORECASE): continue
+        v = remove_gender_suffix(v)
+        v = strip_punct(v)
+        v = remove_trailing_pipes(v)
+        v = norm_spaces(v)
+        if v: variants.append(nfc(v))
+    return variants
+
+# ============================================================================
+# EXTRACCIÓN DE SIGNIFICADO Y EJEMPLO
+# ============================================================================
+
+first_italic_pattern = re.compile(r"\*(.*?)\*")
+
+def extract_meaning_example_after_head(first_line: str, head_end_pos: int):
+    """
+    Extrae el significado y el ejemplo de la PRIMERA LÍNEA de un artículo,
+    considerando el texto que sigue al lema.
+
+    Busca la primera frase en cursiva como el ejemplo.
+    El resto antes de la cursiva se considera el significado.
+
+    Ejemplo:
+    
+    - extract_meaning_and_example_from_headline( "- **carraca** f. Mandíbula del hombre. *Había perdido la carraca.*", 11)
+      -> ('Mandíbula del hombre.', 'Había perdido la carraca.')
+    """
+    tail_raw = (first_line or "")[head_end_pos:]
+    
+    # Extraer regiones ANTES de limpiar metadatos
+    regions = extract_regions_from_text(tail_raw)
+    
+    tail = clean_regional_blocks_and_grammar_tags(tail_raw)
+    m = first_italic_pattern.search(tail)
+    if m:
+        significado = norm_spaces(strip_punct(tail[:m.start()]))
+        ejemplo = norm_spaces(strip_punct(m.group(1)))
+    else:
+        significado = norm_spaces(strip_punct(tail))
+        ejemplo = ""
+    significado = clean_regional_blocks_and_grammar_tags(significado)
+    ejemplo = clean_regional_blocks_and_grammar_tags(ejemplo)
+    return significado, ejemplo, regions
+
+def extract_meaning_example_from_tail(tail_raw: str):
+    """
+    Extrae el significado y el ejemplo desde el resto de texto de un artículo
+    (sin el lema).
+
+    Busca el primer texto en cursiva como ejemplo. Lo anterior es el significado.
+
+    Ejemplo:
+
+    - extract_meaning_and_example_from_tail( "Mandíbula del hombre. *Había perdido la carraca.*")
+      -> ('Mandíbula del hombre.', 'Había perdido la carraca.')
+    """
+    # Extraer regiones ANTES de limpiar metadatos
+    regions = extract_regions_from_text(tail_raw or "")
+    
+    tail = clean_regional_blocks_and_grammar_tags(tail_raw or "")
+    m = first_italic_pattern.search(tail)
+    if m:
+        significado = norm_spaces(strip_punct(tail[:m.start()]))
+        ejemplo = norm_spaces(strip_punct(m.group(1)))
+    else:
+        significado = norm_spaces(strip_punct(tail))
+        ejemplo = ""
+    significado = clean_regional_blocks_and_grammar_tags(significado)
+    ejemplo = clean_regional_blocks_and_grammar_tags(ejemplo)
+    return significado, ejemplo, regions
+
+
+# ============================================================================
+# REESCRITURA DE REFERENCIAS "Véase **X**"
+# ============================================================================
+
+see_also_pattern = re.compile(r"\bVéase\b\s*\*{2}\s*([^*]+?)\s*\*{2}", flags=re.IGNORECASE)
+
+def _first_line_tail_after_head(first_line: str) -> str:
+    """
+    Devuelve el texto que sigue inmediatamente después del bloque de cabecera en **negrita**
+    dentro de la PRIMERA LÍNEA de un artículo.
+
+    Se asume que la cabecera ya cumple el formato "- **lema** ...".
+    Si no hay cabecera detectada, devuelve cadena vacía.
+
+    Ejemplos:
+    
+    - get_tail_after_head_from_first_line("- **carraca** f. Mandíbula. *Ejemplo*")
+      -> " f. Mandíbula. *Ejemplo*"
+
+    - get_tail_after_head_from_first_line("- **carreta || echar ~** fr. coloq. Hablar cosas triviales.")
+       -> " fr. coloq. Hablar cosas triviales."
+    """
+    m = re_bold_head.search(first_line or "")
+    if not m:
+        return ""
+    return (first_line or "")[m.end():]
+
+
+# ============================================================================
+# LECTURA EN STREAMING E ÍNDICE DE LEMAS
+# ============================================================================
+
+article_start_regex = re.compile(r"^\s*-?\s*\*\*")
+
+
+def iter_articles(path: str = path_source) -> Iterator[str]:
+    """
+    Recorre los artículos del archivo sin cargarlo completo en memoria.
+
+    Un artículo empieza en cada línea con un lema en negrita ("- **lema** ...")
+    y sigue hasta la siguiente.
+    """
+    current = []
+    with open(path, "r", encoding="utf-8") as f:
+        for raw in f:
+            line = nfc(raw.rstrip("\n"))
+            if article_start_regex.match(line) and current:
+                yield "\n".join(current)
+                current = []
+            current.append(line)
+    if current:
+        yield "\n".join(current)
+
+
+def build_index(path: str = path_source) -> Dict[str, str]:
+    """
+    Índice lema normalizado -> texto tras el encabezado de su primera línea.
+
+    Es la única pasada previa: sólo lee la primera línea de cada artículo y
+    guarda la primera ocurrencia de cada lema, que es lo que necesitan las
+    referencias "Véase **X**".
+    """
+    lemma_to_tail = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for raw in f:
+            if not article_start_regex.match(raw):
+                continue
+            fl = nfc(raw.rstrip("\n"))
+            head = extract_bold_head_general(fl)
+            if not head:
+                continue
+            lema_norm = normalize_headword_content(head)
+            if lema_norm and lema_norm not in lemma_to_tail:
+                lemma_to_tail[lema_norm] = _first_line_tail_after_head(fl)
+    return lemma_to_tail
+
+
+def resolve_see_also(art: str, lemma_to_tail: Dict[str, str]) -> str:
+    """
+    Reemplaza "Véase **X**" en la primera línea por la definición completa de X.
+
+    Si el artículo no tiene la referencia o X no está en el índice, se
+    devuelve sin cambios.
+    """
+    parts = art.split("\n", 1)
+    fl = parts[0]
+    rest = parts[1] if len(parts) > 1 else ""
+    mh = re_bold_head.search(fl)
+    if not mh:
+        return art
+
+    head_end = mh.end()
+    msee = see_also_pattern.search(fl[head_end:])
+    if not msee:
+        return art
+
+    target_tail = lemma_to_tail.get(normalize_headword_content(msee.group(1)), "")
+    if not target_tail:
+        return art
+
+    new_first_line = fl[:head_end] + " " + target_tail.strip()
+    return new_first_line if not rest else (new_first_line + "\n" + rest)
+
+
+# ============================================================================
+# EXTRACCIÓN POR ARTÍCULO: REQUISITOS 1 Y 2 Y ACEPCIONES ENUMERADAS
+# ============================================================================
+
+def article_rows(art: str) -> List[Dict[str, str]]:
+    """
+    Filas (palabra, significado, ejemplo, región) de un artículo ya resuelto.
+
+    - Artículos simples (Req. 1): una entrada directa por lema
+    - Artículos con derivados (Req. 2): múltiples entradas expandiendo pipes y tildes
+    - Artículos enumerados: una entrada por cada acepción numerada (2., 3., ...)
+
+    Las filas salen sin la limpieza final (ver clean_row).
+    """
+    rows = []
+    first_line = art.split("\n", 1)[0]
+
+    # Extracción y validación del lema en negrita
+    head_content = extract_bold_head_general(first_line)
+    if not head_content:
+        return rows
+
+    # Normalización del lema (resuelve pipes/tilde, elimina sufijos, limpia puntuación)
+    palabra_head = normalize_headword_content(head_content)
+    if not palabra_head:
+        return rows
+
+    # Localización del fin del encabezado para segmentar el texto
+    m_head = re_bold_head.search(first_line)
+    head_end = m_head.end() if m_head else 0
+
+    # Texto completo después del lema (para análisis de estructura)
+    after_head_all = art[art.find(first_line) + head_end:]
+
+    # Análisis de la estructura del artículo
+    has_external_pipes = ("||" in after_head_all)
+    head_has_meaning = check_meaning_before_pipes(first_line, head_end) if m_head else False
+    n_extra_defs = count_enumerations(after_head_all)
+    n_defs = 1 + n_extra_defs
+    variants = extract_parenthetical_variants(head_content)
+
+    # Clasificación según Requisitos 1 y 2
+    head_has_pipes = ("||" in head_content)
+    is_req1_simple = (not has_external_pipes) and (n_extra_defs == 0) and (not head_has_pipes)
+    is_req2_simple = (n_extra_defs == 0) and (head_has_pipes or has_external_pipes)
+
+    # Extracción de significado/ejemplo/regiones (el mismo resultado sirve a Req. 1 y Req. 2)
+    sig_simple = ej_simple = ""
+    regions_simple = []
+    if m_head and (is_req1_simple or is_req2_simple):
+        sig_simple, ej_simple, regions_simple = extract_meaning_example_after_head(first_line, head_end)
+
+    # Procesamiento de acepciones enumeradas
+    enumerated_senses = []
+    if n_extra_defs > 0:
+        enumerated_senses = extract_enumerated_senses_from_first_line(first_line, head_end)
+        # Relleno de segmentos faltantes si la detección fue incompleta
+        if len(enumerated_senses) < n_defs:
+            enumerated_senses += [("", "", [])] * (n_defs - len(enumerated_senses))
+
+    def sense(i):
+        if n_extra_defs > 0:
+            return enumerated_senses[i]
+        return sig_simple, ej_simple, regions_simple
+
+    # Creación de filas para lema base y variantes
+    # Excepción: si hay pipes externos sin significado propio, solo se procesan derivados
+    if not (has_external_pipes and not head_has_meaning):
+        for palabra in [palabra_head] + variants:
+            for i in range(n_defs):
+                sig_i, ej_i, regions_i = sense(i)
+                rows.append({
+                    "palabra": palabra,
+                    "significado": sig_i,
+                    "ejemplo": ej_i,
+                    "región": ", ".join(regions_i) if regions_i else ""
+                })
+
+    # Creación de filas para ocurrencias externas (derivados con || **...~...**)
+    if has_external_pipes:
+        base_raw = extract_base_from_head(head_content)
+
+        for bold_phrase, local_tail in external_occurrence_pattern.findall(after_head_all):
+            # Expansión de tilde y limpieza
+            phrase = replace_tilde_with_base(bold_phrase, base_raw)
+            phrase = clean_curs(phrase)
+            phrase = strip_punct(remove_trailing_pipes(norm_spaces(phrase))).rstrip(".")
+            if not phrase:
+                continue
+
+            # Extracción de significado/ejemplo/regiones si no hay enumeraciones
+            sig_loc = ej_loc = ""
+            regions_loc = []
+            if n_extra_defs == 0:
+                sig_loc, ej_loc, regions_loc = extract_meaning_example_from_tail(local_tail)
+
+            rows.append({
+                "palabra": phrase,
+                "significado": sig_loc,
+                "ejemplo": ej_loc,
+                "región": ", ".join(regions_loc) if regions_loc else ""
+            })
+    return rows
+
+
+# ============================================================================
+# LIMPIEZA FINAL, PIPELINE Y EXPORTACIÓN
+# ============================================================================
+
+surrounding_quotes_pattern = re.compile(r'^[\'"]|[\'"]$')
+
+
+def clean_row(row: Dict[str, str]) -> Dict[str, str]:
+    """
+    Limpieza final de una fila: strip, comillas en los extremos y minúsculas
+    en palabra/significado/ejemplo; la región conserva su capitalización.
+    """
+    out = {}
+    for col in ("palabra", "significado", "ejemplo"):
+        out[col] = surrounding_quotes_pattern.sub("", str(row[col]).strip()).lower()
+    out["región"] = str(row["región"]).strip()
+    return out
+
+
+def _process_article(args) -> List[Dict[str, str]]:
+    """Resuelve referencias, extrae y limpia las filas de un artículo (se ejecuta en el pool)."""
+    art, lemma_to_tail = args
+    return [clean_row(row) for row in article_rows(resolve_see_also(art, lemma_to_tail))]
+
+
+_worker_index: Dict[str, str] = {}
+
+
+def _init_worker(lemma_to_tail: Dict[str, str]):
+    global _worker_index
+    _worker_index = lemma_to_tail
+
+
+def _process_in_worker(art: str) -> List[Dict[str, str]]:
+    return _process_article((art, _worker_index))
+
+
+def parse(path: str = path_source, max_workers: Optional[int] = None,
+          chunksize: int = 64) -> Iterator[Dict[str, str]]:
+    """
+    Genera las filas del diccionario en el orden de los artículos.
+
+    El índice de lemas se envía una sola vez a cada proceso del pool (no con
+    cada artículo).
+
+    Args:
+        path: Markdown de Marker
+        max_workers: Procesos del pool (1 = sin pool; default: número de CPUs)
+        chunksize: Artículos por tarea del pool
+
+    Yields:
+        Filas {palabra, significado, ejemplo, región}
+    """
+    lemma_to_tail = build_index(path)
+    if max_workers == 1 or (max_workers is None and (os.cpu_count() or 1) == 1):
+        for art in iter_articles(path):
+            yield from _process_article((art, lemma_to_tail))
+        return
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(lemma_to_tail,)) as executor:
+        for rows in executor.map(_process_in_worker, iter_articles(path), chunksize=chunksize):
+            yield from rows
+
+
+def _row_key(row: Dict[str, str]) -> tuple:
+    return (row["palabra"], row["significado"], row["ejemplo"], row["región"])
+
+
+def sort_rows(rows: Iterable[Dict[str, str]],
+              reference: Optional[List[Dict[str, str]]] = None) -> List[Dict[str, str]]:
+    """
+    Ordenamiento alfabético por palabra (estable: las acepciones conservan su orden).
+
+    Con `reference` (el BDC.json actual), las filas de una misma palabra que ya
+    estaban ahí quedan en su orden de la referencia y las nuevas van después:
+    el orden de los empates decide qué definición conserva la primera
+    ocurrencia de createDataSet.py.
+
+    Args:
+        rows: Filas a ordenar
+        reference: Filas ya publicadas (opcional)
+
+    Returns:
+        Filas ordenadas
+    """
+    positions: Dict[tuple, List[int]] = {}
+    for position, row in enumerate(reference or []):
+        positions.setdefault(_row_key(row), []).append(position)
+    # Filas repetidas: cada aparición toma la siguiente posición de la referencia
+    used: Counter = Counter()
+
+    def rank(row: Dict[str, str]) -> int:
+        key = _row_key(row)
+        n = used[key]
+        used[key] += 1
+        candidates = positions.get(key, [])
+        return candidates[n] if n < len(candidates) else len(reference or [])
+
+    ranked = [(row["palabra"], rank(row), row) for row in rows]
+    return [row for _, _, row in sorted(ranked, key=lambda item: item[:2])]
+
+
+def write_json(rows: List[Dict[str, str]], path: str = out_file_json) -> str:
+    """Escribe BDC.json (mismo formato que GenerateDB.ipynb) de forma atómica."""
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(rows, f, ensure_ascii=False, indent=2)
+    os.replace(f"{path}.tmp", path)
+    return path
+
+
+def compare_golden(rows: List[Dict[str, str]], golden_path: str = out_file_json) -> Dict[str, list]:
+    """
+    Compara filas con un BDC.json de referencia (sin importar el orden).
+
+    Returns:
+        Dict con las filas 'missing' (en la referencia y no en rows) y 'extra'
+    """
+    with open(golden_path, "r", encoding="utf-8") as f:
+        golden = json.load(f)
+    expected, produced = Counter(map(_row_key, golden)), Counter(map(_row_key, rows))
+    return {"missing": sorted((expected - produced).elements()),
+            "extra": sorted((produced - expected).elements())}
+
+
+def generate(path: str = path_source, output: str = out_file_json, max_workers: Optional[int] = None,
+             rebuild_dataset: bool = False) -> List[Dict[str, str]]:
+    """
+    Parsea el diccionario y escribe BDC.json si sus filas cambiaron.
+
+    Si compare_golden no encuentra filas faltantes ni sobrantes respecto del
+    BDC.json actual, no se escribe nada (reparsear no cambia el orden
+    publicado). Si cambiaron, las filas que siguen igual conservan su orden.
+
+    Args:
+        path: Markdown de Marker
+        output: BDC.json destino
+        max_workers: Procesos del pool
+        rebuild_dataset: Si True y BDC.json cambió, ejecuta el pipeline de
+            createDataSet.py (que actualiza las copias de APIs y Metrics)
+
+    Returns:
+        Filas de BDC.json
+    """
+    rows = list(parse(path, max_workers=max_workers))
+    reference = None
+    if os.path.exists(output):
+        diff = compare_golden(rows, output)
+        with open(output, "r", encoding="utf-8") as f:
+            reference = json.load(f)
+        if not diff["missing"] and not diff["extra"]:
+            print(f"{output} ya está al día ({len(reference)} entradas): no se escribe")
+            return reference
+        print(f"Filas nuevas: {len(diff['extra'])} | eliminadas: {len(diff['missing'])}")
+
+    rows = sort_rows(rows, reference)
+    write_json(rows, output)
+    print(f"JSON guardado en: {output}")
+    print(f"Total de entradas: {len(rows)}")
+    if rebuild_dataset:
+        sys.path.append(os.path.join(SCRIPT_DIR, "../../Complete_DataSets/DB"))
+        from createDataSet import build
+        build()
+    return rows
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Parser del Breve Diccionario de Colombianismos")
+    parser.add_argument("--check", action="store_true",
+                        help="Compara con BDC.json actual sin escribir nada")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--dataset", action="store_true",
+                        help="Si BDC.json cambió, ejecuta también createDataSet.py")
+    args = parser.parse_args()
+
+    if args.check:
+        import time
+
+        start = time.time()
+        rows = list(parse(max_workers=args.workers))
+        diff = compare_golden(rows)
+        print(f"{len(rows)} filas en {time.time() - start:.2f}s | "
+              f"faltan {len(diff['missing'])} | sobran {len(diff['extra'])}")
+        for label in ("missing", "extra"):
+            for row in diff[label][:10]:
+                print(f"  {label}: {row}")
+        sys.exit(1 if diff["missing"] or diff["extra"] else 0)
+    generate(max_workers=args.workers, rebuild_dataset=args.dataset)
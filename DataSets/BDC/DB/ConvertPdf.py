@@ -1,13 +1,24 @@
 """
 Módulo para convertir archivos PDF a texto plano utilizando la biblioteca marker.
 Procesa PDFs del Diccionario Breve de Colombianismos y extrae texto y metadatos.
+
+Además de la conversión completa, tiene un modo por páginas (--pages): el PDF
+se divide en rangos que convierte un pool de procesos en CPU, cada página se
+guarda en caché según el hash de su contenido y la versión de marker, y al
+final se unen en orden. Si la conversión se interrumpe, o después de
+actualizar marker, sólo se rehacen las páginas que faltan o cambiaron.
 """
 
 from marker.converters.pdf import PdfConverter
 from marker.models import create_model_dict
 from marker.output import text_from_rendered
 import os
+import re
 import json
+import time
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from importlib.metadata import version, PackageNotFoundError
 from pathlib import Path
 
 
@@ -59,6 +70,197 @@ def save_metadata(metadata, pdf_filename, output_dir="output"):
     print(f"Metadatos guardados en: {metadata_file}")
     return metadata_file
 
+# ============================================================================
+# CONVERSIÓN POR PÁGINAS CON CACHÉ
+# ============================================================================
+
+# Separador que agrega marker con paginate_output: "\n\n{3}------...\n\n"
+page_separator_pattern = re.compile(r"\n*\{(\d+)\}-{48}\n*")
+
+
+def marker_version():
+    """Versión instalada de marker (forma parte de la clave de caché)."""
+    try:
+        return version("marker-pdf")
+    except PackageNotFoundError:
+        return "desconocida"
+
+
+def page_hashes(pdf_file):
+    """
+    Hash del contenido de cada página: tamaño, texto y render en escala de grises.
+
+    Se calcula desde lo que se ve en la página (no desde los bytes del PDF,
+    que cambian con cada guardado), así que sólo cambia si cambia la página.
+
+    Args:
+        pdf_file (str): Ruta del PDF.
+
+    Returns:
+        list[str]: SHA-256 de cada página, en orden.
+    """
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(pdf_file)
+    hashes = []
+    try:
+        for page in pdf:
+            digest = hashlib.sha256(repr(page.get_size()).encode("utf-8"))
+            digest.update(page.get_textpage().get_text_range().encode("utf-8"))
+            digest.update(page.render(scale=1, grayscale=True).to_numpy().tobytes())
+            hashes.append(digest.hexdigest())
+    finally:
+        pdf.close()
+    return hashes
+
+
+def split_pages(markdown):
+    """
+    Separa el markdown paginado de marker en {número de página: texto}.
+    """
+    parts = page_separator_pattern.split(markdown)
+    # parts = [antes del primer separador, id, texto, id, texto, ...]
+    return {int(parts[i]): parts[i + 1].strip() for i in range(1, len(parts) - 1, 2)}
+
+
+_artifact_dict = None
+
+
+def _init_worker(threads):
+    """Carga los modelos una sola vez por proceso del pool."""
+    global _artifact_dict
+    import torch
+
+    torch.set_num_threads(threads)
+    _artifact_dict = create_model_dict(device="cpu")
+
+
+def _convert_range(pdf_file, pages):
+    """
+    Convierte un rango de páginas con los modelos del proceso.
+
+    Returns:
+        tuple: ({página: {"text", "page_stats", "table_of_contents"}}, segundos)
+
+    Raises:
+        ValueError: Si el markdown no trae el separador de alguna página (ej: otro
+            formato de paginate_output); así esas páginas no se guardan vacías en caché.
+    """
+    start = time.time()
+    converter = PdfConverter(artifact_dict=_artifact_dict,
+                             config={"page_range": list(pages), "paginate_output": True})
+    rendered = converter(pdf_file)
+    texts = split_pages(rendered.markdown)
+    # marker escribe el separador de cada página aunque esté en blanco
+    missing = [page for page in pages if page not in texts]
+    if missing:
+        raise ValueError(f"{len(texts)} textos de página para {len(pages)} páginas pedidas; "
+                         f"sin separador: {missing} (¿cambió el formato de marker?)")
+    metadata = rendered.metadata or {}
+    results = {}
+    for page in pages:
+        results[page] = {
+            "text": texts[page],
+            "page_stats": [s for s in metadata.get("page_stats", []) if s.get("page_id") == page],
+            "table_of_contents": [t for t in metadata.get("table_of_contents", []) if t.get("page_id") == page],
+        }
+    return results, time.time() - start
+
+
+def _page_ranges(pages, pages_per_task):
+    """Agrupa páginas consecutivas en rangos de hasta pages_per_task páginas."""
+    ranges, current = [], []
+    for page in pages:
+        if current and (page != current[-1] + 1 or len(current) >= pages_per_task):
+            ranges.append(current)
+            current = []
+        current.append(page)
+    if current:
+        ranges.append(current)
+    return ranges
+
+
+def _write_json(path, data):
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(f"{path}.tmp", path)
+
+
+def convert_by_pages(pdf_file, output_dir="output", max_workers=2, pages_per_task=4):
+    """
+    Convierte un PDF por rangos de páginas en paralelo, con caché por página.
+
+    Cada página se guarda en output/pages/<hash>.json al terminar su rango,
+    con su texto, sus metadatos y el tiempo de conversión (el del rango
+    repartido entre sus páginas). La clave es el hash del contenido de la
+    página más la versión de marker. Si alguna página falla, no se escribe
+    el texto final y basta con volver a ejecutar.
+
+    Args:
+        pdf_file (str): Ruta del PDF.
+        output_dir (str): Directorio de salida. Por defecto 'output'.
+        max_workers (int): Procesos del pool (cada uno carga los modelos).
+        pages_per_task (int): Páginas por rango.
+
+    Returns:
+        str | None: Ruta del texto generado, o None si quedaron páginas sin convertir.
+    """
+    cache_dir = os.path.join(output_dir, "pages")
+    os.makedirs(cache_dir, exist_ok=True)
+
+    marker = marker_version()
+    hashes = page_hashes(pdf_file)
+    keys = [hashlib.sha256(f"{marker}\0{h}".encode("utf-8")).hexdigest() for h in hashes]
+    paths = [os.path.join(cache_dir, f"{key}.json") for key in keys]
+    missing = [page for page, path in enumerate(paths) if not os.path.exists(path)]
+    print(f"Páginas: {len(paths)} | en caché: {len(paths) - len(missing)} | por convertir: {len(missing)}")
+
+    failed = []
+    if missing:
+        threads = max(1, (os.cpu_count() or 1) // max_workers)
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(threads,)) as executor:
+            futures = {executor.submit(_convert_range, pdf_file, pages): pages
+                       for pages in _page_ranges(missing, pages_per_task)}
+            for future in as_completed(futures):
+                pages = futures[future]
+                try:
+                    results, seconds = future.result()
+                except Exception as e:
+                    print(f"✗ Error en páginas {pages[0]}-{pages[-1]}: {str(e)}")
+                    failed.extend(pages)
+                    continue
+                for page in pages:
+                    _write_json(paths[page], {"page": page, "hash": hashes[page], "marker": marker,
+                                              "seconds": seconds / len(pages), "range": [pages[0], pages[-1]],
+                                              **results[page]})
+                print(f"✓ Páginas {pages[0]}-{pages[-1]} ({seconds:.1f}s)")
+
+    if failed:
+        print(f"⚠ {len(failed)} páginas sin convertir: volver a ejecutar para reintentarlas")
+        return None
+
+    # Unión en orden
+    texts, metadata, timing = [], {"table_of_contents": [], "page_stats": []}, []
+    for page, path in enumerate(paths):
+        with open(path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached["text"]:
+            texts.append(cached["text"])
+        metadata["table_of_contents"] += cached["table_of_contents"]
+        metadata["page_stats"] += cached["page_stats"]
+        timing.append({"page": page, "hash": hashes[page], "seconds": cached["seconds"],
+                       "reused": page not in missing})
+
+    output_file = save_text_to_file("\n\n".join(texts) + "\n", pdf_file, output_dir)
+    save_metadata(metadata, pdf_file, output_dir)
+    timing_file = os.path.join(output_dir, f"{Path(pdf_file).stem}_pages.json")
+    _write_json(timing_file, {"marker": marker, "pages": timing,
+                              "seconds": sum(t["seconds"] for t in timing if not t["reused"])})
+    print(f"Tiempos por página en: {timing_file}")
+    return output_file
+
+
 def main():
     """
     Función principal para procesar archivos PDF del Diccionario Breve de Colombianismos.
@@ -88,4 +290,21 @@ def main():
             print(f"⚠ Archivo no encontrado: {pdf_file}")
 
 if __name__ == "__main__":
-    main()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Conversión del PDF del BDC a texto con marker")
+    parser.add_argument("--pages", action="store_true",
+                        help="Convierte por rangos de páginas en paralelo, con caché por página")
+    parser.add_argument("--workers", type=int, default=2, help="Procesos del pool (modo --pages)")
+    parser.add_argument("--pages-per-task", type=int, default=4, help="Páginas por rango (modo --pages)")
+    args = parser.parse_args()
+
+    if args.pages:
+        pdf_file = "Diccionario_breve_de_Colombiaismos_slown.pdf"
+        if os.path.exists(pdf_file):
+            print(f"\nProcesando por páginas: {pdf_file}")
+            convert_by_pages(pdf_file, max_workers=args.workers, pages_per_task=args.pages_per_task)
+        else:
+            print(f"⚠ Archivo no encontrado: {pdf_file}")
+    else:
+        main()
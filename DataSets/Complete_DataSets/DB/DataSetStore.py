@@ -0,0 +1,297 @@
+"""
+Artefacto canónico del dataset de modismos colombianos (SQLite).
+
+Guarda una sola vez todas las entradas de DataSet.json, con índices sobre el
+modismo normalizado, la fuente y la región. Cada variante (ConEjemplos,
+PrimeraOcurrencia, ConRegión...) es una vista SQL sobre la lista ordenada de
+ids de sus entradas, y los JSON de siempre se pueden exportar desde ellas.
+"""
+
+import os
+import json
+import sqlite3
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional
+
+# Obtener el directorio del script
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_DB_PATH = os.path.join(SCRIPT_DIR, "../DataSet.sqlite")
+
+FIELDS = ("modismo", "significado", "ejemplo", "región", "Fuente")
+
+# Variante -> archivo JSON que generaba createDataSet.py
+VARIANTS = {
+    "DataSet": "DataSet.json",
+    "DataSet_ConEjemplos": "DataSet_ConEjemplos.json",
+    "DataSet_PrimeraOcurrencia": "DataSet_PrimeraOcurrencia.json",
+    "DataSet_ConRegión": "DataSet_ConRegión.json",
+    "DataSet_PrimeraOcurrencia_ConEjemplo": "DataSet_PrimeraOcurrencia_ConEjemplo.json",
+}
+
+# Columnas de las vistas con los nombres de los JSON
+_SELECT = 'e.modismo, e.significado, e.ejemplo, e.region AS "región", e.fuente AS "Fuente"'
+
+_SCHEMA = """
+CREATE TABLE entries (
+    id INTEGER PRIMARY KEY,
+    modismo TEXT NOT NULL,
+    modismo_norm TEXT NOT NULL,
+    significado TEXT,
+    ejemplo TEXT,
+    region TEXT,
+    fuente TEXT NOT NULL
+);
+CREATE TABLE entry_regions (
+    entry_id INTEGER NOT NULL REFERENCES entries (id),
+    region TEXT NOT NULL,
+    region_norm TEXT NOT NULL
+);
+-- Filas de cada variante, en el orden de su JSON
+CREATE TABLE variant_rows (
+    variant TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    entry_id INTEGER NOT NULL REFERENCES entries (id),
+    PRIMARY KEY (variant, position)
+) WITHOUT ROWID;
+CREATE INDEX entries_modismo ON entries (modismo);
+CREATE INDEX entries_modismo_norm ON entries (modismo_norm);
+CREATE INDEX entries_fuente ON entries (fuente);
+CREATE INDEX entries_region ON entries (region);
+CREATE INDEX entry_regions_norm ON entry_regions (region_norm, entry_id);
+CREATE INDEX variant_rows_entry ON variant_rows (entry_id, variant);
+
+-- Todas las definiciones de cada modismo normalizado
+CREATE VIEW definiciones AS
+    SELECT modismo_norm, COUNT(*) AS n, json_group_array(significado) AS significados
+    FROM (SELECT modismo_norm, significado FROM entries ORDER BY id)
+    GROUP BY modismo_norm;
+"""
+
+
+def _variant_view(variant: str) -> str:
+    if variant == "DataSet":
+        return f'CREATE VIEW "DataSet" AS SELECT e.id AS position, e.id, {_SELECT} FROM entries e;'
+    return (f'CREATE VIEW "{variant}" AS SELECT v.position, e.id, {_SELECT} '
+            f"FROM variant_rows v JOIN entries e ON e.id = v.entry_id WHERE v.variant = '{variant}';")
+
+
+def normalize(text: Optional[str]) -> str:
+    """
+    Forma de búsqueda de un texto: sin tildes, casefold y espacios colapsados.
+
+    La ñ se conserva (no es una tilde: "año" y "ano" son modismos distintos).
+    """
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFD", text.casefold())
+    kept = []
+    for char in decomposed:
+        if unicodedata.combining(char) and not (char == "\u0303" and kept and kept[-1] == "n"):
+            continue
+        kept.append(char)
+    return " ".join(unicodedata.normalize("NFC", "".join(kept)).split())
+
+
+def _value(value: Any) -> Optional[str]:
+    """None para valores vacíos o NaN (los DataFrame de createDataSet.py usan np.nan)."""
+    if value is None or (isinstance(value, float) and value != value) or value == "":
+        return None
+    return value
+
+
+def _record_key(entry: Dict[str, Any]) -> tuple:
+    return tuple(_value(entry.get(name)) for name in FIELDS)
+
+
+def build_database(entries: Iterable[Dict[str, Any]], variants: Dict[str, Iterable[Dict[str, Any]]],
+                   path: str = DEFAULT_DB_PATH) -> str:
+    """
+    Crea el artefacto SQLite con todas las entradas y las filas de cada variante.
+
+    Cada entrada se guarda una sola vez; una variante es la lista ordenada de
+    ids de sus registros (el orden y los desempates de sort_values de pandas
+    no se pueden recalcular en SQL, así que se conservan tal cual).
+
+    Args:
+        entries: Registros de DataSet.json, en su orden {modismo, significado, ejemplo, región, Fuente}
+        variants: {nombre de VARIANTS: registros} (sin "DataSet")
+        path: Archivo destino (se reemplaza)
+
+    Returns:
+        Ruta del archivo escrito
+    """
+    rows, regions, ids = [], [], {}
+    for i, entry in enumerate(entries):
+        key = _record_key(entry)
+        modismo, significado, ejemplo, region, fuente = key
+        rows.append((i, modismo, normalize(modismo), significado, ejemplo, region, fuente))
+        ids.setdefault(key, []).append(i)
+        for name in (region or "").split(","):
+            if name.strip():
+                regions.append((i, name.strip(), normalize(name)))
+
+    variant_rows = []
+    for variant, records in variants.items():
+        if variant not in VARIANTS or variant == "DataSet":
+            raise ValueError(f"Variante desconocida: {variant}")
+        # Registros repetidos en DataSet se asignan en orden a sus distintos ids
+        used: Dict[tuple, int] = {}
+        for position, entry in enumerate(records):
+            key = _record_key(entry)
+            candidates = ids.get(key)
+            if not candidates:
+                raise ValueError(f"{variant}: registro que no está en DataSet ({key[0]!r})")
+            n = used.get(key, 0)
+            variant_rows.append((variant, position, candidates[min(n, len(candidates) - 1)]))
+            used[key] = n + 1
+
+    temp_path = f"{path}.tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    conn = sqlite3.connect(temp_path)
+    try:
+        conn.executescript(_SCHEMA)
+        for variant in VARIANTS:
+            conn.execute(_variant_view(variant))
+        conn.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        conn.executemany("INSERT INTO entry_regions VALUES (?, ?, ?)", regions)
+        conn.executemany("INSERT INTO variant_rows VALUES (?, ?, ?)", variant_rows)
+        conn.commit()
+        conn.execute("ANALYZE")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    os.replace(temp_path, path)
+    return path
+
+
+def find_file(directory: str, filename: str) -> str:
+    """Ruta de un JSON sin distinguir mayúsculas (el repo tiene DataSet_conEjemplos.json)."""
+    path = os.path.join(directory, filename)
+    if not os.path.exists(path):
+        for name in os.listdir(directory):
+            if name.casefold() == filename.casefold():
+                return os.path.join(directory, name)
+    return path
+
+
+def build_from_json(directory: str = os.path.join(SCRIPT_DIR, ".."), path: str = DEFAULT_DB_PATH) -> str:
+    """Crea el artefacto desde los cinco JSON de Complete_DataSets."""
+    data = {}
+    for variant, filename in VARIANTS.items():
+        with open(find_file(directory, filename), "r", encoding="utf-8") as f:
+            data[variant] = json.load(f)
+    entries = data.pop("DataSet")
+    return build_database(entries, data, path)
+
+
+class DataSetStore:
+    """
+    Acceso de solo lectura al dataset canónico.
+
+    Args:
+        path: Archivo SQLite (default: Complete_DataSets/DataSet.sqlite)
+    """
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No existe {path}: ejecutar createDataSet.py")
+        self.path = path
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def _view(variant: str) -> str:
+        if variant not in VARIANTS:
+            raise ValueError(f"Variante desconocida: {variant} (opciones: {', '.join(VARIANTS)})")
+        return f'"{variant}"'
+
+    def _records(self, sql: str, params: Iterable[Any] = ()) -> List[Dict[str, Any]]:
+        return [{name: row[name] for name in FIELDS} for row in self._conn.execute(sql, tuple(params))]
+
+    def variant(self, variant: str = "DataSet") -> List[Dict[str, Any]]:
+        """Registros de una variante, en el orden de su JSON."""
+        return self._records(f"SELECT * FROM {self._view(variant)} ORDER BY position")
+
+    def frame(self, variant: str = "DataSet"):
+        """Registros de una variante como DataFrame de pandas."""
+        import pandas as pd
+
+        return pd.DataFrame(self.variant(variant), columns=list(FIELDS))
+
+    def count(self, variant: str = "DataSet") -> int:
+        return self._conn.execute(f"SELECT COUNT(*) FROM {self._view(variant)}").fetchone()[0]
+
+    def lookup(self, modismo: str, variant: str = "DataSet") -> List[Dict[str, Any]]:
+        """
+        Entradas de un modismo sin distinguir mayúsculas ni tildes.
+
+        Args:
+            modismo: Texto a buscar (ej: "arepa de choclo", "ARÉPA DE CHOCLO")
+            variant: Variante en la que buscar
+
+        Returns:
+            Lista de registros (vacía si no está)
+        """
+        return self._records(
+            f"SELECT v.* FROM {self._view(variant)} v JOIN entries e ON e.id = v.id "
+            f"WHERE e.modismo_norm = ? ORDER BY v.position", (normalize(modismo),))
+
+    def by_source(self, fuente: str, variant: str = "DataSet") -> List[Dict[str, Any]]:
+        """Registros de una fuente ('BDC' o 'DICOL')."""
+        return self._records(
+            f'SELECT * FROM {self._view(variant)} WHERE "Fuente" = ? ORDER BY position', (fuente,))
+
+    def by_region(self, region: str, variant: str = "DataSet") -> List[Dict[str, Any]]:
+        """Registros usados en una región (ej: 'boyaca'), aunque la entrada liste varias."""
+        return self._records(
+            f"SELECT v.* FROM {self._view(variant)} v WHERE v.id IN "
+            f"(SELECT entry_id FROM entry_regions WHERE region_norm = ?) ORDER BY v.position",
+            (normalize(region),))
+
+    def regions(self) -> Dict[str, int]:
+        """Entradas por región."""
+        return dict(self._conn.execute(
+            "SELECT region, COUNT(*) FROM entry_regions GROUP BY region_norm ORDER BY COUNT(*) DESC"))
+
+    def definitions(self, modismos: Iterable[str]) -> Dict[str, List[str]]:
+        """
+        Todas las definiciones de cada modismo (join contra la vista definiciones).
+
+        Args:
+            modismos: Modismos a buscar (ej: los de un archivo de resultados)
+
+        Returns:
+            Dict {modismo tal como se pidió: [significados]} (lista vacía si no está)
+        """
+        modismos = list(dict.fromkeys(modismos))
+        self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS query (modismo TEXT, modismo_norm TEXT)")
+        self._conn.execute("DELETE FROM query")
+        self._conn.executemany("INSERT INTO query VALUES (?, ?)", ((m, normalize(m)) for m in modismos))
+        found = {row[0]: json.loads(row[1]) for row in self._conn.execute(
+            "SELECT q.modismo, d.significados FROM query q JOIN definiciones d ON d.modismo_norm = q.modismo_norm")}
+        return {modismo: found.get(modismo, []) for modismo in modismos}
+
+    def export_json(self, variant: str, path: str) -> str:
+        """Escribe una variante en el formato de createDataSet.py (to_json de pandas, indent=4)."""
+        self.frame(variant).to_json(path, orient="records", force_ascii=False, indent=4)
+        return path
+
+    def export_all(self, directory: str) -> List[str]:
+        """Exporta las cinco variantes JSON a un directorio."""
+        return [self.export_json(variant, os.path.join(directory, filename))
+                for variant, filename in VARIANTS.items()]
+
+
+if __name__ == "__main__":
+    print(f"Generado: {build_from_json()}")
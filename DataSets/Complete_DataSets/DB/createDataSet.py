@@ -3,72 +3,367 @@ Generación de conjuntos de datos consolidados de modismos colombianos.
 
 Extrae y combina datos de dos fuentes (DICOL y BDC), aplicando diferentes
 criterios de filtrado para generar múltiples variantes del dataset.
+
+El proceso es un pipeline por etapas (limpieza, unión, primera ocurrencia,
+con ejemplo, con región). Cada etapa se identifica por el hash de su código
+y de sus entradas: sólo se vuelven a ejecutar las etapas cuyas entradas
+cambiaron, y si una etapa produce el mismo contenido las siguientes no se
+recalculan. Los ordenamientos son estables, así que los empates (que deciden
+qué definición queda en la primera ocurrencia) no dependen de la versión de
+pandas o numpy.
+
+manifest.json (versionado) registra de qué fuentes y código sale cada archivo
+versionado: en un checkout limpio, con las mismas fuentes, las etapas adoptan
+esos archivos en vez de regenerarlos. Al final se actualizan las copias de
+APIs/DataSet y Metrics/DataSet sólo si cambiaron las fuentes.
 """
 
+import os
+import json
+import shutil
+import hashlib
+import inspect
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
 import pandas as pd
 import numpy as np
-import os
-pd.set_option('future.no_silent_downcasting', True)
+
+from DataSetStore import VARIANTS, build_database, find_file
 
 # Obtener el directorio del script
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
+DATASETS_DIR = os.path.join(SCRIPT_DIR, "../..")
+OUTPUT_DIR = os.path.join(SCRIPT_DIR, "..")
+REPO_DIR = os.path.join(SCRIPT_DIR, "../../..")
+
+# Resultados intermedios y estado de las etapas (no se versionan)
+STAGES_DIR = os.path.join(SCRIPT_DIR, ".stages")
+
+# Fuentes y código de los archivos versionados (sí se versiona, junto con ellos)
+MANIFEST_PATH = os.path.join(SCRIPT_DIR, "manifest.json")
+
+# Copias de los datasets que usan los otros proyectos
+SYNC_TARGETS = {
+    os.path.join(REPO_DIR, "APIs/DataSet"): ["DataSet_ConEjemplos", "DataSet_PrimeraOcurrencia"],
+    os.path.join(REPO_DIR, "Metrics/DataSet"): ["DataSet", "DataSet_ConEjemplos", "DataSet_ConRegión",
+                                                "DataSet_PrimeraOcurrencia"],
+}
+
+
 def extract_DICOL(location):
     """Extrae datos del Diccionario de Colombianismos (DICOL)."""
     return pd.read_json(location)
 
+
 def extract_BDC(location):
     """Extrae datos del Breve Diccionario de Colombianismos (BDC)."""
     return pd.read_json(location)
 
 
-# Carga y limpieza de DICOL
-location_DICOL = os.path.join(SCRIPT_DIR, "../../DICOL/DICOL.json")
-DICOL = extract_DICOL(location_DICOL)
-# Excluye entradas sin definición válida
-DICOL = DICOL[(DICOL["significado"] != "Definición no encontrada.")].copy()
-DICOL = DICOL.replace({'Ejemplo no encontrado.': np.nan, '': np.nan})
-DICOL["Fuente"] = "DICOL"
-
-# Carga y limpieza de BDC
-location_BDC = os.path.join(SCRIPT_DIR, "../../BDC/BDC.json")
-BDC = extract_BDC(location_BDC)
-BDC = BDC[(BDC["significado"] != "")].copy()
-BDC = BDC.replace({'': np.nan})
-BDC["Fuente"] = "BDC"
-
-# Consolidación de ambas fuentes en un único dataset
-print("Datos de BDC: ", len(BDC))
-print("Datos de DICOL: ", len(DICOL))
-print()
-DataSet = pd.concat([BDC, DICOL], ignore_index=True)
-DataSet.rename(columns={"palabra":"modismo"}, inplace=True)
-DataSet.sort_values(by=["modismo"], inplace=True)
-print(f"Total de definiciones: {len(DataSet)}")
-DataSet.to_json(os.path.join(SCRIPT_DIR, "../DataSet.json"), orient="records", force_ascii=False, indent=4)
-
-# Dataset filtrado: solo modismos con ejemplo disponible
-DataSet_WithExample = DataSet.dropna(subset=["ejemplo"]).reset_index(drop=True).sort_values(by=["modismo"])
-print(f"Total de ejemplos: {len(DataSet_WithExample)}")
-DataSet_WithExample.to_json(os.path.join(SCRIPT_DIR, "../DataSet_ConEjemplos.json"), orient="records", force_ascii=False, indent=4)
-
-# Dataset de primera ocurrencia: una entrada por modismo único
-# Criterios de priorización:
-#   1. Fuente BDC sobre DICOL (mayor información regional)
-#   2. Dentro de cada fuente, prioriza entradas con región definida
-DataSet_FirstOccurrence = DataSet.sort_values(by=["Fuente", "región"], ascending=[True, True]).drop_duplicates(subset=["modismo"], keep="first").reset_index(drop=True).sort_values(by=["modismo"])
-print(f"Total modismos únicos: {len(DataSet_FirstOccurrence)}")
-DataSet_FirstOccurrence.to_json(os.path.join(SCRIPT_DIR, "../DataSet_PrimeraOcurrencia.json"), orient="records", force_ascii=False, indent=4)
-
-# Dataset filtrado: solo modismos con región geográfica definida
-DataSet_WithRegion = DataSet.dropna(subset=["región"]).reset_index(drop=True).sort_values(by=["modismo"])
-print(f"Total modismos con región: {len(DataSet_WithRegion)}")
-DataSet_WithRegion.to_json(os.path.join(SCRIPT_DIR, "../DataSet_ConRegión.json"), orient="records", force_ascii=False, indent=4)
-
-
-# Dataset de primera ocurrencia con ejemplo disponible.
-DataSet_FirstOccurrence_WithExample = DataSet_WithExample.sort_values(by=["Fuente", "región"], ascending=[True, True]).drop_duplicates(subset=["modismo"], keep="first").reset_index(drop=True).sort_values(by=["modismo"])
-print(f"Total modismos únicos con ejemplo (primera ocurrencia): {len(DataSet_FirstOccurrence_WithExample)}")
-DataSet_FirstOccurrence_WithExample.to_json(os.path.join(SCRIPT_DIR, "../DataSet_PrimeraOcurrencia_ConEjemplo.json"), orient="records", force_ascii=False, indent=4)
-
-print()
\ No newline at end of file
+# -- etapas --------------------------------------------------------------------
+
+def clean_DICOL(location):
+    """Carga y limpieza de DICOL: excluye entradas sin definición válida."""
+    DICOL = extract_DICOL(location)
+    DICOL = DICOL[(DICOL["significado"] != "Definición no encontrada.")].copy()
+    with pd.option_context('future.no_silent_downcasting', True):
+        DICOL = DICOL.replace({'Ejemplo no encontrado.': np.nan, '': np.nan})
+    DICOL["Fuente"] = "DICOL"
+    return DICOL
+
+
+def clean_BDC(location):
+    """Carga y limpieza de BDC: excluye entradas sin significado."""
+    BDC = extract_BDC(location)
+    BDC = BDC[(BDC["significado"] != "")].copy()
+    with pd.option_context('future.no_silent_downcasting', True):
+        BDC = BDC.replace({'': np.nan})
+    BDC["Fuente"] = "BDC"
+    return BDC
+
+
+def merge(BDC, DICOL):
+    """
+    Consolidación de ambas fuentes en un único dataset ordenado por modismo.
+
+    El ordenamiento es estable: las definiciones de un mismo modismo quedan
+    en el orden de entrada (BDC antes que DICOL, cada una en el de su archivo).
+    """
+    DataSet = pd.concat([BDC, DICOL], ignore_index=True)
+    DataSet.rename(columns={"palabra": "modismo"}, inplace=True)
+    DataSet.sort_values(by=["modismo"], kind="stable", inplace=True)
+    return DataSet
+
+
+def with_example(DataSet):
+    """Solo modismos con ejemplo disponible."""
+    return DataSet.dropna(subset=["ejemplo"]).reset_index(drop=True).sort_values(by=["modismo"], kind="stable")
+
+
+def first_occurrence(DataSet):
+    """
+    Una entrada por modismo único.
+
+    Criterios de priorización:
+        1. Fuente BDC sobre DICOL (mayor información regional)
+        2. Dentro de cada fuente, prioriza entradas con región definida
+        3. En empate, la primera en el orden de DataSet (ordenamientos estables)
+    """
+    return DataSet.sort_values(by=["Fuente", "región"], ascending=[True, True], kind="stable").drop_duplicates(
+        subset=["modismo"], keep="first").reset_index(drop=True).sort_values(by=["modismo"], kind="stable")
+
+
+def with_region(DataSet):
+    """Solo modismos con región geográfica definida."""
+    return DataSet.dropna(subset=["región"]).reset_index(drop=True).sort_values(by=["modismo"], kind="stable")
+
+
+# (nombre, función, entradas, variante que escribe). Las entradas son archivos
+# fuente ("file:...") o etapas anteriores.
+STAGES: List[Tuple[str, Callable, Tuple[str, ...], Optional[str]]] = [
+    ("clean_DICOL", clean_DICOL, ("file:DICOL/DICOL.json",), None),
+    ("clean_BDC", clean_BDC, ("file:BDC/BDC.json",), None),
+    ("merge", merge, ("clean_BDC", "clean_DICOL"), "DataSet"),
+    ("with_example", with_example, ("merge",), "DataSet_ConEjemplos"),
+    ("first_occurrence", first_occurrence, ("merge",), "DataSet_PrimeraOcurrencia"),
+    ("with_region", with_region, ("merge",), "DataSet_ConRegión"),
+    ("first_occurrence_with_example", first_occurrence, ("with_example",), "DataSet_PrimeraOcurrencia_ConEjemplo"),
+]
+
+
+# -- hashes y estado -------------------------------------------------------------
+
+def _file_hash(path: str) -> Optional[str]:
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _frame_hash(df: pd.DataFrame) -> str:
+    """Hash del contenido de un DataFrame (valores, orden y columnas)."""
+    digest = hashlib.sha256("\x00".join(map(str, df.columns)).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+def _stage_key(function: Callable, input_hashes: List[str]) -> str:
+    """Clave de una etapa: su código más el contenido de sus entradas."""
+    digest = hashlib.sha256(inspect.getsource(function).encode("utf-8"))
+    for value in input_hashes:
+        digest.update(value.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _load_json(path: str) -> Dict[str, Any]:
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def _save_json(path: str, data: Dict[str, Any]):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+    os.replace(f"{path}.tmp", path)
+
+
+def _load_state() -> Dict[str, Dict[str, Any]]:
+    return _load_json(os.path.join(STAGES_DIR, "state.json"))
+
+
+def _save_state(state: Dict[str, Dict[str, Any]]):
+    _save_json(os.path.join(STAGES_DIR, "state.json"), state)
+
+
+def _copy_if_changed(source: str, target: str) -> bool:
+    """Copia source sobre target sólo si su contenido es distinto."""
+    if _file_hash(source) == _file_hash(target):
+        return False
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.copyfile(source, f"{target}.tmp")
+    os.replace(f"{target}.tmp", target)
+    return True
+
+
+# -- pipeline ----------------------------------------------------------------------
+
+def output_path(variant: str) -> str:
+    """Archivo JSON de una variante en Complete_DataSets (respeta el nombre existente)."""
+    return find_file(OUTPUT_DIR, VARIANTS[variant])
+
+
+def _read_output(path: str) -> pd.DataFrame:
+    """DataFrame con los registros de un JSON de salida, tal cual y en su orden."""
+    with open(path, "r", encoding="utf-8") as f:
+        return pd.DataFrame(json.load(f))
+
+
+def build(force: bool = False, sync: bool = True, verbose: bool = True) -> Dict[str, str]:
+    """
+    Ejecuta las etapas desactualizadas y escribe sus archivos.
+
+    Si el archivo versionado de una etapa salió de las mismas fuentes y del
+    mismo código (según manifest.json), la etapa adopta ese archivo en vez de
+    ejecutarse o de reescribirlo: un checkout limpio no cambia los datasets.
+
+    Args:
+        force: Ejecuta todas las etapas aunque estén al día (ignora manifest.json)
+        sync: Actualiza las copias de APIs/DataSet y Metrics/DataSet de las
+            variantes regeneradas porque cambiaron DICOL.json o BDC.json
+        verbose: Imprime el estado de cada etapa
+
+    Returns:
+        Dict {etapa: 'ejecutada' | 'al día' | 'reescrita' | 'versionada'}
+        (más 'sync:<archivo>' por copia actualizada)
+    """
+    state = {} if force else _load_state()
+    manifest = _load_json(MANIFEST_PATH)
+    pinned = {} if force else manifest
+    frames: Dict[str, pd.DataFrame] = {}
+    hashes: Dict[str, str] = {}
+    report: Dict[str, str] = {}
+
+    # Clave de cada etapa según los archivos fuente y el código (no depende de pandas)
+    source_keys: Dict[str, str] = {}
+    stage_sources: Dict[str, set] = {}
+    file_hashes = {i[5:]: _file_hash(os.path.join(DATASETS_DIR, i[5:])) or ""
+                   for _, _, inputs, _ in STAGES for i in inputs if i.startswith("file:")}
+    changed_sources = {path for path, value in file_hashes.items()
+                       if manifest.get("sources", {}).get(path) != value}
+
+    def frame(name: str) -> pd.DataFrame:
+        if name not in frames:
+            frames[name] = pd.read_pickle(os.path.join(STAGES_DIR, f"{name}.pkl"))
+        return frames[name]
+
+    def store(name: str, key: str):
+        hashes[name] = _frame_hash(frames[name])
+        os.makedirs(STAGES_DIR, exist_ok=True)
+        frames[name].to_pickle(os.path.join(STAGES_DIR, f"{name}.pkl"))
+        state[name] = {"key": key, "hash": hashes[name], "rows": len(frames[name])}
+
+    for name, function, inputs, variant in STAGES:
+        input_hashes = [file_hashes[i[5:]] if i.startswith("file:") else hashes[i] for i in inputs]
+        key = _stage_key(function, input_hashes)
+        source_keys[name] = _stage_key(function, [file_hashes[i[5:]] if i.startswith("file:") else source_keys[i]
+                                                  for i in inputs])
+        stage_sources[name] = set().union(*({i[5:]} if i.startswith("file:") else stage_sources[i] for i in inputs))
+        previous = state.get(name, {})
+        cached = previous.get("key") == key and os.path.exists(os.path.join(STAGES_DIR, f"{name}.pkl"))
+        path = output_path(variant) if variant is not None else None
+        on_disk = _file_hash(path) if path is not None else None
+        versioned = pinned.get(name, {})
+        # El archivo versionado ya es la salida de estas fuentes y este código (ej: checkout limpio)
+        adopt = versioned.get("source_key") == source_keys[name] and on_disk == versioned.get("file_hash")
+
+        if cached and (not adopt or on_disk == previous.get("file_hash")):
+            hashes[name] = previous["hash"]
+            report[name] = "al día"
+        elif adopt:
+            frames[name] = _read_output(path)
+            store(name, key)
+            state[name]["file_hash"] = versioned["file_hash"]
+            report[name] = "versionada"
+        else:
+            args = [os.path.join(DATASETS_DIR, i[5:]) if i.startswith("file:") else frame(i) for i in inputs]
+            frames[name] = function(*args)
+            store(name, key)
+            report[name] = "ejecutada"
+
+        if variant is not None:
+            # También se reescribe si el archivo falta o se editó a mano
+            if report[name] == "ejecutada" or on_disk != state[name].get("file_hash"):
+                frame(name).to_json(path, orient="records", force_ascii=False, indent=4)
+                state[name]["file_hash"] = _file_hash(path)
+                if report[name] == "al día":
+                    report[name] = "reescrita"
+            if report[name] == "ejecutada":
+                manifest[name] = {"source_key": source_keys[name], "file_hash": state[name]["file_hash"]}
+        _save_state(state)
+
+        if verbose:
+            print(f"{name:<30} {report[name]:<10} {state[name]['rows']:>6} registros")
+
+    # Artefacto canónico: todas las entradas una sola vez, con índices y una vista por variante
+    database_key = hashlib.sha256("".join(state[name]["file_hash"] for name, *_, variant in STAGES
+                                          if variant).encode("utf-8")).hexdigest()
+    database_path = os.path.join(OUTPUT_DIR, "DataSet.sqlite")
+    versioned = pinned.get("database", {})
+    if (state.get("database", {}).get("key") != database_key and versioned.get("key") == database_key
+            and _file_hash(database_path) == versioned.get("file_hash")):
+        state["database"] = {"key": database_key}
+        _save_state(state)
+    if state.get("database", {}).get("key") != database_key or not os.path.exists(database_path):
+        variants = {variant: frame(name).to_dict("records") for name, *_, variant in STAGES if variant}
+        build_database(variants.pop("DataSet"), variants, database_path)
+        state["database"] = {"key": database_key}
+        _save_state(state)
+        manifest["database"] = {"key": database_key, "file_hash": _file_hash(database_path)}
+        report["database"] = "ejecutada"
+        if verbose:
+            print("Artefacto SQLite: DataSet.sqlite")
+
+    if any(value == "ejecutada" for value in report.values()):
+        manifest["sources"] = file_hashes
+        if manifest != _load_json(MANIFEST_PATH):
+            _save_json(MANIFEST_PATH, manifest)
+
+    if sync:
+        # Sólo se propagan las variantes regeneradas porque cambiaron sus fuentes: un cambio de
+        # código o de desempates con las mismas fuentes no debe mover la referencia de APIs y Metrics
+        regenerated = [variant for name, *_, variant in STAGES
+                       if variant and report[name] == "ejecutada" and stage_sources[name] & changed_sources]
+        for name in sync_copies(regenerated):
+            report[f"sync:{name}"] = "actualizada"
+            if verbose:
+                print(f"Copia actualizada: {name}")
+        if verbose:
+            for name in stale_copies():
+                print(f"Copia distinta de Complete_DataSets (no se actualiza, ver sync_copies()): {name}")
+    return report
+
+
+def _copies(variants: Optional[List[str]] = None) -> List[Tuple[str, str]]:
+    """(archivo de Complete_DataSets, copia) de las variantes pedidas (todas si None)."""
+    return [(output_path(variant), os.path.join(directory, VARIANTS[variant]))
+            for directory, names in SYNC_TARGETS.items() for variant in names
+            if variants is None or variant in variants]
+
+
+def stale_copies() -> List[str]:
+    """Copias de APIs/DataSet y Metrics/DataSet cuyo contenido difiere del de Complete_DataSets."""
+    return [os.path.relpath(target, REPO_DIR) for source, target in _copies()
+            if _file_hash(source) != _file_hash(target)]
+
+
+def sync_copies(variants: Optional[List[str]] = None) -> Dict[str, bool]:
+    """
+    Actualiza las copias de los datasets en APIs/DataSet y Metrics/DataSet.
+
+    Sólo se escriben las que tienen un contenido distinto del de
+    Complete_DataSets (así no cambia su fecha ni invalidan cachés). Las
+    copias son la referencia de las métricas: llamarla a mano sólo cuando el
+    cambio de los datasets es intencional.
+
+    Args:
+        variants: Variantes a sincronizar (default: todas)
+
+    Returns:
+        Dict {copia actualizada: True}
+    """
+    changed = {}
+    for source, target in _copies(variants):
+        if _copy_if_changed(source, target):
+            changed[os.path.relpath(target, REPO_DIR)] = True
+    return changed
+
+
+if __name__ == "__main__":
+    build()
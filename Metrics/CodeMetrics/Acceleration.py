@@ -0,0 +1,284 @@
+"""
+Backends de inferencia en CPU para los encoders de las métricas
+Cuantización dinámica int8 (PyTorch) o exportación a ONNX, seleccionables por métrica
+"""
+
+import os
+import json
+import time
+import random
+import numpy as np
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Backends disponibles:
+#   torch: modelo original en fp32 (referencia)
+#   int8:  cuantización dinámica int8 de las capas lineales (sólo CPU)
+#   onnx:  modelo exportado a ONNX y ejecutado con onnxruntime (sólo CPU)
+BACKENDS = ("torch", "int8", "onnx")
+
+# Backend por defecto para todos los encoders (configurable por entorno)
+DEFAULT_BACKEND = os.environ.get('METRICS_BACKEND', 'torch')
+
+# Directorio de los modelos exportados a ONNX
+DEFAULT_ONNX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Onnx_Models')
+
+# Dataset usado para el chequeo de calibración
+DEFAULT_CALIBRATION_DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'DataSet', 'DataSet.json')
+
+# Diferencia absoluta máxima aceptada frente a fp32 (en unidades del score)
+DEFAULT_MAX_DRIFT = 0.02
+
+# Backend elegido por encoder (nombre del modelo -> backend)
+_backends: Dict[str, str] = {}
+
+
+def _check_backend(backend: str) -> str:
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend no soportado: {backend!r}. Opciones: {', '.join(BACKENDS)}")
+    return backend
+
+
+def get_backend(model_name: str) -> str:
+    """Backend configurado para un encoder (default: METRICS_BACKEND o 'torch')."""
+    return _backends.get(model_name, _check_backend(DEFAULT_BACKEND))
+
+
+def set_backend(model_name: str, backend: str):
+    """
+    Selecciona el backend de un encoder.
+
+    El cambio aplica a la siguiente carga: cada backend se registra como un
+    modelo distinto (ver backend_key), así que el anterior queda en el
+    registro y se desaloja por LRU como cualquier otro.
+
+    Args:
+        model_name: Nombre del modelo de la métrica (ej: model_name_sci_beto, cache_name_scibeto)
+        backend: 'torch', 'int8' u 'onnx'
+    """
+    _backends[model_name] = _check_backend(backend)
+
+
+def backend_key(model_name: str) -> str:
+    """
+    Nombre con el que se registra y se cachea un encoder según su backend.
+
+    Con 'torch' es el nombre original (compatible con las cachés existentes);
+    con otro backend se agrega un sufijo para que sus modelos y embeddings no
+    se mezclen con los de fp32.
+    """
+    backend = get_backend(model_name)
+    return model_name if backend == 'torch' else f"{model_name}@{backend}"
+
+
+def quantize_int8(model: Any) -> Any:
+    """
+    Aplica cuantización dinámica int8 a las capas lineales de un modelo.
+
+    Los pesos de torch.nn.Linear se guardan en int8 y las activaciones se
+    cuantizan al vuelo; el resto del modelo (embeddings, LayerNorm) sigue en
+    fp32. Funciona sobre cualquier torch.nn.Module, incluido un
+    SentenceTransformer completo, pero sólo se ejecuta en CPU.
+
+    Args:
+        model: Modelo PyTorch
+
+    Returns:
+        Modelo cuantizado en CPU
+    """
+    import torch
+    model = model.to('cpu').eval()
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class OnnxEncoder:
+    """
+    Modelo transformer exportado a ONNX con la interfaz que usa bert_score.
+
+    Se invoca como el modelo de HuggingFace: model(input_ids, attention_mask=...)
+    y devuelve una tupla cuyo primer elemento es last_hidden_state.
+
+    Args:
+        path: Ruta del archivo .onnx
+    """
+
+    def __init__(self, path: str):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("El backend 'onnx' requiere onnxruntime: pip install onnxruntime") from e
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.path = path
+        self.session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self.device = 'cpu'
+
+    def eval(self):
+        return self
+
+    def __call__(self, input_ids, attention_mask=None, **kwargs):
+        import torch
+        if attention_mask is None:
+            attention_mask = torch.ones_like(input_ids)
+        (hidden,) = self.session.run(['last_hidden_state'], {
+            'input_ids': input_ids.cpu().numpy().astype(np.int64),
+            'attention_mask': attention_mask.cpu().numpy().astype(np.int64),
+        })
+        return (torch.from_numpy(hidden),)
+
+
+def export_onnx(model: Any, name: str, onnx_dir: Optional[str] = None) -> OnnxEncoder:
+    """
+    Exporta un modelo transformer a ONNX (una sola vez) y lo abre con onnxruntime.
+
+    Se exporta el modelo tal como está (por ejemplo, ya truncado a la capa
+    que usa BERTScore), con ejes dinámicos de lote y longitud. Si el archivo
+    ya existe se reutiliza.
+
+    Args:
+        model: Modelo de HuggingFace (AutoModel)
+        name: Nombre del export (ej: 'Flaglab/SciBETO-large-L12')
+        onnx_dir: Directorio de los exports (default: DEFAULT_ONNX_DIR)
+
+    Returns:
+        OnnxEncoder listo para usar
+    """
+    import torch
+
+    path = os.path.join(onnx_dir or DEFAULT_ONNX_DIR, name.replace('/', '__'), 'model.onnx')
+    if not os.path.exists(path):
+        class _LastHiddenState(torch.nn.Module):
+            def __init__(self, wrapped):
+                super().__init__()
+                self.wrapped = wrapped
+
+            def forward(self, input_ids, attention_mask):
+                return self.wrapped(input_ids, attention_mask=attention_mask)[0]
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        dummy = torch.ones(2, 8, dtype=torch.long)
+        print(f"Exportando a ONNX: {name}")
+        # Se escribe a un temporal para no dejar exports a medias
+        torch.onnx.export(
+            _LastHiddenState(model.to('cpu').eval()), (dummy, dummy), path + '.tmp',
+            input_names=['input_ids', 'attention_mask'], output_names=['last_hidden_state'],
+            dynamic_axes={
+                'input_ids': {0: 'batch', 1: 'sequence'},
+                'attention_mask': {0: 'batch', 1: 'sequence'},
+                'last_hidden_state': {0: 'batch', 1: 'sequence'},
+            },
+            opset_version=17, dynamo=False,
+        )
+        os.replace(path + '.tmp', path)
+    return OnnxEncoder(path)
+
+
+def sample_calibration_pairs(n: int = 200, seed: int = 42,
+                             dataset_path: str = DEFAULT_CALIBRATION_DATASET) -> Tuple[List[str], List[str]]:
+    """
+    Muestra de pares (candidato, referencia) del dataset para el chequeo de calibración.
+
+    Usa el ejemplo de uso como candidato y el significado como referencia, de
+    modo que los scores cubran un rango realista sin depender de resultados
+    de LLMs.
+
+    Args:
+        n: Número de pares
+        seed: Semilla del muestreo
+        dataset_path: Ruta del dataset (default: DataSet/DataSet.json)
+
+    Returns:
+        Tupla (candidatos, referencias)
+    """
+    with open(dataset_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    records = [r for r in data if r.get('ejemplo') and r.get('significado')]
+    sample = random.Random(seed).sample(records, min(n, len(records)))
+    return [r['ejemplo'] for r in sample], [r['significado'] for r in sample]
+
+
+def _as_scores(result: Any) -> np.ndarray:
+    """Convierte la salida de una métrica en un array (usa F1 si devuelve P, R, F1)."""
+    if isinstance(result, tuple):
+        result = result[-1]
+    if hasattr(result, 'detach'):
+        result = result.detach().cpu().numpy()
+    return np.asarray(result, dtype=np.float64)
+
+
+def check_calibration(model_name: str, score_fn: Callable[[List[str], List[str]], Any],
+                      backend: str, candidatos: Optional[Sequence[str]] = None,
+                      referencias: Optional[Sequence[str]] = None,
+                      max_drift: float = DEFAULT_MAX_DRIFT, verbose: bool = True) -> Dict[str, Any]:
+    """
+    Compara los scores de un backend acelerado contra el baseline fp32.
+
+    Calcula la métrica dos veces sobre la misma muestra, con 'torch' y con el
+    backend indicado, y reporta la deriva (diferencia absoluta media y
+    máxima, correlación) y la aceleración. Antes de medir cada backend se
+    hace una pasada corta de calentamiento para no contar la carga del modelo.
+    El backend configurado se restaura al terminar.
+
+    Args:
+        model_name: Nombre del modelo de la métrica (el mismo usado en set_backend)
+        score_fn: Función (candidatos, referencias) -> scores; no debe usar cachés
+                  de embeddings (ej: lambda c, r: compute_sbert_similarity(c, r, use_cache=False))
+        backend: Backend a evaluar ('int8' u 'onnx')
+        candidatos: Textos candidatos (default: muestra de sample_calibration_pairs)
+        referencias: Textos de referencia
+        max_drift: Diferencia absoluta máxima aceptada
+        verbose: Imprime el reporte
+
+    Returns:
+        Dict con deriva, correlaciones, tiempos y 'within_tolerance'
+    """
+    from scipy.stats import pearsonr, spearmanr
+
+    _check_backend(backend)
+    if candidatos is None or referencias is None:
+        candidatos, referencias = sample_calibration_pairs()
+    candidatos, referencias = list(candidatos), list(referencias)
+
+    previous = _backends.get(model_name)
+    scores, timings = {}, {}
+    try:
+        for name in ('torch', backend):
+            set_backend(model_name, name)
+            score_fn(candidatos[:8], referencias[:8])
+            t0 = time.perf_counter()
+            scores[name] = _as_scores(score_fn(candidatos, referencias))
+            timings[name] = time.perf_counter() - t0
+    finally:
+        if previous is None:
+            _backends.pop(model_name, None)
+        else:
+            _backends[model_name] = previous
+
+    drift = np.abs(scores[backend] - scores['torch'])
+    report = {
+        'model': model_name,
+        'backend': backend,
+        'pairs': len(candidatos),
+        'mean_abs_drift': float(drift.mean()),
+        'max_abs_drift': float(drift.max()),
+        'mean_shift': float((scores[backend] - scores['torch']).mean()),
+        'pearson': float(pearsonr(scores['torch'], scores[backend])[0]),
+        'spearman': float(spearmanr(scores['torch'], scores[backend])[0]),
+        'seconds_fp32': timings['torch'],
+        f'seconds_{backend}': timings[backend],
+        'speedup': timings['torch'] / max(timings[backend], 1e-9),
+        'within_tolerance': bool(drift.max() <= max_drift),
+    }
+
+    if verbose:
+        print(f"\n{'='*60}")
+        print(f"Calibración {backend} vs fp32 - {model_name} ({len(candidatos)} pares)")
+        print(f"{'='*60}")
+        print(f"Deriva media:   {report['mean_abs_drift']:.5f}")
+        print(f"Deriva máxima:  {report['max_abs_drift']:.5f} (tolerancia {max_drift})")
+        print(f"Pearson:        {report['pearson']:.5f}")
+        print(f"Spearman:       {report['spearman']:.5f}")
+        print(f"Aceleración:    {report['speedup']:.2f}x")
+        print(f"{'✓ Dentro de la tolerancia' if report['within_tolerance'] else '✗ Fuera de la tolerancia'}")
+        print(f"{'='*60}\n")
+    return report
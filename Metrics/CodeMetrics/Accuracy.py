@@ -0,0 +1,318 @@
+"""
+Métricas del Prompt 1 (¿Es modismo? Sí/No) vectorizadas
+Accuracy, precisión/recall, matrices de confusión e intervalos bootstrap de todos los modelos en un solo group-by
+"""
+
+import os
+import json
+import warnings
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+# Modismos del ground truth del Prompt 1 (DataSet_PrimeraOcurrencia)
+GROUNTH_TRUTH = 6_533
+
+DEFAULT_DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'DataSet',
+                               'DataSet_PrimeraOcurrencia.json')
+
+# Clases de la matriz de confusión: real x generada. 'Otro' son respuestas que
+# no se normalizan a Sí/No y 'Omitido' los registros faltantes (errores), que
+# como en el notebook cuentan como falsos negativos
+REAL_LABELS = ('Sí', 'No')
+PRED_LABELS = ('Sí', 'No', 'Otro', 'Omitido')
+
+_ANSWERS = {'sí': 'Sí', 'si': 'Sí', 'yes': 'Sí', 's': 'Sí', 'true': 'Sí', '1': 'Sí',
+            'no': 'No', 'n': 'No', 'false': 'No', '0': 'No'}
+
+_OMITTED = PRED_LABELS.index('Omitido')
+
+
+def normalizar_respuesta(respuesta):
+    """Normaliza respuestas a 'Sí' o 'No'"""
+    if not respuesta:
+        return None
+    respuesta = str(respuesta).strip().lower()
+    return _ANSWERS.get(respuesta, respuesta)
+
+
+def _answer_codes(values: pd.Series, other: int) -> np.ndarray:
+    """Código de cada respuesta: 0 'Sí', 1 'No' y other si no se reconoce."""
+    normalized = values.astype(str).str.strip().str.lower().map(_ANSWERS)
+    codes = pd.Categorical(normalized, categories=['Sí', 'No']).codes.astype(np.int64)
+    return np.where(codes < 0, other, codes)
+
+
+def _valid_records(records: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Registros con es_modismo_real y es_modismo_generado no vacíos (data_p1_valid del notebook)."""
+    frame = pd.DataFrame(records, columns=['modismo', 'modelo', 'es_modismo_real', 'es_modismo_generado'])
+    valid = np.ones(len(frame), dtype=bool)
+    for column in ('es_modismo_real', 'es_modismo_generado'):
+        valid &= frame[column].notna().to_numpy() & frame[column].astype(bool).to_numpy()
+    return frame[valid]
+
+
+def load_groups(dataset_path: str = DEFAULT_DATASET, split_regions: bool = True) -> pd.DataFrame:
+    """
+    Fuente y región de cada modismo del dataset, para los desgloses.
+
+    Args:
+        dataset_path: Dataset de referencia (default: DataSet_PrimeraOcurrencia.json)
+        split_regions: Separa las regiones listadas con comas ('Boyacá, Cundinamarca')
+
+    Returns:
+        DataFrame con modismo, Fuente y región (una fila por región si split_regions)
+    """
+    with open(dataset_path, 'r', encoding='utf-8') as f:
+        data = pd.DataFrame(json.load(f), columns=['modismo', 'Fuente', 'región'])
+    data['modismo'] = data['modismo'].fillna('').str.strip()
+    data = data.drop_duplicates('modismo')
+    data['región'] = data['región'].fillna('Sin región')
+    if split_regions:
+        data['región'] = data['región'].str.split(',')
+        data = data.explode('región')
+        data['región'] = data['región'].str.strip()
+    return data.reset_index(drop=True)
+
+
+def encode_responses(records: List[Dict[str, Any]], models: Sequence[str]) -> pd.DataFrame:
+    """
+    Convierte los registros de prompt_1_metrics_data.json en arrays categóricos.
+
+    Sólo se incluyen los registros de models con es_modismo_real y
+    es_modismo_generado no vacíos (data_p1_valid del notebook).
+
+    Returns:
+        DataFrame con modismo, modelo (categórico en el orden de models),
+        real y pred (códigos en REAL_LABELS / PRED_LABELS)
+    """
+    frame = _valid_records(records)
+    frame = frame[frame['modelo'].isin(models)]
+    return pd.DataFrame({
+        'modismo': frame['modismo'].fillna('').str.strip().to_numpy(),
+        'modelo': pd.Categorical(frame['modelo'], categories=list(models)),
+        'real': _answer_codes(frame['es_modismo_real'], -1),
+        'pred': _answer_codes(frame['es_modismo_generado'], PRED_LABELS.index('Otro')),
+    })
+
+
+def confusion_counts(encoded: pd.DataFrame, by: Optional[Union[str, Sequence[str]]] = None,
+                     groups: Optional[pd.DataFrame] = None,
+                     ground_truth: int = GROUNTH_TRUTH) -> pd.DataFrame:
+    """
+    Matriz de confusión de cada modelo (y grupo) con un solo bincount.
+
+    Los registros faltantes se agregan a la celda (Sí, Omitido): por modelo
+    hasta ground_truth, y por grupo hasta el número de modismos del grupo en
+    el dataset.
+
+    Args:
+        encoded: Salida de encode_responses
+        by: Columna(s) de desglose ('Fuente', 'región') o None
+        groups: Salida de load_groups (requerido si se usa by)
+        ground_truth: Modismos evaluados por modelo
+
+    Returns:
+        DataFrame con una fila por modelo (y grupo) y una columna por celda
+        '<real>/<generada>'
+    """
+    by = [by] if isinstance(by, str) else list(by or [])
+    frame = encoded[encoded['real'] >= 0]
+    models = encoded['modelo'].cat.categories
+    if by:
+        if groups is None:
+            raise ValueError("Los desgloses requieren groups (load_groups())")
+        # Un modismo cuenta una vez por grupo (las regiones separadas sólo importan si se desglosa por región)
+        groups = groups[['modismo'] + by].drop_duplicates()
+        frame = frame.merge(groups, on='modismo', how='left')
+        frame[by] = frame[by].fillna('Desconocido')
+        totals = groups[by].value_counts()
+        observed = pd.MultiIndex.from_frame(frame[by])
+        universe = totals.index.union(observed.unique()).sort_values()
+        group_ids = frame['modelo'].cat.codes.to_numpy().astype(np.int64) * len(universe) + universe.get_indexer(observed)
+        keys = pd.MultiIndex.from_tuples([(model,) + tuple(key) for model in models for key in universe],
+                                         names=['modelo'] + by)
+        expected = np.tile(totals.reindex(universe).fillna(0).to_numpy(), len(models))
+    else:
+        keys = pd.Index(models, name='modelo')
+        group_ids = frame['modelo'].cat.codes.to_numpy().astype(np.int64)
+        expected = np.full(len(keys), ground_truth)
+
+    n_cells = len(REAL_LABELS) * len(PRED_LABELS)
+    cells = group_ids * n_cells + frame['real'].to_numpy() * len(PRED_LABELS) + frame['pred'].to_numpy()
+    counts = np.bincount(cells, minlength=len(keys) * n_cells).reshape(len(keys), n_cells)
+
+    # Faltantes como (Sí, Omitido)
+    counts[:, _OMITTED] += np.maximum(expected - counts.sum(axis=1), 0).astype(np.int64)
+
+    columns = [f"{real}/{pred}" for real in REAL_LABELS for pred in PRED_LABELS]
+    return pd.DataFrame(counts, index=keys, columns=columns)
+
+
+def _rates(counts: np.ndarray) -> Dict[str, np.ndarray]:
+    """Accuracy, precisión, recall y F1 (clase positiva 'Sí') desde celdas (..., 8)."""
+    width = len(PRED_LABELS)
+    tp = counts[..., 0]
+    fn = counts[..., 1:width].sum(axis=-1)
+    fp = counts[..., width]
+    tn = counts[..., width + 1:].sum(axis=-1)
+    total = counts.sum(axis=-1)
+    correct = tp + counts[..., width + 1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        precision = tp / (tp + fp)
+        recall = tp / (tp + fn)
+        return {
+            'accuracy': correct / total,
+            'precision': precision,
+            'recall': recall,
+            'f1': 2 * precision * recall / (precision + recall),
+            'tp': tp, 'fn': fn, 'fp': fp, 'tn': tn, 'correctos': correct, 'n': total,
+        }
+
+
+def bootstrap_rates(counts: np.ndarray, n_boot: int = 1000, seed: int = 42) -> Dict[str, np.ndarray]:
+    """
+    Remuestreo bootstrap de las métricas de todos los grupos a la vez.
+
+    Remuestrear con reemplazo los n registros de un grupo equivale a sacar
+    sus conteos de una multinomial(n, celdas/n), así que todas las réplicas de
+    todos los grupos salen de una sola llamada, sin expandir los registros.
+
+    Returns:
+        Dict {métrica: array (n_boot, grupos)}
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    n = counts.sum(axis=1)
+    pvals = np.where(n[:, None] > 0, counts / np.maximum(n, 1)[:, None], 1 / counts.shape[1])
+    rng = np.random.default_rng(seed)
+    samples = rng.multinomial(n, pvals, size=(n_boot, len(n)))
+    return _rates(samples)
+
+
+def score_prompt_1(records: List[Dict[str, Any]], models: Sequence[str],
+                   by: Optional[Union[str, Sequence[str]]] = None, ground_truth: int = GROUNTH_TRUTH,
+                   dataset_path: str = DEFAULT_DATASET, n_boot: int = 1000, confidence: float = 0.95,
+                   seed: int = 42) -> pd.DataFrame:
+    """
+    Métricas del Prompt 1 de todos los modelos (y grupos).
+
+    Args:
+        records: Registros de prompt_1_metrics_data.json
+        models: Modelos a evaluar; los que no tienen datos quedan con todo omitido
+        by: Desglose opcional: 'Fuente', 'región' o ambas
+        ground_truth: Modismos evaluados por modelo (los faltantes son falsos negativos)
+        dataset_path: Dataset con Fuente y región (sólo para by)
+        n_boot: Réplicas bootstrap (0 para no calcular intervalos)
+        confidence: Nivel de los intervalos
+        seed: Semilla del bootstrap
+
+    Returns:
+        DataFrame por modelo (y grupo) con accuracy, precision, recall, f1, sus
+        intervalos (<métrica>_low, <métrica>_high), conteos tp/fn/fp/tn,
+        procesados, omitidos y las celdas de la matriz de confusión
+    """
+    encoded = encode_responses(records, models)
+    groups = load_groups(dataset_path) if by else None
+    counts = confusion_counts(encoded, by=by, groups=groups, ground_truth=ground_truth)
+
+    values = counts.to_numpy()
+    table = pd.DataFrame(_rates(values), index=counts.index)
+    table['procesados'] = table['n'] - values[:, _OMITTED]
+    table['omitidos'] = values[:, _OMITTED]
+
+    if n_boot:
+        alpha = (1 - confidence) / 2 * 100
+        samples = bootstrap_rates(values, n_boot=n_boot, seed=seed)
+        with warnings.catch_warnings():
+            # Grupos sin positivos: precisión indefinida en todas las réplicas
+            warnings.simplefilter('ignore', RuntimeWarning)
+            for metric in ('accuracy', 'precision', 'recall', 'f1'):
+                low, high = np.nanpercentile(samples[metric], [alpha, 100 - alpha], axis=0)
+                table[f'{metric}_low'] = low
+                table[f'{metric}_high'] = high
+
+    return pd.concat([table, counts], axis=1).reset_index()
+
+
+def correctness_matrix(encoded: pd.DataFrame, ground_truth: int = GROUNTH_TRUTH) -> np.ndarray:
+    """
+    Matriz booleana ítems x modelos (acierto o no) para pruebas pareadas.
+
+    Los modismos que un modelo no respondió cuentan como error; las filas
+    hasta ground_truth que ningún modelo respondió son errores para todos.
+    """
+    frame = encoded[encoded['real'] >= 0].drop_duplicates(['modelo', 'modismo'])
+    items = pd.Index(frame['modismo'].unique())
+    matrix = np.zeros((max(len(items), ground_truth), len(encoded['modelo'].cat.categories)), dtype=bool)
+    correct = frame['real'].to_numpy() == frame['pred'].to_numpy()
+    matrix[items.get_indexer(frame['modismo']), frame['modelo'].cat.codes.to_numpy().astype(np.int64)] = correct
+    return matrix
+
+
+def compare_models(records: List[Dict[str, Any]], models: Sequence[str],
+                   ground_truth: int = GROUNTH_TRUTH) -> pd.DataFrame:
+    """
+    Prueba de McNemar exacta para todos los pares de modelos.
+
+    Los desacuerdos de todos los pares salen de un producto de matrices sobre
+    la matriz de aciertos, así que comparar 20+ modelos cuesta lo mismo que
+    calcular sus accuracies.
+
+    Returns:
+        DataFrame con modelo_a, modelo_b, accuracy_a, accuracy_b, solo_a
+        (aciertos de a donde b falla), solo_b, p_value y p_holm (corrección de
+        Holm sobre todos los pares)
+    """
+    from scipy.stats import binom
+
+    matrix = correctness_matrix(encode_responses(records, models), ground_truth)
+    as_int = matrix.astype(np.int32)
+    only = as_int.T @ (1 - as_int)  # only[i, j]: aciertos de i donde j falla
+    accuracy = matrix.mean(axis=0)
+
+    a, b = np.triu_indices(len(models), k=1)
+    only_a, only_b = only[a, b], only[b, a]
+    discordant = only_a + only_b
+    p_value = np.where(discordant > 0,
+                       np.minimum(1.0, 2 * binom.cdf(np.minimum(only_a, only_b), discordant, 0.5)), 1.0)
+
+    # Holm: p ordenados multiplicados por (m - rango), con máximo acumulado
+    order = np.argsort(p_value)
+    adjusted = np.minimum(1.0, np.maximum.accumulate(p_value[order] * (len(p_value) - np.arange(len(p_value)))))
+    p_holm = np.empty_like(adjusted)
+    p_holm[order] = adjusted
+
+    return pd.DataFrame({
+        'modelo_a': np.asarray(models, dtype=object)[a], 'modelo_b': np.asarray(models, dtype=object)[b],
+        'accuracy_a': accuracy[a], 'accuracy_b': accuracy[b],
+        'solo_a': only_a, 'solo_b': only_b, 'p_value': p_value, 'p_holm': p_holm,
+    })
+
+
+def resultados_records(records: List[Dict[str, Any]], models: Sequence[str],
+                       ground_truth: int = GROUNTH_TRUTH) -> List[Dict[str, Any]]:
+    """
+    Registros de prompt_1_accuracy_resultados.json (mismo formato que el notebook).
+
+    Incluye una fila por respuesta válida y las filas de relleno
+    ('N/A' si el modelo no tiene datos, 'ERROR/OMITIDO' si le faltan
+    registros) hasta ground_truth.
+    """
+    frame = _valid_records(records)
+    real = frame['es_modismo_real'].map(normalizar_respuesta)
+    generado = frame['es_modismo_generado'].map(normalizar_respuesta)
+    frame = pd.DataFrame({'modismo': frame['modismo'], 'modelo': frame['modelo'], 'respuesta_real': real,
+                          'respuesta_generada': generado, 'correcto': real == generado})
+
+    resultados = []
+    by_model = dict(tuple(frame.groupby('modelo', sort=False)))
+    for model in models:
+        model_data = by_model.get(model)
+        processed = 0 if model_data is None else len(model_data)
+        if processed:
+            resultados.extend(model_data.to_dict('records'))
+        filler = 'N/A' if not processed else 'ERROR/OMITIDO'
+        resultados.extend({'modismo': filler, 'modelo': model, 'respuesta_real': 'Sí',
+                           'respuesta_generada': 'No', 'correcto': False}
+                          for _ in range(max(ground_truth - processed, 0)))
+    return resultados
@@ -0,0 +1,74 @@
+"""
+Batching dinámico por longitud para los encoders de texto
+Agrupa textos de longitud parecida en lotes limitados por un presupuesto de tokens
+"""
+
+import os
+import numpy as np
+from typing import Callable, List, Sequence
+
+# Tokens por lote, contando el relleno (len(lote) x longitud máxima del lote).
+# En CPU rinden mejor lotes pequeños; en GPU conviene subirlo (ej: 16384)
+DEFAULT_MAX_TOKENS = int(os.environ.get('METRICS_MAX_TOKENS', '1024'))
+
+# Tope de textos por lote, para que miles de textos de 2-3 tokens no formen un único lote
+DEFAULT_MAX_BATCH_SIZE = 256
+
+
+def token_budget_batches(lengths: Sequence[int], max_tokens: int = DEFAULT_MAX_TOKENS,
+                         max_batch_size: int = DEFAULT_MAX_BATCH_SIZE) -> List[np.ndarray]:
+    """
+    Reparte índices en lotes de longitud similar bajo un presupuesto de tokens.
+
+    Los textos se ordenan de mayor a menor longitud y cada lote toma tantos
+    como quepan en max_tokens con el relleno incluido (el primero de cada
+    lote es el más largo). Así los lotes de salidas cortas ("Sí") son grandes
+    y los de definiciones largas pequeños, y la memoria de cada lote queda
+    acotada por el presupuesto. Un texto más largo que el presupuesto va solo.
+
+    Args:
+        lengths: Longitud en tokens de cada texto
+        max_tokens: Presupuesto de tokens por lote (default: METRICS_MAX_TOKENS o 1024)
+        max_batch_size: Máximo de textos por lote
+
+    Returns:
+        Lista de arrays de índices (posiciones en lengths), uno por lote
+    """
+    lengths = np.asarray(lengths, dtype=np.int64)
+    order = np.argsort(-lengths, kind='stable')
+    batches = []
+    start = 0
+    while start < len(order):
+        longest = max(int(lengths[order[start]]), 1)
+        size = max(1, min(max_tokens // longest, max_batch_size))
+        batches.append(order[start:start + size])
+        start += size
+    return batches
+
+
+def encode_in_batches(textos: Sequence[str], lengths: Sequence[int],
+                      encode_batch: Callable[[List[str]], np.ndarray],
+                      max_tokens: int = DEFAULT_MAX_TOKENS,
+                      max_batch_size: int = DEFAULT_MAX_BATCH_SIZE) -> np.ndarray:
+    """
+    Codifica textos con token_budget_batches y devuelve los embeddings en el orden original.
+
+    Args:
+        textos: Lista de textos
+        lengths: Longitud en tokens de cada texto
+        encode_batch: Función que codifica un lote y devuelve un array (lote x dimensión)
+        max_tokens: Presupuesto de tokens por lote
+        max_batch_size: Máximo de textos por lote
+
+    Returns:
+        Array (len(textos) x dimensión) alineado con textos
+    """
+    embeddings = None
+    for indices in token_budget_batches(lengths, max_tokens, max_batch_size):
+        batch = np.asarray(encode_batch([textos[i] for i in indices]))
+        if embeddings is None:
+            embeddings = np.empty((len(textos),) + batch.shape[1:], dtype=batch.dtype)
+        embeddings[indices] = batch
+    if embeddings is None:
+        return np.empty((0, 0), dtype=np.float32)
+    return embeddings
@@ -0,0 +1,312 @@
+"""
+Benchmark de rendimiento de las métricas
+Mide pares/segundo, latencia por lote (p50/p95) y memoria pico de cada métrica sobre muestras fijas del dataset
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import tempfile
+import numpy as np
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Dict, List, Optional, Sequence
+
+from Acceleration import DEFAULT_CALIBRATION_DATASET, sample_calibration_pairs
+
+# Tamaños de muestra (pares) y pares por llamada a la métrica
+DEFAULT_SIZES = (100, 1000, 4000)
+DEFAULT_BATCH_PAIRS = 256
+DEFAULT_SEED = 42
+
+# Directorio por defecto de los reportes JSON
+DEFAULT_OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Benchmarks')
+
+# Métricas medidas, con los nombres de ComputeMetrics.ipynb
+BENCHMARK_METRICS = ('chrF', 'paraphrase-mpnet', 'XLM-RoBERTa', 'SciBETO-mean', 'BETO', 'SciBETO')
+
+# Pares de calentamiento (cargan el modelo; no se cuentan en las mediciones)
+_WARMUP_PAIRS = 8
+
+
+def build_standin_encoder(path: str, dataset_path: str = DEFAULT_CALIBRATION_DATASET,
+                          vocab_size: int = 8000, seed: int = DEFAULT_SEED) -> str:
+    """
+    Crea un encoder BERT pequeño, local y con pesos aleatorios.
+
+    Sirve de reemplazo de BETO, SciBETO y los modelos de Sentence-BERT para
+    correr el benchmark sin conexión: el vocabulario WordPiece se arma con
+    las palabras más frecuentes del dataset (más caracteres sueltos para
+    cubrir el resto), y el modelo tiene 12 capas, como pide BERTScore, pero
+    de dimensión 64. Los scores no significan nada; el costo por token sí
+    sigue la forma del pipeline real. Si el directorio ya existe se reutiliza.
+
+    Args:
+        path: Directorio donde guardar el modelo
+        dataset_path: Dataset del que se toma el vocabulario
+        vocab_size: Tamaño máximo del vocabulario
+        seed: Semilla de los pesos
+
+    Returns:
+        Ruta del modelo
+    """
+    if os.path.exists(os.path.join(path, 'config.json')):
+        return path
+
+    import torch
+    from transformers import BertConfig, BertModel, BertTokenizer
+
+    with open(dataset_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    words, chars = Counter(), set()
+    for record in data:
+        for field in ('modismo', 'significado', 'ejemplo'):
+            text = (record.get(field) or '').lower()
+            words.update(text.split())
+            chars.update(text)
+    chars.discard(' ')
+    special = ['[PAD]', '[UNK]', '[CLS]', '[SEP]', '[MASK]']
+    pieces = sorted(chars) + [f"##{c}" for c in sorted(chars)]
+    frequent = [w for w, _ in words.most_common(vocab_size) if w not in chars]
+    vocab = list(dict.fromkeys(special + pieces + frequent))[:max(vocab_size, len(special) + len(pieces))]
+
+    os.makedirs(path, exist_ok=True)
+    vocab_file = os.path.join(path, 'vocab.txt')
+    with open(vocab_file, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(vocab) + '\n')
+    tokenizer = BertTokenizer(vocab_file, do_lower_case=True, model_max_length=512)
+    tokenizer.save_pretrained(path)
+
+    torch.manual_seed(seed)
+    config = BertConfig(vocab_size=len(vocab), hidden_size=64, num_hidden_layers=12,
+                        num_attention_heads=4, intermediate_size=128, max_position_embeddings=512)
+    BertModel(config).save_pretrained(path)
+    return path
+
+
+def _use_standin_encoders(standin_path: str):
+    """Registra el encoder local en lugar de los modelos reales de todas las métricas."""
+    from ModelRegistry import registry, get_device
+    import BertScore
+    import SentenceBert
+
+    def load_sentence_transformer():
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(standin_path, device=get_device())
+
+    def load_bertscore():
+        from bert_score.utils import get_model, get_tokenizer
+        model = get_model(standin_path, BertScore.BERTSCORE_NUM_LAYERS)
+        model.to(get_device())
+        return model, get_tokenizer(standin_path, use_fast=False)
+
+    for name in (SentenceBert.model_name_sbert, SentenceBert.model_name_xlm, SentenceBert.cache_name_scibeto):
+        registry.register(name, load_sentence_transformer)
+    for name in (BertScore.model_name_beto, BertScore.model_name_sci_beto):
+        registry.register(BertScore.bertscore_model_key(name), load_bertscore)
+
+
+def _metric_function(metric: str):
+    """Función (candidatos, referencias) de cada métrica, sin cachés de embeddings."""
+    if metric == 'chrF':
+        from chrF import compute_chrf_batch
+        return compute_chrf_batch
+    if metric in ('BETO', 'SciBETO'):
+        from BertScore import compute_bertscore_beto, compute_bertscore_sci_beto
+        return compute_bertscore_beto if metric == 'BETO' else compute_bertscore_sci_beto
+    import SentenceBert
+    function = {
+        'paraphrase-mpnet': SentenceBert.compute_sbert_similarity,
+        'XLM-RoBERTa': SentenceBert.compute_xlm_similarity,
+        'SciBETO-mean': SentenceBert.compute_scibeto_similarity,
+    }[metric]
+    return lambda candidatos, referencias: function(candidatos, referencias, use_cache=False)
+
+
+def _peak_rss_mb() -> float:
+    """
+    Memoria residente pico del proceso, en MB.
+
+    En Linux se lee VmHWM de /proc: ru_maxrss conserva el pico del proceso
+    padre a través de fork/exec y mezclaría la memoria del benchmark con la
+    del caso. En macOS ru_maxrss viene en bytes.
+    """
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _run_case(metric: str, size: int, seed: int, batch_pairs: int,
+              standin_path: Optional[str], dataset_path: str) -> Dict[str, Any]:
+    """Mide una métrica sobre una muestra (se ejecuta en un proceso propio)."""
+    import EmbeddingCache
+    # Cachés en un directorio temporal: cada caso parte en frío y no toca las cachés reales
+    EmbeddingCache.DEFAULT_CACHE_DIR = tempfile.mkdtemp(prefix='metrics_benchmark_')
+    if standin_path:
+        _use_standin_encoders(standin_path)
+
+    candidatos, referencias = sample_calibration_pairs(size + _WARMUP_PAIRS, seed=seed, dataset_path=dataset_path)
+    function = _metric_function(metric)
+    function(candidatos[:_WARMUP_PAIRS], referencias[:_WARMUP_PAIRS])
+    candidatos, referencias = candidatos[_WARMUP_PAIRS:], referencias[_WARMUP_PAIRS:]
+
+    latencies = []
+    for start in range(0, len(candidatos), batch_pairs):
+        t0 = time.perf_counter()
+        function(candidatos[start:start + batch_pairs], referencias[start:start + batch_pairs])
+        latencies.append(time.perf_counter() - t0)
+
+    total = float(sum(latencies))
+    return {
+        'metric': metric,
+        'size': size,
+        'pairs': len(candidatos),
+        'batches': len(latencies),
+        'seconds': total,
+        'pairs_per_sec': len(candidatos) / total if total else float('nan'),
+        'p50_ms': float(np.percentile(latencies, 50) * 1000),
+        'p95_ms': float(np.percentile(latencies, 95) * 1000),
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+
+
+def run_benchmark(metrics: Sequence[str] = BENCHMARK_METRICS, sizes: Sequence[int] = DEFAULT_SIZES,
+                  seed: int = DEFAULT_SEED, batch_pairs: int = DEFAULT_BATCH_PAIRS,
+                  standin: bool = True, standin_path: Optional[str] = None,
+                  dataset_path: str = DEFAULT_CALIBRATION_DATASET,
+                  output_path: Optional[str] = None, verbose: bool = True) -> Dict[str, Any]:
+    """
+    Ejecuta el benchmark y guarda el reporte en JSON.
+
+    Cada (métrica, tamaño) corre en un proceso nuevo, de modo que la memoria
+    pico medida es la de ese caso (modelo incluido) y las cachés no pasan de
+    un caso a otro. La muestra es siempre la misma para una semilla y un
+    tamaño dados, por lo que dos reportes son comparables con compare_benchmarks.
+
+    Args:
+        metrics: Métricas a medir (default: todas)
+        sizes: Tamaños de muestra en pares
+        seed: Semilla de las muestras
+        batch_pairs: Pares por llamada a la métrica (unidad de la latencia)
+        standin: Si True, usa encoders locales pequeños (sin conexión)
+        standin_path: Directorio del encoder local (default: temporal)
+        dataset_path: Dataset de donde salen las muestras
+        output_path: Archivo JSON de salida (default: Benchmarks/benchmark_<fecha>.json)
+        verbose: Imprime cada resultado
+
+    Returns:
+        Dict con metadatos del entorno y la lista de resultados
+    """
+    unknown = [m for m in metrics if m not in BENCHMARK_METRICS]
+    if unknown:
+        raise ValueError(f"Métricas desconocidas: {unknown}. Opciones: {list(BENCHMARK_METRICS)}")
+    if standin:
+        standin_path = build_standin_encoder(standin_path or os.path.join(tempfile.gettempdir(), 'metrics_standin_bert'),
+                                             dataset_path=dataset_path)
+    else:
+        standin_path = None
+
+    results = []
+    for metric in metrics:
+        for size in sizes:
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+                result = executor.submit(_run_case, metric, size, seed, batch_pairs, standin_path, dataset_path).result()
+            results.append(result)
+            if verbose:
+                print(f"{metric:<18} {result['pairs']:>6} pares  {result['pairs_per_sec']:>10.1f} pares/s  "
+                      f"p50 {result['p50_ms']:>8.1f} ms  p95 {result['p95_ms']:>8.1f} ms  "
+                      f"RSS {result['peak_rss_mb']:>7.0f} MB")
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'seed': seed,
+            'sizes': list(sizes),
+            'batch_pairs': batch_pairs,
+            'standin': standin,
+        },
+        'results': results,
+    }
+
+    if output_path is None:
+        output_path = os.path.join(DEFAULT_OUTPUT_DIR, f"benchmark_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    if verbose:
+        print(f"\n✓ Reporte guardado en: {output_path}")
+    return report
+
+
+def compare_benchmarks(baseline_path: str, current_path: str, tolerance: float = 0.10) -> List[Dict[str, Any]]:
+    """
+    Compara dos reportes y señala regresiones de throughput o memoria.
+
+    Args:
+        baseline_path: Reporte de referencia
+        current_path: Reporte nuevo
+        tolerance: Variación relativa tolerada (default: 10%)
+
+    Returns:
+        Lista de comparaciones por (métrica, tamaño), con 'regression' en True
+        si el throughput bajó o la memoria pico subió más que la tolerancia
+    """
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(r['metric'], r['size']): r for r in json.load(f)['results']}
+    with open(current_path, 'r', encoding='utf-8') as f:
+        current = json.load(f)['results']
+
+    comparisons = []
+    for result in current:
+        before = baseline.get((result['metric'], result['size']))
+        if before is None:
+            continue
+        throughput = result['pairs_per_sec'] / before['pairs_per_sec'] - 1
+        memory = result['peak_rss_mb'] / before['peak_rss_mb'] - 1
+        comparisons.append({
+            'metric': result['metric'],
+            'size': result['size'],
+            'throughput_change': throughput,
+            'peak_rss_change': memory,
+            'regression': throughput < -tolerance or memory > tolerance,
+        })
+        flag = '✗ regresión' if comparisons[-1]['regression'] else '✓'
+        print(f"{result['metric']:<18} {result['size']:>6}  throughput {throughput:+.1%}  RSS {memory:+.1%}  {flag}")
+    return comparisons
+
+
+def main():
+    """Ejecuta el benchmark desde la línea de comandos."""
+    parser = argparse.ArgumentParser(description="Benchmark de rendimiento de las métricas")
+    parser.add_argument('--metrics', nargs='+', default=list(BENCHMARK_METRICS), choices=BENCHMARK_METRICS)
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(DEFAULT_SIZES))
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--batch-pairs', type=int, default=DEFAULT_BATCH_PAIRS)
+    parser.add_argument('--real-models', action='store_true', help="Usa los modelos reales (requiere descargarlos)")
+    parser.add_argument('--output', default=None, help="Archivo JSON de salida")
+    parser.add_argument('--compare', default=None, help="Reporte previo contra el cual comparar")
+    args = parser.parse_args()
+
+    output_path = args.output or os.path.join(DEFAULT_OUTPUT_DIR, f"benchmark_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    run_benchmark(args.metrics, args.sizes, seed=args.seed, batch_pairs=args.batch_pairs,
+                  standin=not args.real_models, output_path=output_path)
+    if args.compare:
+        print()
+        compare_benchmarks(args.compare, output_path)
+
+if __name__ == "__main__":
+    main()
@@ -1,42 +1,273 @@
-import torch
-from transformers import AutoModel, logging
-from bert_score import score
-
-# Silenciar warnings de transformers
-logging.set_verbosity_error()
-
-# Detectar dispositivo disponible (MPS para Apple Silicon, CUDA para NVIDIA, o CPU)
-if torch.backends.mps.is_available():
-    device = "mps"
-    print("Usando GPU (Metal Performance Shaders) en Apple Silicon")
-elif torch.cuda.is_available():
-    device = "cuda"
-    print("Usando GPU (CUDA)")
-else:
-    device = "cpu"
-    print("Usando CPU")
-
-# Cargar modelo en español
+import hashlib
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from ModelRegistry import registry, get_device
+from EmbeddingCache import TokenEmbeddingStore
+from Acceleration import backend_key, get_backend, quantize_int8, export_onnx
+from Batching import DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_TOKENS, token_budget_batches
+
+# Los modelos no se cargan al importar este módulo: cada scorer registra su
+# modelo en el registro compartido y lo carga la primera vez que lo necesita.
+
+# Modelo en español
 model_name_beto = "dccuchile/bert-base-spanish-wwm-uncased"
-model_beto = AutoModel.from_pretrained(model_name_beto)
+
+# Capa usada para los embeddings (mismo valor que bert_score.score)
+BERTSCORE_NUM_LAYERS = 12
+
+
+def __getattr__(name: str):
+    # Compatibilidad: 'device' se detecta sólo cuando se consulta
+    if name == 'device':
+        return get_device()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _load_bertscore_model(model_type: str, num_layers: int, backend: str = 'torch'):
+    """Carga (modelo truncado a num_layers, tokenizer) igual que bert_score.score."""
+    from transformers import logging
+    from bert_score.utils import get_model, get_tokenizer
+
+    # Silenciar warnings de transformers
+    logging.set_verbosity_error()
+    tokenizer = get_tokenizer(model_type, use_fast=False)
+    model = get_model(model_type, num_layers)
+    if backend == 'int8':
+        return quantize_int8(model), tokenizer
+    if backend == 'onnx':
+        return export_onnx(model, f"{model_type}-L{num_layers}"), tokenizer
+    model.to(get_device())
+    return model, tokenizer
+
+
+def bertscore_model_key(model_type: str, num_layers: int = BERTSCORE_NUM_LAYERS) -> str:
+    """Nombre con el que se registra el modelo de BERTScore (según su backend) en el registro compartido."""
+    return f"bertscore:{backend_key(model_type)}-L{num_layers}"
+
+
+class BertScoreScorer:
+    """
+    BERTScore reutilizable entre llamadas.
+
+    bert_score.score vuelve a cargar el modelo, recalcular el diccionario IDF
+    y codificar las referencias en cada llamada, aunque las referencias del
+    dataset sean las mismas para todos los LLMs evaluados. Este scorer carga
+    el modelo una sola vez (a través del registro compartido) y guarda los
+    embeddings por token de cada referencia en memoria y, opcionalmente, en
+    disco; así, evaluar un modelo adicional sólo cuesta codificar sus
+    candidatos. Los textos se codifican y se comparan en lotes de longitud
+    similar bajo un presupuesto de tokens (ver Batching.token_budget_batches).
+
+    El cálculo (greedy matching con coseno, pesos IDF y F1) es el mismo de
+    bert_score, por lo que los resultados coinciden con bert_score.score.
+    El backend del modelo ('torch', 'int8' u 'onnx') se elige con
+    Acceleration.set_backend(model_type, ...); cada backend guarda sus
+    referencias por separado.
+
+    Args:
+        model_type: Modelo de HuggingFace (ej: model_name_beto)
+        num_layers: Capa de la que se toman los embeddings (default: 12)
+        max_tokens: Presupuesto de tokens (con relleno) por lote al codificar y al comparar
+        max_batch_size: Máximo de textos (o pares) por lote
+        idf: Si True, pondera los tokens con el IDF de las referencias
+        cache_dir: Directorio de la caché en disco de referencias (default: DEFAULT_CACHE_DIR)
+        use_disk_cache: Si False, las referencias sólo se guardan en memoria
+    """
+
+    def __init__(self, model_type: str, num_layers: int = BERTSCORE_NUM_LAYERS,
+                 max_tokens: int = DEFAULT_MAX_TOKENS, max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+                 idf: bool = False, cache_dir: Optional[str] = None, use_disk_cache: bool = True):
+        self.model_type = model_type
+        self.num_layers = num_layers
+        self.max_tokens = max_tokens
+        self.max_batch_size = max_batch_size
+        self.idf = idf
+
+        self.cache_dir = cache_dir
+        self.use_disk_cache = use_disk_cache
+
+        # Referencias ya codificadas: texto -> (embeddings por token en CPU, ids de tokens)
+        self._references: Dict[str, Tuple[Any, List[int]]] = {}
+        self._store: Optional[TokenEmbeddingStore] = None
+        self._backend: Optional[str] = None
+        self._idf_dicts: Dict[str, Dict[int, float]] = {}
+        self._sync_backend()
+
+    def _sync_backend(self) -> str:
+        """Registra el modelo del backend actual y cambia de referencias si el backend cambió."""
+        backend = get_backend(self.model_type)
+        if backend != self._backend:
+            self._model_key = bertscore_model_key(self.model_type, self.num_layers)
+            if self._model_key not in registry.registered():
+                model_type, num_layers = self.model_type, self.num_layers
+                registry.register(self._model_key, lambda: _load_bertscore_model(model_type, num_layers, backend))
+            self._references.clear()
+            store_name = f"{backend_key(self.model_type)}-L{self.num_layers}"
+            self._store = TokenEmbeddingStore(store_name, root=self.cache_dir) if self.use_disk_cache else None
+            self._backend = backend
+        return backend
+
+    def _model(self):
+        """Devuelve (modelo, tokenizer) desde el registro compartido."""
+        return registry.get(self._model_key)
+
+    def _idf_dict(self, referencias: Sequence[str]) -> Dict[int, float]:
+        """Diccionario IDF, calculado una sola vez por conjunto de referencias."""
+        if not self.idf:
+            key = 'uniforme'
+        else:
+            key = hashlib.sha1('\n'.join(sorted(set(referencias))).encode('utf-8')).hexdigest()
+        if key in self._idf_dicts:
+            return self._idf_dicts[key]
+
+        _, tokenizer = self._model()
+        if self.idf:
+            from bert_score.utils import get_idf_dict
+            idf_dict = get_idf_dict(list(referencias), tokenizer)
+        else:
+            idf_dict = defaultdict(lambda: 1.0)
+        # [SEP] y [CLS] no cuentan en el puntaje
+        idf_dict[tokenizer.sep_token_id] = 0
+        idf_dict[tokenizer.cls_token_id] = 0
+        self._idf_dicts[key] = idf_dict
+        return idf_dict
+
+    def _encode(self, textos: List[str]) -> Dict[str, Tuple[Any, List[int]]]:
+        """
+        Calcula los embeddings por token de textos únicos, por lotes bajo el presupuesto de tokens.
+
+        Returns:
+            Dict {texto: (embeddings n_tokens x dimensión en CPU, ids de tokens)}
+        """
+        import torch
+        from bert_score.utils import bert_encode, padding, sent_encode
+
+        model, tokenizer = self._model()
+        # Los backends int8 y ONNX sólo corren en CPU
+        device = get_device() if self._backend == 'torch' else 'cpu'
+        token_ids = {texto: sent_encode(tokenizer, texto) for texto in textos}
+        unique = list(token_ids)
+
+        encoded = {}
+        for indices in token_budget_batches([len(token_ids[t]) for t in unique], self.max_tokens, self.max_batch_size):
+            batch = [unique[i] for i in indices]
+            padded, lens, mask = padding([token_ids[t] for t in batch], tokenizer.pad_token_id, dtype=torch.long)
+            with torch.no_grad():
+                embeddings = bert_encode(model, padded.to(device), attention_mask=mask.to(device)).cpu()
+            for i, texto in enumerate(batch):
+                encoded[texto] = (embeddings[i, :lens[i]].clone(), token_ids[texto])
+        return encoded
+
+    def _reference_embeddings(self, referencias: Sequence[str]):
+        """Asegura que todas las referencias estén codificadas (memoria, disco o modelo)."""
+        import torch
+
+        missing = []
+        for texto in dict.fromkeys(referencias):
+            if texto in self._references:
+                continue
+            cached = self._store.get(texto) if self._store is not None else None
+            if cached is not None:
+                embeddings, ids = cached
+                self._references[texto] = (torch.from_numpy(embeddings), ids)
+            else:
+                missing.append(texto)
+
+        if missing:
+            encoded = self._encode(missing)
+            self._references.update(encoded)
+            if self._store is not None:
+                self._store.add([(texto, emb.numpy(), ids) for texto, (emb, ids) in encoded.items()])
+
+    def score(self, candidatos: Sequence[str], referencias: Sequence[str]):
+        """
+        Calcula BERTScore para pares (candidato, referencia).
+
+        Args:
+            candidatos: Textos generados
+            referencias: Textos de referencia (se reutilizan entre llamadas)
+
+        Returns:
+            Tupla (P, R, F1) de tensores con un valor por par
+        """
+        import torch
+        from torch.nn.utils.rnn import pad_sequence
+        from bert_score.utils import greedy_cos_idf
+
+        if len(candidatos) != len(referencias):
+            raise ValueError("candidatos y referencias deben tener la misma longitud")
+        if not candidatos:
+            empty = torch.empty(0)
+            return empty, empty.clone(), empty.clone()
+
+        self._sync_backend()
+        idf_dict = self._idf_dict(referencias)
+        self._reference_embeddings(referencias)
+        pending = [t for t in dict.fromkeys(candidatos) if t not in self._references]
+        stats = {**self._encode(pending), **self._references} if pending else self._references
+
+        def pad_batch(textos):
+            embeddings = [stats[t][0] for t in textos]
+            weights = [torch.tensor([idf_dict[i] for i in stats[t][1]], dtype=torch.float) for t in textos]
+            lens = torch.tensor([len(e) for e in embeddings], dtype=torch.long)
+            mask = torch.arange(int(lens.max())).expand(len(textos), -1) < lens.unsqueeze(1)
+            return (pad_sequence(embeddings, batch_first=True, padding_value=2.0), mask,
+                    pad_sequence(weights, batch_first=True))
+
+        # Pares agrupados por longitud (la mayor entre candidato y referencia)
+        lengths = [max(len(stats[c][1]), len(stats[r][1])) for c, r in zip(candidatos, referencias)]
+        results = torch.zeros(len(candidatos), 3)
+        with torch.no_grad():
+            for indices in token_budget_batches(lengths, self.max_tokens, self.max_batch_size):
+                rows = indices.tolist()
+                P, R, F1 = greedy_cos_idf(*pad_batch([referencias[i] for i in rows]),
+                                          *pad_batch([candidatos[i] for i in rows]))
+                results[rows] = torch.stack((P, R, F1), dim=-1).cpu()
+        return results[:, 0], results[:, 1], results[:, 2]
+
+    def release(self):
+        """Libera el modelo y las referencias en memoria (la caché en disco se conserva)."""
+        registry.release(self._model_key)
+        self._references.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Estadísticas de las referencias almacenadas."""
+        stats = {'model_type': self.model_type, 'backend': self._backend,
+                 'references_in_memory': len(self._references)}
+        if self._store is not None:
+            stats['disk'] = self._store.stats()
+        return stats
+
+
+# Scorers compartidos por modelo (las referencias se reutilizan entre llamadas)
+_SCORERS: Dict[Tuple, BertScoreScorer] = {}
+
+
+def get_bertscore_scorer(model_type: str, idf: bool = False, cache_dir: Optional[str] = None) -> BertScoreScorer:
+    """Devuelve el scorer compartido de un modelo, creándolo si es necesario."""
+    key = (model_type, idf, cache_dir)
+    if key not in _SCORERS:
+        _SCORERS[key] = BertScoreScorer(model_type, idf=idf, cache_dir=cache_dir)
+    return _SCORERS[key]
+
 
 # Función para calcular BERTScore
 #    P: Precisión - qué tan bien las palabras en la oración candidata son cubiertas por la referencia
 #    R: Recall - qué tan bien las palabras en la oración de referencia son cubiertas por la candidata
 #    F1: Media armónica de P y R
 def compute_bertscore_beto(candidatos, referencias):
-    P, R, F1 = score(candidatos, referencias, model_type=model_name_beto, num_layers=12, lang="es", device=device)
+    P, R, F1 = get_bertscore_scorer(model_name_beto).score(candidatos, referencias)
     return P, R, F1
 
 
-# Cargar modelo en español
+# Modelo en español
 model_name_sci_beto = "Flaglab/SciBETO-large"
-model_sci_beto = AutoModel.from_pretrained(model_name_sci_beto)
 
 # Función para calcular BERTScore
 #    P: Precisión - qué tan bien las palabras en la oración candidata son cubiertas por la referencia
 #    R: Recall - qué tan bien las palabras en la oración de referencia son cubiertas por la candidata
 #    F1: Media armónica de P y R
 def compute_bertscore_sci_beto(candidatos, referencias):
-    P, R, F1 = score(candidatos, referencias, model_type=model_name_sci_beto, num_layers=12, lang="es", device=device)
-    return P, R, F1
\ No newline at end of file
+    P, R, F1 = get_bertscore_scorer(model_name_sci_beto).score(candidatos, referencias)
+    return P, R, F1
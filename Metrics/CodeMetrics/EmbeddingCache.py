@@ -0,0 +1,306 @@
+"""
+Caché persistente de embeddings
+Almacén en disco direccionado por contenido: (nombre del encoder, hash del texto normalizado)
+Incluye una variante de longitud variable para embeddings por token (BERTScore)
+"""
+
+import os
+import json
+import hashlib
+import unicodedata
+import numpy as np
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Directorio por defecto de la caché (junto a Metrics_Results)
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Embeddings_Cache')
+
+
+def normalize_text(text: str) -> str:
+    """Normaliza un texto antes de calcular su hash (NFC y espacios colapsados)."""
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+def text_hash(text: str) -> str:
+    """Hash SHA-1 del texto normalizado."""
+    return hashlib.sha1(normalize_text(text).encode('utf-8')).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    Almacén de embeddings de un encoder en disco.
+
+    Los vectores se guardan como una matriz contigua (float32 o float16) que se
+    lee con np.memmap, y un archivo de índice con un hash por línea: la línea i
+    corresponde a la fila i de la matriz. Ambos archivos sólo crecen por el
+    final, así que agregar textos nuevos no reescribe lo ya almacenado.
+
+    Estructura en disco:
+        <root>/<encoder>/meta.json        encoder, dimensión y tipo de dato
+        <root>/<encoder>/embeddings.bin   matriz (filas x dimensión)
+        <root>/<encoder>/index.txt        hash SHA-1 del texto de cada fila
+
+    Args:
+        encoder_name: Nombre del encoder (ej: 'paraphrase-multilingual-mpnet-base-v2')
+        root: Directorio raíz de la caché (default: DEFAULT_CACHE_DIR)
+        dtype: 'float32' (default, sin pérdida) o 'float16' (mitad de espacio)
+    """
+
+    def __init__(self, encoder_name: str, root: Optional[str] = None, dtype: str = 'float32'):
+        if dtype not in ('float16', 'float32'):
+            raise ValueError(f"dtype no soportado: {dtype!r}")
+        self.encoder_name = encoder_name
+        self.dtype = np.dtype(dtype)
+        self.path = os.path.join(root or DEFAULT_CACHE_DIR, encoder_name.replace('/', '__'))
+        self._meta_path = os.path.join(self.path, 'meta.json')
+        self._data_path = os.path.join(self.path, 'embeddings.bin')
+        self._index_path = os.path.join(self.path, 'index.txt')
+
+        self.dim: Optional[int] = None
+        self._rows: Dict[str, int] = {}
+        self._total_rows = 0
+        self._matrix: Optional[np.memmap] = None
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        """Carga metadatos e índice, descartando filas escritas sin indexar."""
+        if not os.path.exists(self._meta_path):
+            return
+        with open(self._meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta['dtype'] != self.dtype.name:
+            raise ValueError(f"La caché de {self.encoder_name} usa {meta['dtype']}, no {self.dtype.name}")
+        self.dim = meta['dim']
+
+        if os.path.exists(self._index_path):
+            with open(self._index_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    key = line.strip()
+                    if key:
+                        # Cada línea es una fila aunque el hash se repita (ej: dos procesos
+                        # que agregaron el mismo texto); gana la última escritura
+                        self._rows[key] = self._total_rows
+                        self._total_rows += 1
+
+        # Una interrupción entre escribir vectores y su índice deja filas huérfanas
+        expected = self._total_rows * self.dim * self.dtype.itemsize
+        if os.path.exists(self._data_path) and os.path.getsize(self._data_path) > expected:
+            with open(self._data_path, 'r+b') as f:
+                f.truncate(expected)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, text: str) -> bool:
+        return text_hash(text) in self._rows
+
+    def _view(self) -> np.memmap:
+        """Matriz memory-mapped con todas las filas almacenadas."""
+        if self._matrix is None or self._matrix.shape[0] != self._total_rows:
+            self._matrix = np.memmap(self._data_path, dtype=self.dtype, mode='r', shape=(self._total_rows, self.dim))
+        return self._matrix
+
+    def _append(self, keys: List[str], embeddings: np.ndarray):
+        """Agrega filas nuevas al final de la matriz y del índice."""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if self.dim is None:
+            self.dim = int(embeddings.shape[1])
+            os.makedirs(self.path, exist_ok=True)
+            with open(self._meta_path, 'w', encoding='utf-8') as f:
+                json.dump({'encoder': self.encoder_name, 'dim': self.dim, 'dtype': self.dtype.name}, f, indent=2)
+        elif embeddings.shape[1] != self.dim:
+            raise ValueError(f"Dimensión {embeddings.shape[1]} distinta a la de la caché ({self.dim})")
+
+        # Primero los vectores y luego el índice: una fila sólo existe si está indexada
+        with open(self._data_path, 'ab') as f:
+            f.write(embeddings.astype(self.dtype).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        with open(self._index_path, 'a', encoding='utf-8') as f:
+            f.write(''.join(f"{key}\n" for key in keys))
+
+        for key in keys:
+            self._rows[key] = self._total_rows
+            self._total_rows += 1
+        self._matrix = None
+
+    def get_or_encode(self, texts: List[str], encode_fn: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Devuelve los embeddings de los textos, codificando sólo los que no están en caché.
+
+        Args:
+            texts: Lista de textos
+            encode_fn: Función que recibe una lista de textos y devuelve sus embeddings
+
+        Returns:
+            Array float32 (len(texts) x dimensión) en el orden de entrada
+        """
+        keys = [text_hash(t) for t in texts]
+
+        # Textos nuevos, sin duplicados
+        pending: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in self._rows and key not in pending:
+                pending[key] = normalize_text(text)
+
+        self.misses += len(pending)
+        self.hits += len(texts) - len(pending)
+        if pending:
+            self._append(list(pending), encode_fn(list(pending.values())))
+
+        if not texts:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        rows = np.fromiter((self._rows[key] for key in keys), dtype=np.int64, count=len(keys))
+        return np.asarray(self._view()[rows], dtype=np.float32)
+
+    def stats(self) -> Dict[str, int]:
+        """Estadísticas de uso de la caché."""
+        return {'encoder': self.encoder_name, 'rows': len(self._rows), 'hits': self.hits, 'misses': self.misses}
+
+
+class TokenEmbeddingStore:
+    """
+    Almacén en disco de embeddings por token (una matriz por texto).
+
+    Sigue el mismo esquema que EmbeddingStore, pero cada texto ocupa un
+    número variable de filas: el índice guarda, por línea, el hash del texto,
+    su número de tokens y los ids de esos tokens (necesarios para aplicar
+    pesos IDF). La posición de cada texto en la matriz es la suma de las
+    longitudes anteriores, así que tampoco aquí se reescribe nada al agregar.
+
+    Estructura en disco:
+        <root>/<encoder>/meta.json        encoder, dimensión y tipo de dato
+        <root>/<encoder>/embeddings.bin   filas de todos los tokens (tokens x dimensión)
+        <root>/<encoder>/index.txt        hash<TAB>n_tokens<TAB>ids separados por espacio
+
+    Args:
+        encoder_name: Nombre del encoder, incluida la capa usada (ej: 'dccuchile/...-L12')
+        root: Directorio raíz de la caché (default: DEFAULT_CACHE_DIR)
+        dtype: 'float32' (default, sin pérdida) o 'float16' (mitad de espacio)
+    """
+
+    def __init__(self, encoder_name: str, root: Optional[str] = None, dtype: str = 'float32'):
+        if dtype not in ('float16', 'float32'):
+            raise ValueError(f"dtype no soportado: {dtype!r}")
+        self.encoder_name = encoder_name
+        self.dtype = np.dtype(dtype)
+        self.path = os.path.join(root or DEFAULT_CACHE_DIR, encoder_name.replace('/', '__'))
+        self._meta_path = os.path.join(self.path, 'meta.json')
+        self._data_path = os.path.join(self.path, 'embeddings.bin')
+        self._index_path = os.path.join(self.path, 'index.txt')
+
+        self.dim: Optional[int] = None
+        self._entries: Dict[str, Tuple[int, int, List[int]]] = {}
+        self._total_rows = 0
+        self._matrix: Optional[np.memmap] = None
+        self._load()
+
+    def _load(self):
+        """Carga metadatos e índice, descartando filas escritas sin indexar."""
+        if not os.path.exists(self._meta_path):
+            return
+        with open(self._meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta['dtype'] != self.dtype.name:
+            raise ValueError(f"La caché de {self.encoder_name} usa {meta['dtype']}, no {self.dtype.name}")
+        self.dim = meta['dim']
+
+        if os.path.exists(self._index_path):
+            with open(self._index_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    parts = line.rstrip('\n').split('\t')
+                    if len(parts) != 3:
+                        continue
+                    key, length = parts[0], int(parts[1])
+                    if key not in self._entries:
+                        self._entries[key] = (self._total_rows, length, [int(t) for t in parts[2].split()])
+                    self._total_rows += length
+
+        expected = self._total_rows * self.dim * self.dtype.itemsize
+        if os.path.exists(self._data_path) and os.path.getsize(self._data_path) > expected:
+            with open(self._data_path, 'r+b') as f:
+                f.truncate(expected)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, text: str) -> bool:
+        return text_hash(text) in self._entries
+
+    def _view(self) -> np.memmap:
+        """Matriz memory-mapped con todas las filas almacenadas."""
+        if self._matrix is None or self._matrix.shape[0] != self._total_rows:
+            self._matrix = np.memmap(self._data_path, dtype=self.dtype, mode='r', shape=(self._total_rows, self.dim))
+        return self._matrix
+
+    def get(self, text: str) -> Optional[Tuple[np.ndarray, List[int]]]:
+        """
+        Devuelve (embeddings por token, ids de tokens) de un texto, o None si no está.
+
+        Returns:
+            Tupla (array float32 n_tokens x dimensión, lista de ids) o None
+        """
+        entry = self._entries.get(text_hash(text))
+        if entry is None:
+            return None
+        start, length, token_ids = entry
+        return np.array(self._view()[start:start + length], dtype=np.float32), token_ids
+
+    def add(self, items: List[Tuple[str, np.ndarray, List[int]]]):
+        """
+        Agrega textos nuevos al final de la matriz y del índice.
+
+        Args:
+            items: Lista de (texto, embeddings n_tokens x dimensión, ids de tokens)
+        """
+        pending: Dict[str, Tuple[np.ndarray, List[int]]] = {}
+        for text, embeddings, token_ids in items:
+            key = text_hash(text)
+            if key not in self._entries and key not in pending:
+                pending[key] = (np.asarray(embeddings, dtype=np.float32), list(token_ids))
+        if not pending:
+            return
+
+        dims = {embeddings.shape[1] for embeddings, _ in pending.values()}
+        if self.dim is None:
+            self.dim = int(dims.pop())
+            os.makedirs(self.path, exist_ok=True)
+            with open(self._meta_path, 'w', encoding='utf-8') as f:
+                json.dump({'encoder': self.encoder_name, 'dim': self.dim, 'dtype': self.dtype.name}, f, indent=2)
+        if dims - {self.dim}:
+            raise ValueError(f"Dimensión distinta a la de la caché ({self.dim})")
+
+        # Primero los vectores y luego el índice: un texto sólo existe si está indexado
+        with open(self._data_path, 'ab') as f:
+            for embeddings, _ in pending.values():
+                f.write(embeddings.astype(self.dtype).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        with open(self._index_path, 'a', encoding='utf-8') as f:
+            f.write(''.join(
+                f"{key}\t{len(embeddings)}\t{' '.join(map(str, token_ids))}\n"
+                for key, (embeddings, token_ids) in pending.items()
+            ))
+
+        for key, (embeddings, token_ids) in pending.items():
+            self._entries[key] = (self._total_rows, len(embeddings), token_ids)
+            self._total_rows += len(embeddings)
+        self._matrix = None
+
+    def stats(self) -> Dict[str, int]:
+        """Estadísticas de la caché."""
+        return {'encoder': self.encoder_name, 'texts': len(self._entries), 'tokens': self._total_rows}
+
+
+# Almacenes abiertos por (directorio, encoder)
+_STORES: Dict[tuple, EmbeddingStore] = {}
+
+
+def get_embedding_store(encoder_name: str, root: Optional[str] = None, dtype: str = 'float32') -> EmbeddingStore:
+    """Devuelve el almacén compartido de un encoder, abriéndolo si es necesario."""
+    root = root or DEFAULT_CACHE_DIR
+    key = (os.path.abspath(root), encoder_name)
+    if key not in _STORES:
+        _STORES[key] = EmbeddingStore(encoder_name, root=root, dtype=dtype)
+    return _STORES[key]
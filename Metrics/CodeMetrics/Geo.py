@@ -0,0 +1,372 @@
+"""
+Análisis geográfico de los scores (map_task2.pdf, map_task3.pdf)
+El TopoJSON de municipios se decodifica una sola vez a arrays NumPy y se cachea en disco
+"""
+
+import os
+import json
+import hashlib
+import unicodedata
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+DATASET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'DataSet')
+
+DEFAULT_TOPOJSON = os.path.join(DATASET_DIR, 'Municipios-colombia.json')
+
+DEFAULT_REGIONS_DATASET = os.path.join(DATASET_DIR, 'DataSet_ConRegión.json')
+
+# Geometrías decodificadas (no se versionan)
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Geo_Cache')
+
+# Regiones del dataset que no son departamentos (claves normalizadas)
+REGION_ALIASES = {
+    'costa atlantica': ('ATLANTICO', 'BOLIVAR', 'CESAR', 'CORDOBA', 'LA GUAJIRA', 'MAGDALENA', 'SUCRE'),
+    'costa del pacifico': ('CHOCO', 'VALLE DEL CAUCA', 'CAUCA', 'NARIÑO'),
+    'llanos orientales': ('ARAUCA', 'CASANARE', 'META', 'VICHADA'),
+    'bogota': ('SANTAFE DE BOGOTA D.C',),
+    'bogota d.c.': ('SANTAFE DE BOGOTA D.C',),
+    'san andres': ('ARCHIPIELAGO DE SAN ANDRES PROVIDENCIA Y SANTA CATALINA',),
+}
+
+# Geometrías decodificadas por archivo en este proceso
+_GEOMETRY: Dict[str, 'Geometry'] = {}
+
+
+def normalize_region(text: str) -> str:
+    """Clave normalizada: minúsculas, sin tildes (conserva la ñ) y espacios colapsados."""
+    text = unicodedata.normalize('NFD', (text or '').casefold())
+    text = ''.join(c for i, c in enumerate(text)
+                   if not unicodedata.combining(c) or (c == '\u0303' and i and text[i - 1] == 'n'))
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+def split_regions(region: str) -> List[str]:
+    """Regiones de un campo 'región' ('Boyacá, Cundinamarca' -> ['Boyacá', 'Cundinamarca'])."""
+    return [part.strip() for part in (region or '').split(',') if part.strip()]
+
+
+class Geometry:
+    """
+    Geometría compacta de municipios y departamentos.
+
+    Todas las coordenadas de los anillos están en un solo array (puntos, 2);
+    ring_offsets marca dónde empieza cada anillo y los *_rings dónde empiezan
+    los anillos de cada municipio o departamento. Los polígonos para dibujar
+    son vistas de ese array, así que se construyen sin copiar.
+
+    Args:
+        arrays: Dict con points, ring_offsets, mpio_rings, dept_rings,
+                mpio_dept (departamento de cada municipio), mpio_names,
+                mpio_ids y dept_names
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.points = arrays['points']
+        self.ring_offsets = arrays['ring_offsets']
+        self.mpio_rings = arrays['mpio_rings']
+        self.dept_rings = arrays['dept_rings']
+        self.mpio_dept = arrays['mpio_dept']
+        self.mpio_names = [str(name) for name in arrays['mpio_names']]
+        self.mpio_ids = [str(value) for value in arrays['mpio_ids']]
+        self.dept_names = [str(name) for name in arrays['dept_names']]
+        self._rings: Optional[List[np.ndarray]] = None
+
+    @property
+    def rings(self) -> List[np.ndarray]:
+        """Coordenadas de cada anillo (vistas de points)."""
+        if self._rings is None:
+            self._rings = [self.points[start:stop] for start, stop in zip(self.ring_offsets[:-1], self.ring_offsets[1:])]
+        return self._rings
+
+    def polygons(self, level: str = 'departamento') -> Tuple[List[np.ndarray], np.ndarray]:
+        """
+        Anillos de todos los departamentos o municipios y la unidad de cada uno.
+
+        Returns:
+            (anillos, índice del departamento o municipio de cada anillo)
+        """
+        offsets = self.dept_rings if level == 'departamento' else self.mpio_rings
+        owner = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+        return self.rings[offsets[0]:offsets[-1]], owner
+
+    @property
+    def bounds(self) -> Tuple[float, float, float, float]:
+        (x0, y0), (x1, y1) = self.points.min(axis=0), self.points.max(axis=0)
+        return float(x0), float(y0), float(x1), float(y1)
+
+
+def _decode_arcs(topology: Dict[str, Any]) -> List[np.ndarray]:
+    """Arcos del TopoJSON en coordenadas absolutas (deshace la cuantización)."""
+    transform = topology.get('transform')
+    lengths = [len(arc) for arc in topology['arcs']]
+    flat = np.array([point[:2] for arc in topology['arcs'] for point in arc], dtype=np.float64)
+    starts = np.concatenate([[0], np.cumsum(lengths)])
+    arcs = []
+    for start, stop in zip(starts[:-1], starts[1:]):
+        arc = flat[start:stop]
+        if transform:
+            arc = np.cumsum(arc, axis=0) * transform['scale'] + transform['translate']
+        arcs.append(arc)
+    return arcs
+
+
+def _stitch(arcs: List[np.ndarray], indexes: Sequence[int]) -> np.ndarray:
+    """Une los arcos de un anillo (~i es el arco i invertido) sin repetir los puntos compartidos."""
+    parts = []
+    for position, index in enumerate(indexes):
+        arc = arcs[index] if index >= 0 else arcs[~index][::-1]
+        parts.append(arc if position == 0 else arc[1:])
+    return np.concatenate(parts)
+
+
+def _geometry_rings(geometry: Dict[str, Any]) -> List[Sequence[int]]:
+    if geometry['type'] == 'Polygon':
+        return geometry['arcs']
+    if geometry['type'] == 'MultiPolygon':
+        return [ring for polygon in geometry['arcs'] for ring in polygon]
+    return []
+
+
+def decode_topojson(path: str = DEFAULT_TOPOJSON) -> Dict[str, np.ndarray]:
+    """
+    Decodifica el TopoJSON de municipios (objetos 'mpios' y 'depts') a arrays.
+
+    Returns:
+        Dict de arrays para Geometry
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        topology = json.load(f)
+    arcs = _decode_arcs(topology)
+
+    mpios = topology['objects']['mpios']['geometries']
+    depts = topology['objects']['depts']['geometries']
+    dept_names = [g['properties']['dpt'] for g in depts]
+    # Departamentos que sólo aparecen en mpios (no deberían, pero no se pierden)
+    dept_names += sorted({g['properties']['dpt'] for g in mpios} - set(dept_names))
+    dept_index = {name: i for i, name in enumerate(dept_names)}
+
+    rings, mpio_rings = [], [0]
+    for geometry in mpios:
+        rings += [_stitch(arcs, ring) for ring in _geometry_rings(geometry)]
+        mpio_rings.append(len(rings))
+    dept_rings = [len(rings)]
+    for geometry in depts:
+        rings += [_stitch(arcs, ring) for ring in _geometry_rings(geometry)]
+        dept_rings.append(len(rings))
+    dept_rings += [dept_rings[-1]] * (len(dept_names) - len(depts))
+
+    ring_offsets = np.concatenate([[0], np.cumsum([len(ring) for ring in rings])]).astype(np.int64)
+    return {
+        'points': np.concatenate(rings) if rings else np.empty((0, 2)),
+        'ring_offsets': ring_offsets,
+        'mpio_rings': np.asarray(mpio_rings, dtype=np.int64),
+        'dept_rings': np.asarray(dept_rings, dtype=np.int64),
+        'mpio_dept': np.array([dept_index[g['properties']['dpt']] for g in mpios], dtype=np.int64),
+        'mpio_names': np.array([g['properties'].get('name', '') for g in mpios]),
+        'mpio_ids': np.array([str(g.get('id', '')) for g in mpios]),
+        'dept_names': np.array(dept_names),
+    }
+
+
+def load_geometry(path: str = DEFAULT_TOPOJSON, cache_dir: Optional[str] = DEFAULT_CACHE_DIR) -> Geometry:
+    """
+    Geometría del TopoJSON, decodificada una sola vez.
+
+    Se guarda en memoria por proceso y en cache_dir como .npz, identificada
+    por el hash del archivo: los siguientes procesos la cargan sin leer el
+    JSON. cache_dir=None desactiva el caché en disco.
+    """
+    key = os.path.abspath(path)
+    if key in _GEOMETRY:
+        return _GEOMETRY[key]
+
+    arrays = None
+    cache_path = None
+    if cache_dir:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        cache_path = os.path.join(cache_dir, f"{os.path.splitext(os.path.basename(path))[0]}-{digest.hexdigest()[:16]}.npz")
+        if os.path.exists(cache_path):
+            with np.load(cache_path) as cached:
+                arrays = {name: cached[name] for name in cached.files}
+
+    if arrays is None:
+        arrays = decode_topojson(path)
+        if cache_path:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(cache_path + '.tmp', 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(cache_path + '.tmp', cache_path)
+
+    _GEOMETRY[key] = Geometry(arrays)
+    return _GEOMETRY[key]
+
+
+class RegionIndex:
+    """
+    Índice de textos de región a departamentos y municipios del TopoJSON.
+
+    Las claves se normalizan (mayúsculas, tildes, espacios), así que
+    'Nariño', 'NARIÑO' y 'narino ' dan lo mismo. Se resuelven, en orden,
+    departamentos, regiones de REGION_ALIASES y nombres de municipio (un
+    nombre repetido en varios departamentos devuelve todos).
+
+    Args:
+        geometry: Salida de load_geometry
+        aliases: Regiones adicionales {nombre: departamentos del TopoJSON}
+    """
+
+    def __init__(self, geometry: Geometry, aliases: Optional[Dict[str, Sequence[str]]] = None):
+        self.geometry = geometry
+        self.departments = {normalize_region(name): i for i, name in enumerate(geometry.dept_names)}
+        self.aliases = {normalize_region(name): tuple(self.departments[normalize_region(dept)] for dept in depts)
+                        for name, depts in {**REGION_ALIASES, **(aliases or {})}.items()}
+        self.municipalities: Dict[str, List[int]] = {}
+        for i, name in enumerate(geometry.mpio_names):
+            self.municipalities.setdefault(normalize_region(name), []).append(i)
+        self._cache: Dict[str, Tuple[Tuple[int, ...], Tuple[int, ...]]] = {}
+
+    def resolve(self, region: str) -> Tuple[Tuple[int, ...], Tuple[int, ...]]:
+        """
+        Departamentos y municipios de un texto de región (una o varias separadas por comas).
+
+        Returns:
+            (índices de departamento, índices de municipio); vacíos si no se reconoce
+        """
+        if region not in self._cache:
+            departments, municipalities = [], []
+            for part in split_regions(region):
+                key = normalize_region(part)
+                if key in self.departments or key in self.aliases:
+                    found = (self.departments[key],) if key in self.departments else self.aliases[key]
+                    departments += found
+                    municipalities += np.flatnonzero(np.isin(self.geometry.mpio_dept, found)).tolist()
+                elif key in self.municipalities:
+                    municipalities += self.municipalities[key]
+                    departments += self.geometry.mpio_dept[self.municipalities[key]].tolist()
+            self._cache[region] = (tuple(dict.fromkeys(departments)), tuple(dict.fromkeys(municipalities)))
+        return self._cache[region]
+
+    def unresolved(self, regions: Sequence[str]) -> List[str]:
+        """Regiones (separadas) que no corresponden a ningún departamento o municipio."""
+        parts = {part for region in regions for part in split_regions(region)}
+        return sorted(part for part in parts if not any(self.resolve(part)))
+
+    def table(self, dataset_path: str = DEFAULT_REGIONS_DATASET, level: str = 'departamento') -> pd.DataFrame:
+        """
+        Tabla modismo -> unidad geográfica del dataset con región.
+
+        Args:
+            dataset_path: Dataset con 'modismo' y 'región' (default: DataSet_ConRegión.json)
+            level: 'departamento' o 'municipio'
+
+        Returns:
+            DataFrame con modismo y unidad (índice en dept_names o mpio_names),
+            una fila por (modismo, unidad)
+        """
+        with open(dataset_path, 'r', encoding='utf-8') as f:
+            data = pd.DataFrame(json.load(f), columns=['modismo', 'región'])
+        data['modismo'] = data['modismo'].fillna('').str.strip()
+        position = 0 if level == 'departamento' else 1
+        data['unidad'] = [list(self.resolve(region)[position]) for region in data['región'].fillna('')]
+        data = data.explode('unidad').dropna(subset=['unidad'])
+        return data[['modismo', 'unidad']].drop_duplicates().astype({'unidad': np.int64}).reset_index(drop=True)
+
+
+def aggregate_scores(scores: pd.DataFrame, index: RegionIndex, score_column: str = 'score',
+                     level: str = 'departamento', dataset_path: str = DEFAULT_REGIONS_DATASET) -> pd.DataFrame:
+    """
+    Score medio por modelo y departamento (o municipio) con un solo group-by.
+
+    Args:
+        scores: DataFrame con modelo, modismo y score_column (ej: las tablas de run_incremental)
+        index: RegionIndex
+        score_column: Columna del score
+        level: 'departamento' o 'municipio'
+        dataset_path: Dataset con la región de cada modismo
+
+    Returns:
+        DataFrame con modelo, unidad, nombre, score medio y n (modismos con score)
+    """
+    units = index.table(dataset_path, level)
+    frame = scores[['modelo', 'modismo', score_column]].copy()
+    frame['modismo'] = frame['modismo'].astype(str).str.strip()
+    frame = frame.merge(units, on='modismo', how='inner')
+    result = frame.groupby(['modelo', 'unidad'], sort=False)[score_column].agg(['mean', 'size']).reset_index()
+    result.columns = ['modelo', 'unidad', 'score', 'n']
+    names = index.geometry.dept_names if level == 'departamento' else index.geometry.mpio_names
+    result['nombre'] = np.asarray(names, dtype=object)[result['unidad'].to_numpy()]
+    return result[['modelo', 'unidad', 'nombre', 'score', 'n']]
+
+
+def score_matrix(aggregated: pd.DataFrame, models: Sequence[str], geometry: Geometry,
+                 level: str = 'departamento') -> np.ndarray:
+    """Matriz (modelos, unidades) de scores medios, NaN donde no hay datos."""
+    n_units = len(geometry.dept_names) if level == 'departamento' else len(geometry.mpio_names)
+    matrix = np.full((len(models), n_units), np.nan)
+    rows = pd.Index(list(models)).get_indexer(aggregated['modelo'])
+    keep = rows >= 0
+    matrix[rows[keep], aggregated['unidad'].to_numpy()[keep]] = aggregated['score'].to_numpy()[keep]
+    return matrix
+
+
+def plot_maps(aggregated: pd.DataFrame, models: Sequence[str], output_file: Optional[str] = None,
+              level: str = 'departamento', title: Optional[str] = None, ncols: int = 5,
+              cmap: str = 'viridis', geometry: Optional[Geometry] = None):
+    """
+    Un mapa por modelo en una sola figura (como map_task2.pdf / map_task3.pdf).
+
+    Todos los mapas comparten la geometría decodificada: cada eje recibe una
+    PolyCollection de los mismos anillos y sólo cambian los colores.
+
+    Args:
+        aggregated: Salida de aggregate_scores
+        models: Modelos, en el orden de los paneles
+        output_file: PDF de salida (None para no guardar)
+        level: 'departamento' o 'municipio'
+        title: Título de la figura
+        ncols: Paneles por fila
+        cmap: Mapa de colores
+        geometry: Geometría (default: load_geometry())
+
+    Returns:
+        Figura de matplotlib
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import PolyCollection
+
+    geometry = geometry or load_geometry()
+    rings, owner = geometry.polygons(level)
+    values = score_matrix(aggregated, models, geometry, level)
+    finite = values[np.isfinite(values)]
+    vmin, vmax = (float(finite.min()), float(finite.max())) if finite.size else (0.0, 1.0)
+    x0, y0, x1, y1 = geometry.bounds
+
+    nrows = max(1, -(-len(models) // ncols))
+    fig, axes = plt.subplots(nrows, ncols, figsize=(3 * ncols, 3.6 * nrows), squeeze=False)
+    colormap = plt.get_cmap(cmap).copy()
+    colormap.set_bad('#eeeeee')
+    for ax, model, row in zip(axes.flat, models, values):
+        collection = PolyCollection(rings, cmap=colormap, edgecolors='white', linewidths=0.2)
+        collection.set_array(np.ma.masked_invalid(row[owner]))
+        collection.set_clim(vmin, vmax)
+        ax.add_collection(collection)
+        ax.set_xlim(x0, x1)
+        ax.set_ylim(y0, y1)
+        ax.set_aspect('equal')
+        ax.set_title(model.split('/')[-1], fontsize=9)
+        ax.axis('off')
+    for ax in axes.flat[len(models):]:
+        ax.axis('off')
+
+    mappable = plt.cm.ScalarMappable(cmap=colormap, norm=plt.Normalize(vmin, vmax))
+    fig.colorbar(mappable, ax=axes.ravel().tolist(), shrink=0.6, label='Score medio')
+    if title:
+        fig.suptitle(title)
+    if output_file:
+        fig.savefig(output_file, bbox_inches='tight')
+    return fig
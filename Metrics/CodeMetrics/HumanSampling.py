@@ -0,0 +1,583 @@
+"""
+Muestras estratificadas para evaluación humana (sonar_prompt_2.csv, sonar_prompt_3.csv)
+Una sola lectura de cada prompt (almacén de resultados o prompt_N_metrics_data.json) sortea las muestras de todos los modelos
+"""
+
+import os
+import re
+import sys
+import json
+import heapq
+import random
+import hashlib
+import argparse
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+METRICS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+DEFAULT_DATA_DIR = os.path.join(METRICS_DIR, 'LLMs_Results')
+
+DEFAULT_MODELS_FILE = os.path.join(DEFAULT_DATA_DIR, 'models.txt')
+
+DEFAULT_DATASET = os.path.join(METRICS_DIR, 'DataSet', 'DataSet.json')
+
+DEFAULT_REGIONS_DATASET = os.path.join(METRICS_DIR, 'DataSet', 'DataSet_ConRegión.json')
+
+# Las hojas nuevas van en su propio directorio: las de Human_Metrics/ ya están anotadas
+DEFAULT_OUTPUT_DIR = os.path.join(METRICS_DIR, 'Human_Metrics', 'Muestras')
+
+# Almacén Parquet de resultados (APIs/Engine/ResultsStore.py)
+ENGINE_DIR = os.path.join(METRICS_DIR, '..', 'APIs', 'Engine')
+
+DEFAULT_STORE_DIR = os.path.join(METRICS_DIR, '..', 'APIs', 'Results', 'Store')
+
+DEFAULT_SEED = 42
+
+# Tamaños de muestra por modelo de generate_sonar_prompt_2.py y generate_sonar_prompt_3.py
+DEFAULT_SIZES = {'Prompt 2': 2_290, 'Prompt 3': 1_715}
+
+# Estratos disponibles (además del modelo, que siempre separa las muestras)
+STRATA = ('region', 'fuente', 'cuantil')
+
+CON_REGION = 'Con región'
+SIN_REGION = 'Sin región'
+SIN_SCORE = 'Sin score'
+
+# Columnas de cada hoja: (encabezado, campo del registro). '{label}' se reemplaza
+# por el nombre corto del modelo y 'definiciones_reales' son todas las
+# definiciones del modismo en DataSet.json, unidas con ' | '
+SHEET_COLUMNS = {
+    'Prompt 1': (('Modismo', 'modismo'), ('Respuesta {label}', 'es_modismo_generado')),
+    'Prompt 2': (('Modismo', 'modismo'), ('Definición {label}', 'definicion_generada'),
+                 ('Definiciones Reales', 'definiciones_reales')),
+    'Prompt 3': (('Ejemplo', 'ejemplo'), ('Modismo', 'modismo'), ('Definición Real', 'significado_real'),
+                 ('Sinónimo', 'literal_generado'), ('Definición Sinónimo', 'definicion_generada')),
+}
+
+# Columnas vacías que completan los anotadores (las de Human_Analysis.ipynb)
+ANNOTATION_COLUMNS = {
+    'Prompt 1': ('Acorde',),
+    'Prompt 2': ('Acorde',),
+    'Prompt 3': ('Acorde', 'Def. real'),
+}
+
+_WHITESPACE = ' \t\r\n,'
+
+
+def prompt_path(prompt: str, data_dir: str = DEFAULT_DATA_DIR) -> str:
+    """Archivo de métricas de un prompt ('Prompt 2' -> LLMs_Results/prompt_2_metrics_data.json)."""
+    number = prompt.split()[-1]
+    return os.path.join(data_dir, f'prompt_{number}_metrics_data.json')
+
+
+def load_models_from_file(filepath: str = DEFAULT_MODELS_FILE) -> List[str]:
+    """Carga modelos desde archivo de texto (uno por línea; ignora vacías y comentarios)."""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+
+
+def iter_records(path: str, chunk_size: int = 1 << 20) -> Iterator[Dict[str, Any]]:
+    """
+    Recorre un arreglo JSON registro por registro sin cargar el archivo completo.
+
+    Args:
+        path: Archivo con un arreglo JSON de objetos (ej: prompt_2_metrics_data.json)
+        chunk_size: Caracteres leídos por bloque
+
+    Yields:
+        Cada registro del arreglo
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = f.read(chunk_size).lstrip()
+        if not buffer.startswith('['):
+            raise ValueError(f"{path} no contiene un arreglo JSON")
+        pos, eof = 1, False
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == ']':
+                return
+            try:
+                if pos == len(buffer):
+                    raise json.JSONDecodeError('Fin del bloque', buffer, pos)
+                record, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Registro cortado al final del bloque: se lee el siguiente
+                if eof:
+                    raise
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer, pos = buffer[pos:] + chunk, 0
+                continue
+            yield record
+            pos = end
+
+
+def store_records(prompt: str, models: Sequence[str], store_dir: str = DEFAULT_STORE_DIR) -> Iterator[Dict[str, Any]]:
+    """
+    Registros de un prompt leídos del almacén de resultados.
+
+    ResultsStore.metrics_data devuelve los mismos registros que
+    prompt_N_metrics_data.json (en el orden de models y, por modelo, en el
+    del archivo de resultados) y sólo escanea las particiones de esos modelos.
+
+    Args:
+        prompt: Prompt (ej: 'Prompt 2')
+        models: Modelos a leer
+        store_dir: Directorio del almacén
+
+    Yields:
+        Cada registro, con las columnas de prompt_N_metrics_data.json
+    """
+    if ENGINE_DIR not in sys.path:
+        sys.path.insert(0, ENGINE_DIR)
+    from ResultsStore import ResultsStore
+
+    frame = ResultsStore(store_dir).metrics_data(prompt, models=list(models))
+    columns = list(frame.columns)
+    for values in frame.itertuples(index=False, name=None):
+        yield dict(zip(columns, values))
+
+
+def prompt_records(prompt: str, models: Sequence[str],
+                   source: Optional[Union[str, Iterable[Dict[str, Any]]]] = None) -> Iterable[Dict[str, Any]]:
+    """
+    Registros de un prompt desde un archivo, un iterable o (default) la fuente disponible.
+
+    Sin source se usa el almacén de resultados si existe (store_records) y,
+    si no, LLMs_Results/prompt_N_metrics_data.json en streaming.
+    """
+    if source is None:
+        if os.path.exists(os.path.join(DEFAULT_STORE_DIR, 'manifest.json')):
+            return store_records(prompt, models)
+        source = prompt_path(prompt)
+    return iter_records(source) if isinstance(source, str) else source
+
+
+def load_references(dataset_path: str = DEFAULT_DATASET,
+                    regions_path: str = DEFAULT_REGIONS_DATASET) -> Dict[str, Dict[str, Any]]:
+    """
+    Fuente, región y definiciones de cada modismo.
+
+    Args:
+        dataset_path: Dataset completo (DataSet.json)
+        regions_path: Dataset con región (DataSet_ConRegión.json)
+
+    Returns:
+        Dict {modismo: {'fuente', 'region', 'definiciones_reales'}}; region es
+        'Con región' si el modismo aparece con región en regions_path
+    """
+    with open(regions_path, 'r', encoding='utf-8') as f:
+        with_region = {(item.get('modismo') or '').strip() for item in json.load(f)
+                       if (item.get('región') or '').strip()}
+
+    references: Dict[str, Dict[str, Any]] = {}
+    with open(dataset_path, 'r', encoding='utf-8') as f:
+        for item in json.load(f):
+            modismo = (item.get('modismo') or '').strip()
+            if not modismo:
+                continue
+            reference = references.get(modismo)
+            if reference is None:
+                reference = references[modismo] = {
+                    'fuente': item.get('Fuente') or 'Sin fuente',
+                    'region': CON_REGION if modismo in with_region else SIN_REGION,
+                    'definiciones': [],
+                }
+            if item.get('significado'):
+                reference['definiciones'].append(item['significado'])
+    for reference in references.values():
+        reference['definiciones_reales'] = ' | '.join(reference.pop('definiciones'))
+    return references
+
+
+def _score_key(record: Dict[str, Any], candidate_field: str) -> Tuple[str, str, str]:
+    return (record.get('modelo') or '', (record.get('modismo') or '').strip(), record.get(candidate_field) or '')
+
+
+def score_quantiles(scores: pd.DataFrame, score_column: str = 'f1_score',
+                    candidate_field: str = 'definicion_generada', n_quantiles: int = 4) -> Dict[Tuple[str, str, str], str]:
+    """
+    Cuantil del score de cada respuesta, con cortes por modelo.
+
+    Args:
+        scores: DataFrame con modelo, modismo, candidate_field y score_column
+                (ej: una de las tablas de run_incremental)
+        score_column: Columna del score
+        candidate_field: Texto generado, para distinguir respuestas del mismo modismo
+        n_quantiles: Número de cuantiles (etiquetas 'Q1'...'Qn', Q1 el más bajo)
+
+    Returns:
+        Dict {(modelo, modismo, texto generado): 'Qk'}
+    """
+    frame = scores[['modelo', 'modismo', candidate_field, score_column]].dropna(subset=[score_column])
+    labels: Dict[Tuple[str, str, str], str] = {}
+    probabilities = np.linspace(0, 1, n_quantiles + 1)[1:-1]
+    for model, group in frame.groupby('modelo', sort=False):
+        values = group[score_column].to_numpy(dtype=np.float64)
+        bins = np.searchsorted(np.quantile(values, probabilities), values, side='right')
+        modismos = group['modismo'].astype(str).str.strip()
+        candidates = group[candidate_field].fillna('').astype(str)
+        for modismo, candidate, q in zip(modismos, candidates, bins):
+            labels[(model, modismo, candidate)] = f'Q{q + 1}'
+    return labels
+
+
+def _record_key(seed: int, prompt: str, record: Dict[str, Any], candidate_field: str) -> int:
+    """Clave aleatoria del registro: depende de la semilla y del contenido, no del orden del archivo."""
+    text = '\x1f'.join((str(seed), prompt, record.get('modelo') or '', record.get('modismo') or '',
+                        record.get('ejemplo') or '', str(record.get(candidate_field) or '')))
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def allocate(counts: Dict[Any, int], size: int, quotas: Optional[Dict[Any, Optional[int]]] = None) -> Dict[Any, int]:
+    """
+    Tamaño de la muestra de cada estrato.
+
+    Los estratos con cuota fija toman esa cantidad (None = todos sus registros);
+    el resto de la muestra se reparte en proporción al tamaño de los demás
+    estratos (mayores restos), sin pasar de los registros disponibles.
+
+    Args:
+        counts: Registros disponibles por estrato
+        size: Tamaño total de la muestra
+        quotas: Cuotas fijas por estrato
+
+    Returns:
+        Dict {estrato: tamaño}
+    """
+    quotas = quotas or {}
+    sizes = {stratum: 0 for stratum in counts}
+    remaining = size
+    for stratum, quota in quotas.items():
+        if stratum in counts:
+            sizes[stratum] = min(counts[stratum] if quota is None else quota, counts[stratum], remaining)
+            remaining -= sizes[stratum]
+
+    open_strata = [s for s in counts if s not in quotas and counts[s] > 0]
+    while remaining > 0 and open_strata:
+        available = np.array([counts[s] - sizes[s] for s in open_strata], dtype=np.float64)
+        exact = remaining * available / available.sum()
+        extra = np.minimum(np.floor(exact).astype(np.int64), available.astype(np.int64))
+        leftover = remaining - int(extra.sum())
+        # Mayores restos entre los estratos que aún tienen registros
+        order = np.argsort(-(exact - extra), kind='stable')
+        for i in order[:leftover]:
+            if extra[i] < available[i]:
+                extra[i] += 1
+        for stratum, n in zip(open_strata, extra):
+            sizes[stratum] += int(n)
+        remaining -= int(extra.sum())
+        open_strata = [s for s in open_strata if counts[s] > sizes[s]]
+        if not extra.sum():
+            break
+    return sizes
+
+
+def draw_samples(sizes: Union[int, Dict[str, int]], models: Sequence[str],
+                 prompts: Optional[Sequence[str]] = None, by: Sequence[str] = ('region',),
+                 quotas: Optional[Dict[Any, Optional[int]]] = None,
+                 sources: Optional[Dict[str, Union[str, Iterable[Dict[str, Any]]]]] = None,
+                 scores: Optional[Dict[str, pd.DataFrame]] = None, score_column: str = 'f1_score',
+                 candidate_field: str = 'definicion_generada', n_quantiles: int = 4,
+                 references: Optional[Dict[str, Dict[str, Any]]] = None,
+                 seed: int = DEFAULT_SEED) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Muestras estratificadas de varios modelos y prompts en una sola pasada.
+
+    Cada (prompt, modelo, estrato) guarda un reservorio con los registros de
+    menor clave aleatoria (bottom-k), así que la memoria depende del tamaño de
+    la muestra y no del archivo. Al terminar la pasada se conocen los
+    tamaños de los estratos: se asigna la muestra con allocate() y cada
+    estrato entrega sus primeros registros, que son una muestra uniforme.
+    La clave de cada registro sale de un hash de la semilla y su contenido:
+    la misma semilla da la misma muestra aunque cambie el orden de los
+    archivos o se agreguen otros modelos.
+
+    Args:
+        sizes: Tamaño de la muestra por modelo (un entero o {prompt: tamaño})
+        models: Modelos a muestrear
+        prompts: Prompts (default: las claves de sizes, o DEFAULT_SIZES)
+        by: Estratos: 'region' (con/sin región), 'fuente' y/o 'cuantil' del score
+        quotas: Cuotas fijas por estrato (tuplas con los valores de by, o el valor
+                solo si by tiene un estrato); None = todos los registros del estrato
+        sources: {prompt: archivo o iterable de registros} (default: prompt_records, el
+                 almacén de resultados si existe o LLMs_Results)
+        scores: {prompt: DataFrame de scores} para el estrato 'cuantil'
+        score_column: Columna del score en scores
+        candidate_field: Texto generado (para el cuantil y la clave aleatoria)
+        n_quantiles: Cuantiles del score
+        references: Resultado de load_references() (default: se carga)
+        seed: Semilla
+
+    Returns:
+        (muestra, resumen): la muestra con prompt, modelo, los estratos y los
+        campos de cada registro, y por estrato los registros disponibles, los
+        muestreados y el peso (disponibles / muestreados)
+    """
+    unknown = [name for name in by if name not in STRATA]
+    if unknown:
+        raise ValueError(f"Estratos desconocidos: {unknown}. Opciones: {list(STRATA)}")
+    if 'cuantil' in by and not scores:
+        raise ValueError("El estrato 'cuantil' requiere scores")
+    if prompts is None:
+        prompts = list(sizes) if isinstance(sizes, dict) else list(DEFAULT_SIZES)
+    sizes = {prompt: sizes[prompt] if isinstance(sizes, dict) else sizes for prompt in prompts}
+    sources = sources or {}
+    references = references if references is not None else load_references()
+    quotas = {(k if isinstance(k, tuple) else (k,)): v for k, v in (quotas or {}).items()}
+    models = list(dict.fromkeys(models))
+    wanted = set(models)
+
+    rows, summary = [], []
+    for prompt in prompts:
+        quantiles = (score_quantiles(scores[prompt], score_column, candidate_field, n_quantiles)
+                     if 'cuantil' in by and prompt in scores else {})
+        capacity = sizes[prompt]
+        reservoirs: Dict[Tuple[str, Tuple[str, ...]], List[Tuple[int, int, Dict[str, Any]]]] = {}
+        counts: Dict[Tuple[str, Tuple[str, ...]], int] = {}
+
+        for seq, record in enumerate(prompt_records(prompt, models, sources.get(prompt))):
+            model = record.get('modelo')
+            if model not in wanted:
+                continue
+            reference = references.get((record.get('modismo') or '').strip(), {})
+            values = {'region': reference.get('region', SIN_REGION),
+                      'fuente': reference.get('fuente', 'Sin fuente'),
+                      'cuantil': quantiles.get(_score_key(record, candidate_field), SIN_SCORE)}
+            cell = (model, tuple(values[name] for name in by))
+            counts[cell] = counts.get(cell, 0) + 1
+
+            # Max-heap (claves negadas) con las capacity claves más pequeñas
+            key = _record_key(seed, prompt, record, candidate_field)
+            heap = reservoirs.setdefault(cell, [])
+            if len(heap) < capacity:
+                heapq.heappush(heap, (-key, -seq, record))
+            elif -key > heap[0][0]:
+                heapq.heapreplace(heap, (-key, -seq, record))
+
+        for model in models:
+            cells = {cell[1]: n for cell, n in counts.items() if cell[0] == model}
+            allocation = allocate(cells, capacity, quotas)
+            for stratum, n in allocation.items():
+                chosen = sorted((-k, -s, r) for k, s, r in reservoirs[(model, stratum)])[:n]
+                for key, _, record in chosen:
+                    row = {'prompt': prompt, 'modelo': model, **dict(zip(by, stratum)), '_clave': key}
+                    row.update(record)
+                    row['definiciones_reales'] = references.get((record.get('modismo') or '').strip(),
+                                                                {}).get('definiciones_reales', '')
+                    rows.append(row)
+                summary.append({'prompt': prompt, 'modelo': model, **dict(zip(by, stratum)),
+                                'disponibles': cells[stratum], 'muestra': n,
+                                'peso': cells[stratum] / n if n else np.nan})
+
+    sample = pd.DataFrame(rows)
+    if len(sample):
+        # El orden por clave mezcla los estratos (como random.shuffle en los scripts)
+        sample = sample.sort_values(['prompt', 'modelo', '_clave'], kind='stable')
+        sample = sample.drop(columns='_clave').reset_index(drop=True)
+    return sample, pd.DataFrame(summary)
+
+
+def legacy_sample(prompt: str, model: str, size: int,
+                  source: Optional[Union[str, Iterable[Dict[str, Any]]]] = None,
+                  dataset_path: str = DEFAULT_DATASET, regions_path: str = DEFAULT_REGIONS_DATASET,
+                  seed: int = DEFAULT_SEED) -> pd.DataFrame:
+    """
+    Muestra de los scripts originales de Human_Metrics (la de sonar_prompt_2.csv y sonar_prompt_3.csv).
+
+    Repite random.seed(seed), random.sample y random.shuffle sobre los
+    registros del modelo en el orden del archivo: todos los que tienen región
+    más una muestra al azar de los demás. A diferencia de draw_samples(),
+    el resultado depende del orden de los registros, así que sólo reproduce
+    una muestra anotada si los datos son los mismos.
+
+    Args:
+        prompt: Prompt (ej: 'Prompt 2')
+        model: Modelo
+        size: Tamaño de la muestra
+        source: Archivo o iterable de registros (default: prompt_records)
+        dataset_path: Dataset con las definiciones (DataSet.json)
+        regions_path: Dataset con región (DataSet_ConRegión.json)
+        seed: Semilla
+
+    Returns:
+        DataFrame con las columnas de draw_samples() (prompt, modelo, region y los campos del registro)
+    """
+    # Mismas comparaciones que los scripts: modismo sin normalizar
+    with open(regions_path, 'r', encoding='utf-8') as f:
+        with_region = {item.get('modismo') for item in json.load(f) if (item.get('región') or '').strip()}
+    definitions: Dict[str, List[str]] = {}
+    with open(dataset_path, 'r', encoding='utf-8') as f:
+        for item in json.load(f):
+            if item.get('modismo') and item.get('significado'):
+                definitions.setdefault(item['modismo'], []).append(item['significado'])
+
+    records = [r for r in prompt_records(prompt, [model], source) if r.get('modelo') == model]
+    con_region = [r for r in records if r.get('modismo') in with_region]
+    sin_region = [r for r in records if r.get('modismo') not in with_region]
+
+    rng = random.Random(seed)
+    selected = con_region + rng.sample(sin_region, size - len(con_region))
+    rng.shuffle(selected)
+
+    rows = [{'prompt': prompt, 'modelo': model,
+             'region': CON_REGION if record.get('modismo') in with_region else SIN_REGION, **record,
+             'definiciones_reales': ' | '.join(definitions.get(record.get('modismo'), []))}
+            for record in selected]
+    return pd.DataFrame(rows)
+
+
+def model_label(model: str) -> str:
+    """Nombre corto del modelo para encabezados ('perplexity/sonar' -> 'Sonar')."""
+    name = model.split('/')[-1]
+    return name[:1].upper() + name[1:]
+
+
+def annotation_sheet(sample: pd.DataFrame, prompt: str, model: str, label: Optional[str] = None,
+                     annotation_columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """
+    Hoja de anotación de un modelo y prompt, con las columnas de los scripts de Human_Metrics.
+
+    Args:
+        sample: Muestra de draw_samples()
+        prompt: Prompt (ej: 'Prompt 2')
+        model: Modelo
+        label: Nombre del modelo en los encabezados (default: model_label(model))
+        annotation_columns: Columnas vacías para los anotadores (default: ANNOTATION_COLUMNS)
+
+    Returns:
+        DataFrame listo para exportar
+    """
+    label = label or model_label(model)
+    rows = sample[(sample['prompt'] == prompt) & (sample['modelo'] == model)]
+    sheet = pd.DataFrame({header.format(label=label): (rows[field].fillna('') if field in rows else '')
+                          for header, field in SHEET_COLUMNS[prompt]})
+    for column in (ANNOTATION_COLUMNS[prompt] if annotation_columns is None else annotation_columns):
+        sheet[column] = ''
+    return sheet.reset_index(drop=True)
+
+
+def sheet_name(model: str, prompt: str) -> str:
+    """Nombre base de los archivos ('perplexity/sonar', 'Prompt 2' -> 'sonar_prompt_2')."""
+    name = re.sub(r'[^0-9A-Za-z]+', '_', model.split('/')[-1]).strip('_').lower()
+    return f"{name}_prompt_{prompt.split()[-1]}"
+
+
+def has_annotations(path: str, prompt: str, sep: str = ';') -> bool:
+    """
+    Indica si una hoja existente tiene alguna anotación (valor en las columnas de ANNOTATION_COLUMNS).
+
+    Args:
+        path: Hoja .csv o .xlsx
+        prompt: Prompt de la hoja
+        sep: Separador del CSV
+
+    Returns:
+        True si el archivo existe y alguna columna de anotación tiene un valor
+    """
+    if not os.path.exists(path):
+        return False
+    if path.endswith('.xlsx'):
+        sheet = pd.read_excel(path, dtype=str, engine='openpyxl')
+    else:
+        sheet = pd.read_csv(path, sep=sep, dtype=str, encoding='utf-8-sig', keep_default_na=False)
+    columns = [c for c in ANNOTATION_COLUMNS[prompt] if c in sheet.columns]
+    return any(sheet[c].fillna('').str.strip().ne('').any() for c in columns)
+
+
+def write_sheets(sample: pd.DataFrame, output_dir: str = DEFAULT_OUTPUT_DIR, formats: Sequence[str] = ('csv', 'xlsx'),
+                 labels: Optional[Dict[str, str]] = None, sep: str = ';') -> List[str]:
+    """
+    Escribe una hoja de anotación por modelo y prompt (ej: sonar_prompt_2.csv y .xlsx).
+
+    Antes de escribir revisa todos los archivos de destino: si alguno ya
+    existe con anotaciones no se escribe ninguno.
+
+    Args:
+        sample: Muestra de draw_samples() o legacy_sample()
+        output_dir: Directorio de salida (default: Human_Metrics/Muestras)
+        formats: 'csv' y/o 'xlsx' (requiere openpyxl)
+        labels: Nombre de cada modelo en los encabezados (default: model_label)
+        sep: Separador del CSV (';', el que lee Human_Analysis.ipynb)
+
+    Returns:
+        Rutas de los archivos escritos
+
+    Raises:
+        FileExistsError: Si alguna hoja de destino ya tiene anotaciones
+    """
+    labels = labels or {}
+    groups = list(sample.groupby(['prompt', 'modelo'], sort=False).groups)
+    annotated = [f"{sheet_name(model, prompt)}.{ext}" for prompt, model in groups for ext in ('csv', 'xlsx')
+                 if ext in formats and has_annotations(os.path.join(output_dir, f"{sheet_name(model, prompt)}.{ext}"),
+                                                       prompt, sep)]
+    if annotated:
+        raise FileExistsError(f"Hojas con anotaciones en {output_dir}: {', '.join(annotated)}. "
+                              f"Usar otro output_dir o mover esos archivos")
+
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+    for prompt, model in groups:
+        sheet = annotation_sheet(sample, prompt, model, labels.get(model))
+        base = os.path.join(output_dir, sheet_name(model, prompt))
+        if 'xlsx' in formats:
+            sheet.to_excel(base + '.xlsx', index=False, engine='openpyxl')
+            written.append(base + '.xlsx')
+        if 'csv' in formats:
+            # utf-8-sig para que Excel abra bien las tildes
+            sheet.to_csv(base + '.csv', index=False, sep=sep, encoding='utf-8-sig')
+            written.append(base + '.csv')
+    return written
+
+
+def main():
+    """Genera las hojas de anotación desde la línea de comandos."""
+    parser = argparse.ArgumentParser(description="Muestras estratificadas para evaluación humana")
+    parser.add_argument('--models', nargs='+', default=None, help="Modelos (default: models.txt)")
+    parser.add_argument('--prompts', nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--sizes', nargs='+', type=int, default=None,
+                        help="Tamaño por modelo de cada prompt (default: 2290 y 1715)")
+    parser.add_argument('--by', nargs='+', default=['region'], choices=[s for s in STRATA if s != 'cuantil'])
+    parser.add_argument('--all-region', action='store_true',
+                        help="Incluye todos los registros con región (como los scripts de Sonar)")
+    parser.add_argument('--legacy', action='store_true',
+                        help="Selección de los scripts originales (random.sample + shuffle; implica --all-region)")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument('--formats', nargs='+', default=['csv', 'xlsx'], choices=['csv', 'xlsx'])
+    args = parser.parse_args()
+
+    models = args.models or load_models_from_file()
+    if args.sizes is None:
+        sizes = {prompt: DEFAULT_SIZES[prompt] for prompt in args.prompts}
+    elif len(args.sizes) == 1:
+        sizes = {prompt: args.sizes[0] for prompt in args.prompts}
+    elif len(args.sizes) == len(args.prompts):
+        sizes = dict(zip(args.prompts, args.sizes))
+    else:
+        parser.error("--sizes debe tener un valor o uno por prompt")
+    quotas = None
+    if args.all_region:
+        if 'region' not in args.by:
+            parser.error("--all-region requiere --by region")
+        if len(args.by) > 1:
+            parser.error("--all-region sólo admite el estrato 'region'")
+        quotas = {CON_REGION: None}
+
+    if args.legacy:
+        sample = pd.concat([legacy_sample(prompt, model, sizes[prompt], seed=args.seed)
+                            for prompt in args.prompts for model in models], ignore_index=True)
+        summary = sample.groupby(['prompt', 'modelo', 'region']).size().rename('muestra').reset_index()
+    else:
+        sample, summary = draw_samples(sizes, models, by=args.by, quotas=quotas, seed=args.seed)
+    written = write_sheets(sample, args.output_dir, args.formats)
+    print(summary.to_string(index=False))
+    print(f"\n✓ {len(written)} archivos en {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
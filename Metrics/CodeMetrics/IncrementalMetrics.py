@@ -0,0 +1,281 @@
+"""
+Cálculo incremental de métricas
+Sólo se calculan las celdas (modelo, prompt, modismo, candidato, referencia, métrica) nuevas o modificadas
+"""
+
+import os
+import glob
+import hashlib
+import numpy as np
+import pandas as pd
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Directorio por defecto del almacén de scores
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Metrics_Results', 'score_store')
+
+# Tipo de las huellas: digest SHA-1 de 20 bytes
+_FINGERPRINT_DTYPE = 'S20'
+
+
+class MetricSpec:
+    """
+    Métrica que puede calcular el runner incremental.
+
+    Args:
+        name: Nombre de la métrica (el mismo de ComputeMetrics.ipynb, ej: 'BETO')
+        compute: Función (candidatos, referencias) -> {columna: array de scores}
+        version: Función que describe la configuración actual de la métrica
+                 (modelo, backend, parámetros); forma parte de la huella, así
+                 que cambiarla invalida los scores anteriores
+    """
+
+    def __init__(self, name: str, compute: Callable[[List[str], List[str]], Dict[str, np.ndarray]],
+                 version: Callable[[], str]):
+        self.name = name
+        self.compute = compute
+        self.version = version
+
+
+def _bertscore_metric(name: str, model_attr: str, function_name: str) -> MetricSpec:
+    """BERTScore: columnas precision, recall y f1_score."""
+    def compute(candidatos, referencias):
+        import BertScore
+        P, R, F1 = getattr(BertScore, function_name)(candidatos, referencias)
+        return {'precision': P.numpy(), 'recall': R.numpy(), 'f1_score': F1.numpy()}
+
+    def version():
+        import BertScore
+        from Acceleration import backend_key
+        return f"bertscore:{backend_key(getattr(BertScore, model_attr))}:L{BertScore.BERTSCORE_NUM_LAYERS}"
+
+    return MetricSpec(name, compute, version)
+
+
+def _sbert_metric(name: str, model_attr: str, function_name: str) -> MetricSpec:
+    """Sentence-BERT: columna similarity."""
+    def compute(candidatos, referencias):
+        import SentenceBert
+        return {'similarity': np.asarray(getattr(SentenceBert, function_name)(candidatos, referencias))}
+
+    def version():
+        import SentenceBert
+        from Acceleration import backend_key
+        return f"sbert:{backend_key(getattr(SentenceBert, model_attr))}"
+
+    return MetricSpec(name, compute, version)
+
+
+def _chrf_compute(candidatos, referencias):
+    from chrF import compute_chrf_batch
+    return {'chrf_score': np.asarray(compute_chrf_batch(candidatos, referencias))}
+
+
+# Métricas disponibles, con los mismos nombres que ComputeMetrics.ipynb
+METRICS: Dict[str, MetricSpec] = {spec.name: spec for spec in (
+    _bertscore_metric('BETO', 'model_name_beto', 'compute_bertscore_beto'),
+    _bertscore_metric('SciBETO', 'model_name_sci_beto', 'compute_bertscore_sci_beto'),
+    _sbert_metric('SciBETO-mean', 'cache_name_scibeto', 'compute_scibeto_similarity'),
+    _sbert_metric('paraphrase-mpnet', 'model_name_sbert', 'compute_sbert_similarity'),
+    _sbert_metric('XLM-RoBERTa', 'model_name_xlm', 'compute_xlm_similarity'),
+    MetricSpec('chrF', _chrf_compute, lambda: 'chrf:n6:beta2:set'),
+)}
+
+
+def cell_fingerprint(model: str, prompt: str, modismo: str, candidato: str, referencia: str, metric_version: str) -> bytes:
+    """Huella SHA-1 (20 bytes) de una celda; cambia si cambia cualquiera de sus entradas."""
+    payload = '\x1f'.join((model, prompt, modismo, candidato, referencia, metric_version))
+    return hashlib.sha1(payload.encode('utf-8')).digest()
+
+
+class ScoreStore:
+    """
+    Almacén columnar de scores por métrica.
+
+    Cada métrica tiene un directorio con segmentos .npz que sólo se agregan:
+    una columna 'fingerprint' (huella de la celda) y una columna float64 por
+    score. Al abrir una métrica se concatenan sus segmentos y se ordenan por
+    huella, de modo que buscar miles de celdas es un searchsorted; si una
+    huella aparece en varios segmentos gana el más reciente. compact() une
+    los segmentos en uno solo.
+
+    Estructura en disco:
+        <root>/<métrica>/part-00000.npz, part-00001.npz, ...
+
+    Args:
+        root: Directorio del almacén (default: Metrics_Results/score_store)
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or DEFAULT_STORE_DIR
+        self._tables: Dict[str, Tuple[np.ndarray, Dict[str, np.ndarray]]] = {}
+
+    def _metric_dir(self, metric: str) -> str:
+        return os.path.join(self.root, metric.replace('/', '__'))
+
+    def _segments(self, metric: str) -> List[str]:
+        return sorted(glob.glob(os.path.join(self._metric_dir(metric), 'part-*.npz')))
+
+    def _table(self, metric: str) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """Huellas ordenadas y columnas alineadas de una métrica (se carga una vez)."""
+        if metric not in self._tables:
+            fingerprints, columns = [], {}
+            for path in self._segments(metric):
+                with np.load(path) as segment:
+                    fingerprints.append(segment['fingerprint'])
+                    for name in segment.files:
+                        if name != 'fingerprint':
+                            columns.setdefault(name, []).append(segment[name])
+            if fingerprints:
+                all_fingerprints = np.concatenate(fingerprints)
+                # Orden estable invertido: ante huellas repetidas queda la del segmento más reciente
+                reverse = np.arange(len(all_fingerprints))[::-1]
+                unique, first = np.unique(all_fingerprints[reverse], return_index=True)
+                rows = reverse[first]
+                table = (unique, {name: np.concatenate(parts)[rows] for name, parts in columns.items()})
+            else:
+                table = (np.empty(0, dtype=_FINGERPRINT_DTYPE), {})
+            self._tables[metric] = table
+        return self._tables[metric]
+
+    def lookup(self, metric: str, fingerprints: np.ndarray) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Busca celdas en el almacén.
+
+        Args:
+            metric: Nombre de la métrica
+            fingerprints: Array de huellas (dtype S20)
+
+        Returns:
+            Tupla (máscara de encontradas, {columna: valores}) con NaN donde no hay score
+        """
+        stored, columns = self._table(metric)
+        positions = np.searchsorted(stored, fingerprints)
+        positions = np.minimum(positions, max(len(stored) - 1, 0))
+        found = (stored[positions] == fingerprints) if len(stored) else np.zeros(len(fingerprints), dtype=bool)
+        values = {}
+        for name, column in columns.items():
+            values[name] = np.where(found, column[positions], np.nan)
+        return found, values
+
+    def append(self, metric: str, fingerprints: np.ndarray, columns: Dict[str, np.ndarray]):
+        """Guarda un segmento nuevo con scores de celdas recién calculadas."""
+        if len(fingerprints) == 0:
+            return
+        directory = self._metric_dir(metric)
+        os.makedirs(directory, exist_ok=True)
+        segments = self._segments(metric)
+        number = int(os.path.basename(segments[-1])[5:10]) + 1 if segments else 0
+        path = os.path.join(directory, f"part-{number:05d}.npz")
+        arrays = {name: np.asarray(values, dtype=np.float64) for name, values in columns.items()}
+        # Se escribe a un temporal: un segmento sólo existe si está completo
+        with open(path + '.tmp', 'wb') as f:
+            np.savez(f, fingerprint=np.asarray(fingerprints, dtype=_FINGERPRINT_DTYPE), **arrays)
+        os.replace(path + '.tmp', path)
+        self._tables.pop(metric, None)
+
+    def compact(self, metric: Optional[str] = None):
+        """Une los segmentos de una métrica (o de todas) en uno solo."""
+        metrics = [metric] if metric else self.metrics()
+        for name in metrics:
+            old_segments = self._segments(name)
+            if len(old_segments) <= 1:
+                continue
+            # El segmento compactado se escribe antes de borrar los anteriores
+            fingerprints, columns = self._table(name)
+            self.append(name, fingerprints, columns)
+            for path in old_segments:
+                os.remove(path)
+
+    def metrics(self) -> List[str]:
+        """Métricas con scores almacenados."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(d for d in os.listdir(self.root) if self._segments(d))
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Celdas y segmentos por métrica."""
+        return {name: {'cells': len(self._table(name)[0]), 'segments': len(self._segments(name))}
+                for name in self.metrics()}
+
+
+def run_incremental(records: List[Dict[str, Any]], prompt: str, models: Optional[Sequence[str]] = None,
+                    metrics: Optional[Sequence[str]] = None,
+                    candidate_field: str = 'definicion_generada', reference_field: str = 'definicion_real',
+                    store: Optional[ScoreStore] = None, verbose: bool = True) -> Dict[str, pd.DataFrame]:
+    """
+    Calcula métricas sólo para las celdas que no están en el almacén.
+
+    Cada registro válido de prompt_X_metrics_data.json (con candidato y
+    referencia) genera una celda por métrica, identificada por la huella de
+    (modelo, prompt, modismo, candidato, referencia, versión de la métrica).
+    Las celdas ya calculadas se leen del almacén; las demás se calculan en
+    una sola llamada por métrica y se agregan como un segmento nuevo. Al
+    regenerar el archivo de un proveedor sólo cambian las celdas cuyos textos
+    cambiaron, y un modelo nuevo en models.txt sólo agrega sus propias celdas.
+
+    Args:
+        records: Registros de prompt_X_metrics_data.json
+        prompt: Nombre del prompt (ej: 'Prompt 2')
+        models: Modelos a evaluar, en orden (default: todos los de records)
+        metrics: Nombres de métricas de METRICS (default: todas)
+        candidate_field: Campo con el texto generado
+        reference_field: Campo con el texto de referencia
+        store: Almacén de scores (default: ScoreStore())
+        verbose: Imprime cuántas celdas se reutilizan y cuántas se calculan
+
+    Returns:
+        Dict {métrica: DataFrame con prompt, modelo, modismo, fila, columnas de
+        score y los textos de referencia y candidato}, en el orden de records
+    """
+    store = store or ScoreStore()
+    metrics = list(metrics or METRICS)
+    unknown = [m for m in metrics if m not in METRICS]
+    if unknown:
+        raise ValueError(f"Métricas desconocidas: {unknown}. Opciones: {list(METRICS)}")
+
+    # Celdas válidas por modelo, en el orden de los registros
+    if models is None:
+        models = list(dict.fromkeys(r.get('modelo') for r in records if r.get('modelo')))
+    by_model: Dict[str, List[Dict[str, Any]]] = {model: [] for model in models}
+    for record in records:
+        if record.get('modelo') in by_model and record.get(candidate_field) and record.get(reference_field):
+            by_model[record['modelo']].append(record)
+    cells = [(model, fila, record) for model, rows in by_model.items() for fila, record in enumerate(rows)]
+    candidatos = [record[candidate_field] for _, _, record in cells]
+    referencias = [record[reference_field] for _, _, record in cells]
+
+    results = {}
+    for metric in metrics:
+        spec = METRICS[metric]
+        version = spec.version()
+        fingerprints = np.array([
+            cell_fingerprint(model, prompt, str(record.get('modismo', '')), cand, ref, version)
+            for (model, _, record), cand, ref in zip(cells, candidatos, referencias)
+        ], dtype=_FINGERPRINT_DTYPE)
+
+        found, values = store.lookup(metric, fingerprints)
+        missing = np.flatnonzero(~found)
+        # Celdas repetidas (misma huella) se calculan una sola vez
+        unique_fingerprints, first = np.unique(fingerprints[missing], return_index=True)
+        to_compute = missing[first]
+
+        if verbose:
+            print(f"{prompt} / {metric}: {int(found.sum()):,} celdas reutilizadas, {len(to_compute):,} por calcular")
+
+        if len(to_compute):
+            scores = spec.compute([candidatos[i] for i in to_compute], [referencias[i] for i in to_compute])
+            store.append(metric, unique_fingerprints, scores)
+            found, values = store.lookup(metric, fingerprints)
+
+        frame = pd.DataFrame({
+            'prompt': prompt,
+            'modelo': [model for model, _, _ in cells],
+            'modismo': [record.get('modismo') for _, _, record in cells],
+            'fila': np.array([fila for _, fila, _ in cells], dtype=np.int64),
+        })
+        for name, column in values.items():
+            frame[name] = column
+        frame[reference_field] = referencias
+        frame[candidate_field] = candidatos
+        results[metric] = frame
+    return results
@@ -0,0 +1,114 @@
+"""
+Registro perezoso de modelos para las métricas
+Carga cada encoder en su primer uso y mantiene sólo los N más recientes en memoria
+"""
+
+import os
+import gc
+import sys
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+# Número máximo de modelos grandes residentes a la vez (configurable por entorno)
+DEFAULT_MAX_MODELS = int(os.environ.get('METRICS_MAX_MODELS', '2'))
+
+_device: Optional[str] = None
+
+
+def get_device() -> str:
+    """
+    Detecta el dispositivo disponible la primera vez que se necesita.
+
+    MPS para Apple Silicon, CUDA para NVIDIA, o CPU. Importa torch sólo al
+    llamarse, no al importar los módulos de métricas.
+    """
+    global _device
+    if _device is None:
+        import torch
+        if torch.backends.mps.is_available():
+            _device = "mps"
+            print("Usando GPU (Metal Performance Shaders) en Apple Silicon")
+        elif torch.cuda.is_available():
+            _device = "cuda"
+            print("Usando GPU (CUDA)")
+        else:
+            _device = "cpu"
+            print("Usando CPU")
+    return _device
+
+
+def _free_accelerator_memory():
+    """Devuelve al sistema la memoria cacheada por torch, si ya fue importado."""
+    gc.collect()
+    torch = sys.modules.get('torch')
+    if torch is None:
+        return
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+    if torch.backends.mps.is_available() and hasattr(torch, 'mps'):
+        torch.mps.empty_cache()
+
+
+class ModelRegistry:
+    """
+    Registro de modelos con carga perezosa y desalojo LRU.
+
+    Cada modelo se registra con una función de carga que no se ejecuta hasta
+    el primer get(). Cuando hay más de max_models cargados se libera el menos
+    usado recientemente; volver a pedirlo simplemente lo carga de nuevo.
+
+    Args:
+        max_models: Máximo de modelos residentes (default: METRICS_MAX_MODELS o 2)
+    """
+
+    def __init__(self, max_models: int = DEFAULT_MAX_MODELS):
+        self.max_models = max(1, max_models)
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._loaded: 'OrderedDict[str, Any]' = OrderedDict()
+
+    def register(self, name: str, loader: Callable[[], Any]):
+        """Registra (o reemplaza) la función de carga de un modelo."""
+        if name in self._loaded and self._loaders.get(name) is not loader:
+            self.release(name)
+        self._loaders[name] = loader
+
+    def get(self, name: str) -> Any:
+        """Devuelve el modelo, cargándolo si no está en memoria."""
+        if name in self._loaded:
+            self._loaded.move_to_end(name)
+            return self._loaded[name]
+        if name not in self._loaders:
+            raise KeyError(f"Modelo no registrado: {name}")
+
+        # Liberar antes de cargar para no superar el límite ni siquiera un instante
+        while len(self._loaded) >= self.max_models:
+            self.release(next(iter(self._loaded)))
+
+        print(f"Cargando modelo: {name}")
+        model = self._loaders[name]()
+        self._loaded[name] = model
+        return model
+
+    def release(self, name: Optional[str] = None):
+        """Libera un modelo de memoria, o todos si name es None."""
+        names = list(self._loaded) if name is None else [name]
+        for key in names:
+            self._loaded.pop(key, None)
+        _free_accelerator_memory()
+
+    def loaded(self) -> List[str]:
+        """Modelos residentes, del menos al más usado recientemente."""
+        return list(self._loaded)
+
+    def registered(self) -> List[str]:
+        """Modelos registrados."""
+        return list(self._loaders)
+
+
+# Registro compartido por BertScore.py y SentenceBert.py
+registry = ModelRegistry()
+
+
+def release_models(name: Optional[str] = None):
+    """Libera un modelo del registro compartido, o todos si name es None."""
+    registry.release(name)
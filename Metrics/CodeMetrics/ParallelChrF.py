@@ -0,0 +1,199 @@
+"""
+chrF en paralelo sobre la grilla (prompt, modelo, fila)
+Reparte el cálculo de chrF entre varios procesos usando memoria compartida
+"""
+
+import os
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from chrF import ChrFScorer
+
+# Estado de cada proceso trabajador: memoria compartida adjunta y motor chrF
+# propio (su caché de referencias se reutiliza entre tareas)
+_WORKER: Dict[str, object] = {}
+
+
+def build_chrf_grid(records: List[Dict], prompt: str, models: Sequence[str],
+                    candidate_field: str = 'definicion_generada',
+                    reference_field: str = 'definicion_real') -> Dict[Tuple[str, str], Tuple[List[str], List[str]]]:
+    """
+    Construye las celdas de la grilla para un prompt a partir de los registros
+    de prompt_X_metrics_data.json.
+
+    Args:
+        records: Registros con 'modelo', candidato y referencia
+        prompt: Nombre del prompt (ej: 'Prompt 2')
+        models: Modelos a incluir, en el orden deseado
+        candidate_field: Campo con el texto generado
+        reference_field: Campo con el texto de referencia
+
+    Returns:
+        Dict {(prompt, modelo): (candidatos, referencias)}
+    """
+    by_model: Dict[str, Tuple[List[str], List[str]]] = {model: ([], []) for model in models}
+    for record in records:
+        model = record.get('modelo')
+        if model in by_model and record.get(candidate_field) and record.get(reference_field):
+            by_model[model][0].append(record[candidate_field])
+            by_model[model][1].append(record[reference_field])
+    return {(prompt, model): pair for model, pair in by_model.items()}
+
+
+def _share(array: np.ndarray) -> Tuple[shared_memory.SharedMemory, Tuple[str, Tuple[int, ...], str]]:
+    """Copia un array a un bloque de memoria compartida y devuelve su descriptor."""
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    view = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+    view[...] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+
+def _attach(descriptor: Tuple[str, Tuple[int, ...], str]) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    """Adjunta un bloque de memoria compartida creado por el proceso principal."""
+    name, shape, dtype = descriptor
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+def _init_worker(descriptors: Dict[str, Tuple], n: int, mode: str):
+    """Inicializa un trabajador: adjunta los datos compartidos y crea su motor chrF."""
+    handles = []
+    for key, descriptor in descriptors.items():
+        shm, array = _attach(descriptor)
+        handles.append(shm)
+        _WORKER[key] = array
+    _WORKER['handles'] = handles
+    _WORKER['scorer'] = ChrFScorer(n=n, mode=mode)
+
+
+def _release_worker():
+    """Libera las referencias del trabajador a la memoria compartida."""
+    arrays = [key for key in _WORKER if key not in ('handles', 'scorer')]
+    for key in arrays:
+        del _WORKER[key]
+    for shm in _WORKER.pop('handles', []):
+        shm.close()
+    _WORKER.clear()
+
+
+def _text(index: int) -> str:
+    """Decodifica un texto de la tabla compartida."""
+    blob, offsets = _WORKER['blob'], _WORKER['offsets']
+    return bytes(blob[offsets[index]:offsets[index + 1]]).decode('utf-8')
+
+
+def _score_task(start: int, stop: int, beta: int) -> Tuple[int, int, float]:
+    """Calcula chrF para las filas [start, stop) y escribe en el array de resultados."""
+    t0 = time.perf_counter()
+    cand_idx, ref_idx = _WORKER['cand_idx'], _WORKER['ref_idx']
+    candidatos = [_text(i) for i in cand_idx[start:stop]]
+    referencias = [_text(i) for i in ref_idx[start:stop]]
+    _WORKER['scores'][start:stop] = _WORKER['scorer'].score(candidatos, referencias, beta=beta)
+    return start, stop, time.perf_counter() - t0
+
+
+def compute_chrf_parallel(grid: Dict[Tuple[str, str], Tuple[List[str], List[str]]],
+                          n: int = 6, beta: int = 2, mode: str = "set",
+                          max_workers: Optional[int] = None, rows_per_task: int = 2048,
+                          verbose: bool = True) -> pd.DataFrame:
+    """
+    Calcula chrF para toda la grilla (prompt, modelo, fila) con un pool de procesos.
+
+    Los textos se deduplican y se copian una sola vez a memoria compartida
+    (bytes UTF-8 + offsets), junto con los índices de cada par y el array de
+    resultados. Cada trabajador lee sus filas directamente de ahí, por lo que
+    los datasets no se serializan hacia cada proceso, y escribe sus scores en
+    su propio rango del array de resultados. El orden de la tabla final es
+    siempre el de la grilla de entrada, sin importar el orden de finalización.
+
+    Args:
+        grid: Dict {(prompt, modelo): (candidatos, referencias)}
+        n: Tamaño máximo de n-gramas de caracteres (default: 6)
+        beta: Peso para el balance entre precisión y recall (default: 2)
+        mode: "set" (compatible con compute_chrf_score) o "standard"
+        max_workers: Número de procesos (default: núcleos disponibles)
+        rows_per_task: Filas por tarea enviada al pool
+        verbose: Imprime el progreso
+
+    Returns:
+        DataFrame con columnas prompt, modelo, fila, chrf_score
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+
+    # Tabla de textos únicos y arrays de índices por par
+    text_ids: Dict[str, int] = {}
+    prompts, models, rows, cand_idx, ref_idx = [], [], [], [], []
+    for (prompt, model), (candidatos, referencias) in grid.items():
+        if len(candidatos) != len(referencias):
+            raise ValueError(f"{prompt} / {model}: candidatos y referencias deben tener la misma longitud")
+        prompts.extend([prompt] * len(candidatos))
+        models.extend([model] * len(candidatos))
+        rows.extend(range(len(candidatos)))
+        cand_idx.extend(text_ids.setdefault(c, len(text_ids)) for c in candidatos)
+        ref_idx.extend(text_ids.setdefault(r, len(text_ids)) for r in referencias)
+
+    encoded = [t.encode('utf-8') for t in text_ids]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    arrays = {
+        'blob': np.frombuffer(b''.join(encoded), dtype=np.uint8),
+        'offsets': offsets,
+        'cand_idx': np.asarray(cand_idx, dtype=np.int64),
+        'ref_idx': np.asarray(ref_idx, dtype=np.int64),
+        'scores': np.zeros(len(cand_idx), dtype=np.float64),
+    }
+
+    # Tareas: bloques de filas contiguas dentro de cada celda (prompt, modelo)
+    tasks = []
+    start = 0
+    for candidatos, _ in grid.values():
+        for offset in range(0, len(candidatos), rows_per_task):
+            tasks.append((start + offset, start + min(offset + rows_per_task, len(candidatos))))
+        start += len(candidatos)
+
+    if verbose:
+        print(f"chrF paralelo: {len(cand_idx):,} pares, {len(text_ids):,} textos únicos, "
+              f"{len(tasks)} tareas, {max_workers} procesos")
+
+    t0 = time.perf_counter()
+    shared = {}
+    try:
+        descriptors = {}
+        for key, array in arrays.items():
+            shared[key], descriptors[key] = _share(array)
+
+        if max_workers == 1:
+            _init_worker(descriptors, n, mode)
+            for task in tasks:
+                _score_task(*task, beta)
+            _release_worker()
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                     initargs=(descriptors, n, mode)) as executor:
+                futures = [executor.submit(_score_task, s, e, beta) for s, e in tasks]
+                for done, future in enumerate(as_completed(futures), 1):
+                    future.result()
+                    if verbose:
+                        print(f"\r  Tareas completadas: {done}/{len(tasks)}", end='', flush=True)
+            if verbose:
+                print()
+
+        scores = np.ndarray(arrays['scores'].shape, dtype=np.float64, buffer=shared['scores'].buf).copy()
+    finally:
+        for shm in shared.values():
+            shm.close()
+            shm.unlink()
+
+    if verbose:
+        print(f"✓ chrF calculado en {time.perf_counter() - t0:.1f}s")
+
+    return pd.DataFrame({
+        'prompt': prompts,
+        'modelo': models,
+        'fila': np.asarray(rows, dtype=np.int64),
+        'chrf_score': scores,
+    })
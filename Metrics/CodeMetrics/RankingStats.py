@@ -0,0 +1,333 @@
+"""
+Incertidumbre del ranking de modelos
+Intervalos bootstrap y pruebas pareadas sobre la matriz de scores ítems x modelos x métricas
+"""
+
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Sequence, Tuple
+
+# Columna de score de cada tipo de resultado de run_incremental (BERTScore, Sentence-BERT, chrF)
+SCORE_COLUMNS = ('f1_score', 'similarity', 'chrf_score')
+
+DEFAULT_RESAMPLES = 2000
+
+DEFAULT_CHUNK_SIZE = 250
+
+# Matriz de scores de cada proceso del pool (se asigna en _init_worker)
+_WORKER: Dict[str, np.ndarray] = {}
+
+
+class ScoreMatrix:
+    """
+    Scores por ítem de todos los modelos y métricas.
+
+    Puede combinar varios prompts: cada prompt es un estrato con sus propios
+    ítems, y las métricas de un prompt valen NaN en los ítems del otro. El
+    remuestreo se hace dentro de cada estrato, así que la media de cada
+    métrica sigue siendo sobre los ítems de su prompt.
+
+    Args:
+        scores: Array (ítems, modelos, métricas)
+        items: Modismo de cada fila
+        models: Nombres de los modelos
+        metrics: Nombres de las métricas (ej: 'Prompt 2: BETO')
+        strata: Estrato (prompt) de cada fila
+    """
+
+    def __init__(self, scores: np.ndarray, items: Sequence[str], models: Sequence[str],
+                 metrics: Sequence[str], strata: Optional[np.ndarray] = None):
+        self.scores = np.asarray(scores, dtype=np.float64)
+        self.items = list(items)
+        self.models = list(models)
+        self.metrics = list(metrics)
+        self.strata = np.zeros(len(self.items), dtype=np.int64) if strata is None else np.asarray(strata)
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        return self.scores.shape
+
+    def means(self) -> np.ndarray:
+        """Media de cada (modelo, métrica) sobre sus ítems."""
+        return np.nanmean(self.scores, axis=0)
+
+
+def _score_column(frame: pd.DataFrame) -> str:
+    for column in SCORE_COLUMNS:
+        if column in frame.columns:
+            return column
+    raise ValueError(f"El DataFrame no tiene ninguna columna de score: {SCORE_COLUMNS}")
+
+
+def build_score_matrix(results: Dict[str, Dict[str, pd.DataFrame]], models: Sequence[str],
+                       ground_truth: Optional[Dict[str, int]] = None, fill: float = 0.0) -> ScoreMatrix:
+    """
+    Arma la matriz ítems x modelos x métricas desde los resultados por prompt.
+
+    Args:
+        results: Dict {prompt: {métrica: DataFrame de run_incremental}} (con
+                 modelo, modismo y f1_score / similarity / chrf_score)
+        models: Modelos, en el orden del ranking
+        ground_truth: Dict {prompt: modismos evaluados}; se agregan filas con
+                      fill hasta ese número (omitidos de todos los modelos)
+        fill: Score de las celdas sin respuesta (el notebook usa 0)
+
+    Returns:
+        ScoreMatrix con una fila por modismo de cada prompt
+    """
+    ground_truth = ground_truth or {}
+    metrics = [f"{prompt}: {metric}" for prompt, frames in results.items() for metric in frames]
+    model_index = pd.Index(list(models))
+
+    blocks, items, strata = [], [], []
+    column = 0
+    for stratum, (prompt, frames) in enumerate(results.items()):
+        prompt_items = pd.Index(pd.unique(pd.concat([frame['modismo'] for frame in frames.values()],
+                                                    ignore_index=True).astype(str)))
+        n_items = max(len(prompt_items), ground_truth.get(prompt, 0))
+        block = np.full((n_items, len(models), len(metrics)), np.nan)
+        block[:, :, column:column + len(frames)] = fill
+        for frame in frames.values():
+            frame = frame[frame['modelo'].isin(model_index)]
+            # Una celda por (modelo, modismo): las respuestas repetidas se promedian
+            cell = frame.groupby([frame['modismo'].astype(str), 'modelo'], sort=False)[_score_column(frame)].mean()
+            rows = prompt_items.get_indexer(cell.index.get_level_values(0))
+            block[rows, model_index.get_indexer(cell.index.get_level_values(1)), column] = cell.to_numpy()
+            column += 1
+        blocks.append(block)
+        items += list(prompt_items) + [''] * (n_items - len(prompt_items))
+        strata.append(np.full(n_items, stratum, dtype=np.int64))
+
+    return ScoreMatrix(np.concatenate(blocks), items, models, metrics, np.concatenate(strata))
+
+
+def resample_indices(strata: np.ndarray, n_resamples: int = DEFAULT_RESAMPLES, seed: int = 42) -> np.ndarray:
+    """
+    Índices bootstrap (réplicas, ítems) generados una sola vez.
+
+    Cada fila remuestrea con reemplazo dentro de cada estrato; la misma matriz
+    se usa para todas las métricas y modelos, así que las réplicas quedan
+    pareadas entre modelos.
+    """
+    rng = np.random.default_rng(seed)
+    indices = np.empty((n_resamples, len(strata)), dtype=np.int32)
+    for stratum in np.unique(strata):
+        rows = np.flatnonzero(strata == stratum)
+        indices[:, rows] = rows[rng.integers(0, len(rows), size=(n_resamples, len(rows)))]
+    return indices
+
+
+def sign_flips(n_items: int, n_resamples: int = DEFAULT_RESAMPLES, seed: int = 42) -> np.ndarray:
+    """Signos aleatorios (réplicas, ítems) para la prueba de permutación pareada."""
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 2, size=(n_resamples, n_items), dtype=np.int8) * 2 - 1
+
+
+def _weights(block: np.ndarray, n_items: int) -> np.ndarray:
+    """Veces que aparece cada ítem en cada réplica (réplicas, ítems)."""
+    offsets = (np.arange(len(block), dtype=np.int64) * n_items)[:, None]
+    counts = np.bincount((block + offsets).ravel(), minlength=len(block) * n_items)
+    return counts.reshape(len(block), n_items).astype(np.float32)
+
+
+def _weighted_means(weights: np.ndarray, values: np.ndarray, present: np.ndarray) -> np.ndarray:
+    """Medias ponderadas de todas las columnas con dos productos de matrices (NaN = ítem ajeno)."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (weights @ values) / (np.abs(weights) @ present)
+
+
+def _init_worker(values: np.ndarray, present: np.ndarray):
+    _WORKER['values'] = values
+    _WORKER['present'] = present
+
+
+def _bootstrap_task(block: np.ndarray) -> np.ndarray:
+    return _weighted_means(_weights(block, len(_WORKER['values'])), _WORKER['values'], _WORKER['present'])
+
+
+def _permutation_task(block: np.ndarray) -> np.ndarray:
+    return _weighted_means(block.astype(np.float32), _WORKER['values'], _WORKER['present'])
+
+
+def _replicate(task, matrix: ScoreMatrix, resamples: np.ndarray, chunk_size: int,
+               max_workers: Optional[int]) -> np.ndarray:
+    """
+    Aplica task a bloques de réplicas; devuelve (réplicas, modelos, métricas).
+
+    Los scores se pasan a cada proceso una sola vez (initializer) y cada
+    bloque de réplicas se reduce con productos de matrices sobre todas las
+    columnas (modelo, métrica) a la vez.
+    """
+    n_items, n_models, n_metrics = matrix.shape
+    present = (~np.isnan(matrix.scores)).reshape(n_items, -1).astype(np.float32)
+    values = np.nan_to_num(matrix.scores).reshape(n_items, -1).astype(np.float32)
+    blocks = [resamples[start:start + chunk_size] for start in range(0, len(resamples), chunk_size)]
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(blocks) == 1:
+        _init_worker(values, present)
+        parts = list(map(task, blocks))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(values, present)) as executor:
+            parts = list(executor.map(task, blocks))
+    return np.concatenate(parts).reshape(len(resamples), n_models, n_metrics)
+
+
+def bootstrap_means(matrix: ScoreMatrix, n_resamples: int = DEFAULT_RESAMPLES, seed: int = 42,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE, max_workers: Optional[int] = None) -> np.ndarray:
+    """
+    Medias bootstrap de todos los (modelo, métrica).
+
+    En lugar de indexar la matriz por cada réplica, cada bloque de índices se
+    convierte en una matriz de conteos (réplicas x ítems) y las medias salen
+    de un producto con los scores.
+
+    Returns:
+        Array (réplicas, modelos, métricas)
+    """
+    indices = resample_indices(matrix.strata, n_resamples, seed)
+    return _replicate(_bootstrap_task, matrix, indices, chunk_size, max_workers)
+
+
+def _ranks(values: np.ndarray, axis: int) -> np.ndarray:
+    """Posición de cada modelo (1 = mayor score) a lo largo de axis."""
+    order = np.argsort(-np.nan_to_num(values, nan=-np.inf), axis=axis, kind='stable')
+    return np.argsort(order, axis=axis, kind='stable') + 1
+
+
+def bootstrap_ci(matrix: ScoreMatrix, n_resamples: int = DEFAULT_RESAMPLES, confidence: float = 0.95,
+                 seed: int = 42, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 max_workers: Optional[int] = None) -> pd.DataFrame:
+    """
+    Intervalos bootstrap de la media y de la posición de cada modelo.
+
+    Además de cada métrica se incluye 'Score Promedio' (media de las
+    métricas, como en ranking_general.csv), calculado sobre las mismas
+    réplicas.
+
+    Args:
+        matrix: Salida de build_score_matrix
+        n_resamples: Réplicas bootstrap
+        confidence: Nivel de los intervalos
+        seed: Semilla de los índices
+        chunk_size: Réplicas por bloque (y por tarea del pool)
+        max_workers: Procesos (default: número de CPUs; 1 para no usar pool)
+
+    Returns:
+        DataFrame con Modelo, Métrica, Media, IC Inferior, IC Superior,
+        Posición, Posición Inferior y Posición Superior
+    """
+    samples = bootstrap_means(matrix, n_resamples, seed, chunk_size, max_workers)
+    observed = matrix.means()
+    samples = np.concatenate([samples, samples.mean(axis=2, keepdims=True)], axis=2)
+    observed = np.concatenate([observed, observed.mean(axis=1, keepdims=True)], axis=1)
+    metrics = matrix.metrics + ['Score Promedio']
+
+    alpha = (1 - confidence) / 2 * 100
+    low, high = np.percentile(samples, [alpha, 100 - alpha], axis=0)
+    rank_low, rank_high = np.percentile(_ranks(samples, axis=1), [alpha, 100 - alpha], axis=0)
+
+    return pd.DataFrame({
+        'Modelo': np.repeat(matrix.models, len(metrics)),
+        'Métrica': np.tile(metrics, len(matrix.models)),
+        'Media': observed.ravel(),
+        'IC Inferior': low.ravel(),
+        'IC Superior': high.ravel(),
+        'Posición': _ranks(observed, axis=0).ravel(),
+        'Posición Inferior': np.floor(rank_low).astype(int).ravel(),
+        'Posición Superior': np.ceil(rank_high).astype(int).ravel(),
+    })
+
+
+def _holm(p_values: np.ndarray) -> np.ndarray:
+    """Corrección de Holm de un conjunto de p-values."""
+    order = np.argsort(p_values)
+    adjusted = np.minimum(1.0, np.maximum.accumulate(p_values[order] * (len(p_values) - np.arange(len(p_values)))))
+    result = np.empty_like(adjusted)
+    result[order] = adjusted
+    return result
+
+
+def pairwise_tests(matrix: ScoreMatrix, method: str = 'permutation', n_resamples: int = DEFAULT_RESAMPLES,
+                   confidence: float = 0.95, seed: int = 42, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   max_workers: Optional[int] = None) -> pd.DataFrame:
+    """
+    Pruebas pareadas de todos los pares de modelos en todas las métricas.
+
+    La diferencia de medias de un par es lineal en los scores, así que cada
+    réplica se calcula una vez por (modelo, métrica) y los ~n²/2 pares salen
+    de restar esas réplicas: el costo no depende del número de pares.
+
+    Args:
+        matrix: Salida de build_score_matrix
+        method: 'permutation' (inversión de signo de las diferencias por ítem)
+                o 'bootstrap' (percentil de la diferencia sobre réplicas pareadas)
+        n_resamples: Réplicas
+        confidence: Nivel del intervalo de la diferencia (bootstrap)
+        seed: Semilla
+        chunk_size: Réplicas por bloque (y por tarea del pool)
+        max_workers: Procesos (default: número de CPUs; 1 para no usar pool)
+
+    Returns:
+        DataFrame con Métrica, Modelo A, Modelo B, Media A, Media B, Diferencia,
+        p_value y p_holm (Holm dentro de cada métrica); con bootstrap también
+        IC Inferior / IC Superior de la diferencia
+    """
+    if method not in ('permutation', 'bootstrap'):
+        raise ValueError(f"Método desconocido: {method}. Opciones: 'permutation', 'bootstrap'")
+
+    observed = matrix.means()
+    a, b = np.triu_indices(len(matrix.models), k=1)
+    difference = observed[a] - observed[b]  # (pares, métricas)
+
+    if method == 'permutation':
+        # Media de las diferencias con signos invertidos: S @ (x_a - x_b) = S @ x_a - S @ x_b
+        flips = sign_flips(len(matrix.items), n_resamples, seed)
+        samples = _replicate(_permutation_task, matrix, flips, chunk_size, max_workers)
+        null = samples[:, a] - samples[:, b]
+        exceed = (np.abs(null) >= np.abs(difference) - 1e-12).sum(axis=0)
+        p_value = (exceed + 1) / (n_resamples + 1)
+        extra = {}
+    else:
+        samples = bootstrap_means(matrix, n_resamples, seed, chunk_size, max_workers)
+        paired = samples[:, a] - samples[:, b]
+        p_value = np.minimum(1.0, 2 * np.minimum((paired <= 0).mean(axis=0), (paired >= 0).mean(axis=0)))
+        alpha = (1 - confidence) / 2 * 100
+        low, high = np.percentile(paired, [alpha, 100 - alpha], axis=0)
+        extra = {'IC Inferior': low.T.ravel(), 'IC Superior': high.T.ravel()}
+
+    p_holm = np.stack([_holm(p_value[:, k]) for k in range(len(matrix.metrics))], axis=1)
+    models = np.asarray(matrix.models, dtype=object)
+    n_pairs = len(a)
+    return pd.DataFrame({
+        'Métrica': np.repeat(matrix.metrics, n_pairs),
+        'Modelo A': np.tile(models[a], len(matrix.metrics)),
+        'Modelo B': np.tile(models[b], len(matrix.metrics)),
+        'Media A': observed[a].T.ravel(),
+        'Media B': observed[b].T.ravel(),
+        'Diferencia': difference.T.ravel(),
+        **extra,
+        'p_value': p_value.T.ravel(),
+        'p_holm': p_holm.T.ravel(),
+    })
+
+
+def significance_matrix(tests: pd.DataFrame, metric: str, alpha: float = 0.05,
+                        column: str = 'p_holm') -> pd.DataFrame:
+    """
+    Matriz modelos x modelos de una métrica: +1 si la fila supera a la columna
+    con significancia, -1 si es superada y 0 si no hay diferencia significativa
+    (para el heatmap del ranking).
+    """
+    tests = tests[tests['Métrica'] == metric]
+    models = list(dict.fromkeys(list(tests['Modelo A']) + list(tests['Modelo B'])))
+    result = pd.DataFrame(0, index=models, columns=models)
+    significant = tests[tests[column] < alpha]
+    sign = np.sign(significant['Diferencia']).astype(int)
+    for (model_a, model_b), value in zip(zip(significant['Modelo A'], significant['Modelo B']), sign):
+        result.loc[model_a, model_b] = value
+        result.loc[model_b, model_a] = -value
+    return result
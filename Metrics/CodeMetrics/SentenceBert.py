@@ -10,47 +10,208 @@ import os
 # Prevent transformers from trying to load TensorFlow
 os.environ['TRANSFORMERS_NO_TF'] = '1'
 
-import torch
-from sentence_transformers import SentenceTransformer
 import numpy as np
-from typing import List
+from typing import Any, List, Optional
 import warnings
 warnings.filterwarnings('ignore')
-from sentence_transformers import models
-from sentence_transformers import util
+from EmbeddingCache import get_embedding_store
+from Similarity import rowwise_cosine, rowwise_cosine_stream, load_embeddings
+from ModelRegistry import registry, get_device
+from Acceleration import backend_key, get_backend, quantize_int8
+from Batching import DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_TOKENS, encode_in_batches
 
+# 1. Pretrained Sentence Transformer models (loaded lazily on first use)
 
-# Detectar dispositivo disponible (MPS para Apple Silicon, CUDA para NVIDIA, o CPU)
-if torch.backends.mps.is_available():
-    device = "mps"
-    print("Usando GPU (Metal Performance Shaders) en Apple Silicon")
-elif torch.cuda.is_available():
-    device = "cuda"
-    print("Usando GPU (CUDA)")
-else:
-    device = "cpu"
-    print("Usando CPU")
+# Nombres de los encoders (también identifican su caché de embeddings)
+model_name_sbert = 'paraphrase-multilingual-mpnet-base-v2'
+model_name_xlm = 'sentence-transformers/stsb-xlm-r-multilingual'
+model_name_scibeto = 'Flaglab/SciBETO-large'
+cache_name_scibeto = 'Flaglab/SciBETO-large-mean'
 
-# 1. Load pretrained Sentence Transformer models
+# Pares de textos codificados por bloque al calcular similitudes
+TEXT_CHUNK_SIZE = 8192
 
-# Using multilingual model for Spanish support
-model_sbert = SentenceTransformer('paraphrase-multilingual-mpnet-base-v2', device=device)
 
-# XLM-RoBERTa model trained on STS multilingual data for semantic similarity
-model_xlm = SentenceTransformer('sentence-transformers/stsb-xlm-r-multilingual', device=device)
+def _load_sentence_transformer(model_name: str, backend: str = 'torch'):
+    """Carga un modelo SentenceTransformer preentrenado con el backend indicado."""
+    from sentence_transformers import SentenceTransformer
+    if backend == 'onnx':
+        # Requiere sentence-transformers>=3.2 y optimum[onnxruntime]
+        return SentenceTransformer(model_name, device='cpu', backend='onnx')
+    if backend == 'int8':
+        return quantize_int8(SentenceTransformer(model_name, device='cpu'))
+    return SentenceTransformer(model_name, device=get_device())
 
-# SciBETO using SciBETO large model and mean pooling
-word_embedding_model = models.Transformer('Flaglab/SciBETO-large')
-pooling_model = models.Pooling(
-    word_embedding_model.get_word_embedding_dimension(),
-    pooling_mode_mean_tokens=True,
-    pooling_mode_cls_token=False,
-    pooling_mode_max_tokens=False
-)
-model_scibeto = SentenceTransformer(modules=[word_embedding_model, pooling_model], device=device)
 
+def _load_scibeto_mean(backend: str = 'torch'):
+    """SciBETO using SciBETO large model and mean pooling."""
+    from sentence_transformers import SentenceTransformer, models
+    if backend == 'onnx':
+        word_embedding_model = models.Transformer(model_name_scibeto, backend='onnx')
+    else:
+        word_embedding_model = models.Transformer(model_name_scibeto)
+    pooling_model = models.Pooling(
+        word_embedding_model.get_word_embedding_dimension(),
+        pooling_mode_mean_tokens=True,
+        pooling_mode_cls_token=False,
+        pooling_mode_max_tokens=False
+    )
+    device = get_device() if backend == 'torch' else 'cpu'
+    model = SentenceTransformer(modules=[word_embedding_model, pooling_model], device=device)
+    return quantize_int8(model) if backend == 'int8' else model
 
-def compute_sbert_similarity(candidatos: List[str], referencias: List[str]) -> np.ndarray:
+
+# Función de carga de cada encoder (recibe el backend: 'torch', 'int8' u 'onnx')
+_LOADERS = {
+    # Using multilingual model for Spanish support
+    model_name_sbert: lambda backend: _load_sentence_transformer(model_name_sbert, backend),
+    # XLM-RoBERTa model trained on STS multilingual data for semantic similarity
+    model_name_xlm: lambda backend: _load_sentence_transformer(model_name_xlm, backend),
+    # SciBETO-large with mean pooling
+    cache_name_scibeto: _load_scibeto_mean,
+}
+
+
+def _encoder_key(encoder_name: str) -> str:
+    """
+    Nombre del encoder en el registro y en la caché según su backend.
+
+    Cada backend se registra como un modelo distinto la primera vez que se
+    usa; con 'torch' el nombre es el original.
+    """
+    key = backend_key(encoder_name)
+    if key not in registry.registered():
+        backend = get_backend(encoder_name)
+        registry.register(key, lambda: _LOADERS[encoder_name](backend))
+    return key
+
+
+# Compatibilidad: model_sbert, model_xlm, model_scibeto y device siguen
+# disponibles como atributos del módulo, pero se cargan al accederlos
+_LAZY_ATTRIBUTES = {
+    'model_sbert': model_name_sbert,
+    'model_xlm': model_name_xlm,
+    'model_scibeto': cache_name_scibeto,
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRIBUTES:
+        return registry.get(_encoder_key(_LAZY_ATTRIBUTES[name]))
+    if name == 'device':
+        return get_device()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def encode_cached(model: Any, encoder_name: str, textos: List[str], use_cache: bool = True) -> np.ndarray:
+    """
+    Calcula embeddings reutilizando la caché persistente en disco.
+
+    Sólo se codifican los textos que nunca se han visto con este encoder; las
+    definiciones de referencia y las salidas ya evaluadas se leen de la caché.
+
+    Args:
+        model: Modelo SentenceTransformer
+        encoder_name: Nombre del encoder (clave de la caché)
+        textos: Lista de textos
+        use_cache: Si es False, codifica todo sin leer ni escribir la caché
+
+    Returns:
+        Array con un embedding por texto
+    """
+    if not use_cache:
+        return model.encode(textos)
+    return get_embedding_store(encoder_name).get_or_encode(textos, model.encode)
+
+
+def token_lengths(model: Any, textos: List[str]) -> List[int]:
+    """Longitud en tokens de cada texto según el tokenizer del modelo (truncada a max_seq_length)."""
+    tokenizer = getattr(model, 'tokenizer', None)
+    if tokenizer is None:
+        return [len(texto.split()) + 2 for texto in textos]
+    max_length = getattr(model, 'max_seq_length', None) or tokenizer.model_max_length
+    encoded = tokenizer(list(textos), add_special_tokens=True, truncation=True, max_length=max_length)
+    return [len(ids) for ids in encoded['input_ids']]
+
+
+def encode_bucketed(model: Any, textos: List[str], max_tokens: int = DEFAULT_MAX_TOKENS,
+                    max_batch_size: int = DEFAULT_MAX_BATCH_SIZE) -> np.ndarray:
+    """
+    Codifica con lotes de longitud similar bajo un presupuesto de tokens.
+
+    model.encode agrupa por un número fijo de textos; aquí cada lote toma
+    tantos textos como quepan en max_tokens (con relleno), y los embeddings
+    se devuelven en el orden de entrada.
+
+    Args:
+        model: Modelo SentenceTransformer
+        textos: Lista de textos
+        max_tokens: Presupuesto de tokens por lote
+        max_batch_size: Máximo de textos por lote
+
+    Returns:
+        Array con un embedding por texto
+    """
+    def encode_batch(batch: List[str]) -> np.ndarray:
+        return model.encode(batch, batch_size=len(batch), show_progress_bar=False, convert_to_numpy=True)
+
+    return encode_in_batches(textos, token_lengths(model, textos), encode_batch, max_tokens, max_batch_size)
+
+
+class _LazyEncoder:
+    """Envoltura que pide el modelo al registro sólo cuando hay que codificar."""
+
+    def __init__(self, encoder_name: str):
+        self.encoder_name = encoder_name
+
+    def encode(self, textos: List[str]) -> np.ndarray:
+        return encode_bucketed(registry.get(_encoder_key(self.encoder_name)), textos)
+
+
+def compute_embedding_similarity(encoder_name: str,
+                                 candidatos: List[str], referencias: List[str],
+                                 use_cache: bool = True, embeddings_path: Optional[str] = None,
+                                 chunk_size: int = TEXT_CHUNK_SIZE) -> np.ndarray:
+    """
+    Similitud de coseno por pares usando el kernel vectorizado compartido.
+
+    Los textos se codifican por bloques y cada bloque se reduce con
+    rowwise_cosine_stream, de modo que nunca se materializan todos los
+    embeddings a la vez. Si se indica embeddings_path se usan embeddings
+    precalculados (memmap) y no se codifica nada.
+
+    Args:
+        encoder_name: Nombre del encoder en el registro (y clave de la caché)
+        candidatos: Lista de textos generados por el modelo
+        referencias: Lista de textos de referencia (ground truth)
+        use_cache: Reutiliza la caché persistente de embeddings
+        embeddings_path: Directorio con candidatos.npy y referencias.npy precalculados
+        chunk_size: Pares codificados por bloque
+
+    Returns:
+        Array con scores de similitud de coseno
+    """
+    if embeddings_path is not None:
+        embeddings_candidatos, embeddings_referencias = load_embeddings(embeddings_path)
+        return rowwise_cosine(embeddings_candidatos, embeddings_referencias)
+
+    if len(candidatos) != len(referencias):
+        raise ValueError("candidatos y referencias deben tener la misma longitud")
+
+    # El modelo sólo se carga si la caché no tiene todos los embeddings; cada
+    # backend tiene su propia caché para no mezclar embeddings int8/ONNX con fp32
+    model = _LazyEncoder(encoder_name)
+    cache_name = backend_key(encoder_name)
+    chunks = (
+        (encode_cached(model, cache_name, candidatos[start:start + chunk_size], use_cache),
+         encode_cached(model, cache_name, referencias[start:start + chunk_size], use_cache))
+        for start in range(0, len(candidatos), chunk_size)
+    )
+    return rowwise_cosine_stream(chunks)
+
+
+def compute_sbert_similarity(candidatos: List[str], referencias: List[str], use_cache: bool = True,
+                             embeddings_path: Optional[str] = None) -> np.ndarray:
     """
     Calcula similitud de coseno entre candidatos y referencias usando Sentence-BERT.
     
@@ -60,33 +221,25 @@ def compute_sbert_similarity(candidatos: List[str], referencias: List[str]) -> n
     
     Según la documentación oficial (https://sbert.net/):
     - model.encode() calcula embeddings para las oraciones
-    - model.similarity() calcula la similitud entre embeddings
+    - la similitud de coseno se calcula en bloque con rowwise_cosine
+      (mismo resultado que model.similarity() par a par)
     
     Args:
         candidatos: Lista de textos generados por el modelo
         referencias: Lista de textos de referencia (ground truth)
+        use_cache: Reutiliza la caché persistente de embeddings (default: True)
+        embeddings_path: Directorio con embeddings precalculados (opcional)
         
     Returns:
         Array con scores de similitud de coseno (rango: -1 a 1, típicamente 0 a 1)
         Valores cercanos a 1 indican alta similitud semántica
     """
-    # 2. Calculate embeddings by calling model.encode()
-    embeddings_candidatos = model_sbert.encode(candidatos)
-    embeddings_referencias = model_sbert.encode(referencias)
-    
-    # 3. Calculate the embedding similarities
-    # Using the official similarity method from Sentence Transformers
-    similarities = []
-    for emb_cand, emb_ref in zip(embeddings_candidatos, embeddings_referencias):
-        # Calculate pairwise similarity
-        sim = model_sbert.similarity(emb_cand, emb_ref)
-        # Extract scalar value from tensor
-        similarities.append(float(sim))
-    
-    return np.array(similarities)
+    return compute_embedding_similarity(model_name_sbert, candidatos, referencias,
+                                        use_cache=use_cache, embeddings_path=embeddings_path)
 
 
-def compute_xlm_similarity(candidatos: List[str], referencias: List[str]) -> np.ndarray:
+def compute_xlm_similarity(candidatos: List[str], referencias: List[str], use_cache: bool = True,
+                           embeddings_path: Optional[str] = None) -> np.ndarray:
     """
     Calcula similitud de coseno entre candidatos y referencias usando XLM-RoBERTa.
     
@@ -97,46 +250,32 @@ def compute_xlm_similarity(candidatos: List[str], referencias: List[str]) -> np.
     Args:
         candidatos: Lista de textos generados por el modelo
         referencias: Lista de textos de referencia (ground truth)
+        use_cache: Reutiliza la caché persistente de embeddings (default: True)
+        embeddings_path: Directorio con embeddings precalculados (opcional)
         
     Returns:
         Array con scores de similitud de coseno (rango: -1 a 1, típicamente 0 a 1)
         Valores cercanos a 1 indican alta similitud semántica
     """
-    # Calculate embeddings
-    embeddings_candidatos = model_xlm.encode(candidatos)
-    embeddings_referencias = model_xlm.encode(referencias)
-    
-    # Calculate the embedding similarities
-    similarities = []
-    for emb_cand, emb_ref in zip(embeddings_candidatos, embeddings_referencias):
-        # Calculate pairwise similarity
-        sim = model_xlm.similarity(emb_cand, emb_ref)
-        # Extract scalar value from tensor
-        similarities.append(float(sim))
-    
-    return np.array(similarities)
+    return compute_embedding_similarity(model_name_xlm, candidatos, referencias,
+                                        use_cache=use_cache, embeddings_path=embeddings_path)
 
-def compute_scibeto_similarity(candidatos: List[str], referencias: List[str]) -> np.ndarray:
+def compute_scibeto_similarity(candidatos: List[str], referencias: List[str], use_cache: bool = True,
+                               embeddings_path: Optional[str] = None) -> np.ndarray:
     """
         Calcula similitud de coseno entre candidatos y referencias usando SciBETO-base.
         Args:
         candidatos: Lista de textos generados por el modelo
         referencias: Lista de textos de referencia (ground truth)
+        use_cache: Reutiliza la caché persistente de embeddings (default: True)
+        embeddings_path: Directorio con embeddings precalculados (opcional)
         
     Returns:
         Array con scores de similitud de coseno (rango: -1 a 1, típicamente 0 a 1)
         Valores cercanos a 1 indican alta similitud semántica
     """
-    
-    embeddings_candidatos = model_scibeto.encode(candidatos)  # Sin convert_to_tensor
-    embeddings_referencias = model_scibeto.encode(referencias)
-    
-    similarities = []
-    for emb_cand, emb_ref in zip(embeddings_candidatos, embeddings_referencias):
-        sim = model_scibeto.similarity(emb_cand, emb_ref)
-        similarities.append(float(sim))
-    
-    return np.array(similarities)
+    return compute_embedding_similarity(cache_name_scibeto, candidatos, referencias,
+                                        use_cache=use_cache, embeddings_path=embeddings_path)
 
 def print_sbert_stats(similarities: np.ndarray, model_name: str = ""):
     """
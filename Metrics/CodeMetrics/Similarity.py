@@ -0,0 +1,98 @@
+"""
+Similitud de coseno fila a fila entre matrices de embeddings
+Kernel compartido por las métricas basadas en Sentence-BERT
+"""
+
+import os
+import numpy as np
+from typing import Iterable, Tuple
+
+# Mismo epsilon que torch.nn.functional.normalize (usado por util.cos_sim)
+_EPS = 1e-12
+
+# Filas procesadas por bloque para acotar la memoria temporal
+DEFAULT_CHUNK_SIZE = 65_536
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Normaliza cada fila a norma L2 unitaria."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, _EPS)
+
+
+def rowwise_cosine(embeddings_a: np.ndarray, embeddings_b: np.ndarray, chunk_size: int = DEFAULT_CHUNK_SIZE) -> np.ndarray:
+    """
+    Calcula la similitud de coseno entre las filas alineadas de dos matrices.
+
+    Equivale a la diagonal de util.cos_sim(a, b), pero sin construir la matriz
+    completa ni un tensor por par: cada bloque se normaliza una vez y se reduce
+    con un único producto punto fila a fila.
+
+    Args:
+        embeddings_a: Matriz (n x d), por ejemplo embeddings de candidatos
+        embeddings_b: Matriz (n x d), por ejemplo embeddings de referencias
+        chunk_size: Filas por bloque (acepta np.memmap sin cargarlo completo)
+
+    Returns:
+        Array (n,) con similitudes de coseno
+    """
+    if len(embeddings_a) != len(embeddings_b):
+        raise ValueError("Las matrices de embeddings deben tener el mismo número de filas")
+    return rowwise_cosine_stream(
+        (embeddings_a[start:start + chunk_size], embeddings_b[start:start + chunk_size])
+        for start in range(0, len(embeddings_a), chunk_size)
+    )
+
+
+def rowwise_cosine_stream(chunks: Iterable[Tuple[np.ndarray, np.ndarray]]) -> np.ndarray:
+    """
+    Calcula similitudes de coseno sobre bloques que llegan en secuencia.
+
+    Permite procesar lotes muy grandes sin materializar todos los embeddings:
+    cada bloque (a, b) se consume y se descarta antes del siguiente.
+
+    Args:
+        chunks: Iterable de pares (bloque_a, bloque_b) con filas alineadas
+
+    Returns:
+        Array con las similitudes de todos los bloques, en orden
+    """
+    results = []
+    for block_a, block_b in chunks:
+        a = _normalize_rows(block_a)
+        b = _normalize_rows(block_b)
+        results.append(np.einsum('ij,ij->i', a, b))
+    if not results:
+        return np.empty(0, dtype=np.float32)
+    return np.concatenate(results)
+
+
+def save_embeddings(path: str, embeddings_candidatos: np.ndarray, embeddings_referencias: np.ndarray):
+    """
+    Guarda embeddings precalculados para usarlos luego con embeddings_path.
+
+    Args:
+        path: Directorio de salida (se crean candidatos.npy y referencias.npy)
+        embeddings_candidatos: Matriz de embeddings de candidatos
+        embeddings_referencias: Matriz de embeddings de referencias
+    """
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, 'candidatos.npy'), np.asarray(embeddings_candidatos, dtype=np.float32))
+    np.save(os.path.join(path, 'referencias.npy'), np.asarray(embeddings_referencias, dtype=np.float32))
+
+
+def load_embeddings(path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Abre embeddings precalculados como memmap (sin cargarlos en memoria).
+
+    Args:
+        path: Directorio con candidatos.npy y referencias.npy
+
+    Returns:
+        Tupla (embeddings_candidatos, embeddings_referencias)
+    """
+    return (
+        np.load(os.path.join(path, 'candidatos.npy'), mmap_mode='r'),
+        np.load(os.path.join(path, 'referencias.npy'), mmap_mode='r'),
+    )
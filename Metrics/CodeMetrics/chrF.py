@@ -4,10 +4,23 @@ Métrica robusta a variaciones morfológicas y errores ortográficos
 """
 
 import numpy as np
-from typing import List
+from scipy import sparse
+from typing import Dict, List, Tuple
 import warnings
 warnings.filterwarnings('ignore')
 
+# Tamaño del espacio de code points Unicode. Un n-grama de orden n se codifica
+# como (id del (n-1)-grama que lo antecede) * _CODEPOINT_SPACE + code point
+# del último carácter, lo que da una clave entera exacta (sin colisiones).
+_CODEPOINT_SPACE = 0x110000
+
+# Modos soportados por el motor vectorizado:
+#   "set":      n-gramas únicos (conjuntos) y espacios normalizados; reproduce
+#               exactamente compute_chrf_score.
+#   "standard": chrF estándar basado en conteos (Popović, 2015), sin espacios,
+#               equivalente al chrF por defecto de chrF++.py / sacreBLEU (escala 0 a 1).
+CHRF_MODES = ("set", "standard")
+
 def compute_chrf_score(candidato: str, referencia: str, n: int = 6, beta: int = 2) -> float:
     """
     Calcula chrF score entre dos textos.
@@ -78,25 +91,294 @@ def compute_chrf_score(candidato: str, referencia: str, n: int = 6, beta: int =
     return chrf
 
 
-def compute_chrf_batch(candidatos: List[str], referencias: List[str], n: int = 6, beta: int = 2) -> np.ndarray:
+class ChrFScorer:
+    """
+    Motor chrF vectorizado con caché de perfiles de referencia.
+
+    Cada n-grama de caracteres se convierte en un id entero estable. Los perfiles
+    de las referencias se extraen una sola vez y se guardan como una matriz
+    dispersa (referencias x n-gramas), de modo que evaluar varios modelos contra
+    las mismas definiciones reales sólo requiere procesar los candidatos.
+    Precisión y recall se calculan para todos los pares a la vez con operaciones
+    de NumPy/SciPy sobre matrices dispersas.
+
+    Args:
+        n: Tamaño máximo de n-gramas de caracteres (default: 6)
+        mode: "set" (compatible con compute_chrf_score) o "standard" (conteos)
+        chunk_size: Número de pares procesados por bloque (limita la memoria)
+    """
+
+    def __init__(self, n: int = 6, mode: str = "set", chunk_size: int = 4096):
+        if mode not in CHRF_MODES:
+            raise ValueError(f"Modo chrF desconocido: {mode!r}. Opciones: {CHRF_MODES}")
+        self.n = n
+        self.mode = mode
+        self.chunk_size = chunk_size
+
+        # Vocabulario por orden: claves ordenadas -> id global del n-grama
+        self._keys = [np.empty(0, dtype=np.int64) for _ in range(n + 1)]
+        self._ids = [np.empty(0, dtype=np.int64) for _ in range(n + 1)]
+        self._order_of = np.empty(0, dtype=np.int64)
+        self._vocab_size = 0
+
+        # Perfiles de referencia cacheados
+        self._ref_rows: Dict[str, int] = {}
+        self._ref_chunks: List[sparse.csr_matrix] = []
+        self._ref_totals_chunks: List[np.ndarray] = []
+        self._ref_matrix = None
+        self._ref_totals = np.empty((0, n), dtype=np.float64)
+
+    def normalize(self, text: str) -> str:
+        """Normaliza el texto como lo hace cada modo antes de extraer n-gramas."""
+        if self.mode == "standard":
+            return ''.join(text.split())
+        return ' '.join(text.split())
+
+    def _lookup(self, order: int, keys: np.ndarray, persist: bool, next_tmp: int) -> Tuple[np.ndarray, int, np.ndarray]:
+        """
+        Traduce claves de n-gramas de un orden a ids globales.
+
+        Si persist es False, los n-gramas desconocidos reciben ids temporales
+        (>= tamaño del vocabulario) que no se guardan: nunca coinciden con una
+        referencia, pero sí cuentan para los totales del candidato.
+        """
+        uniq, inverse = np.unique(keys, return_inverse=True)
+        known_keys = self._keys[order]
+        ids = np.empty(len(uniq), dtype=np.int64)
+
+        if len(known_keys):
+            pos = np.minimum(np.searchsorted(known_keys, uniq), len(known_keys) - 1)
+            found = known_keys[pos] == uniq
+            ids[found] = self._ids[order][pos[found]]
+        else:
+            found = np.zeros(len(uniq), dtype=bool)
+
+        missing = ~found
+        n_missing = int(missing.sum())
+        new_orders = np.empty(0, dtype=np.int64)
+
+        if persist:
+            new_ids = np.arange(self._vocab_size, self._vocab_size + n_missing, dtype=np.int64)
+            self._vocab_size += n_missing
+            all_keys = np.concatenate([known_keys, uniq[missing]])
+            all_ids = np.concatenate([self._ids[order], new_ids])
+            sort_idx = np.argsort(all_keys, kind='stable')
+            self._keys[order] = all_keys[sort_idx]
+            self._ids[order] = all_ids[sort_idx]
+            self._order_of = np.concatenate([self._order_of, np.full(n_missing, order, dtype=np.int64)])
+        else:
+            new_ids = np.arange(next_tmp, next_tmp + n_missing, dtype=np.int64)
+            next_tmp += n_missing
+            new_orders = np.full(n_missing, order, dtype=np.int64)
+
+        ids[missing] = new_ids
+        return ids[inverse], next_tmp, new_orders
+
+    def _extract(self, texts: List[str], persist: bool) -> Tuple[sparse.csr_matrix, np.ndarray]:
+        """
+        Extrae los perfiles de n-gramas de textos ya normalizados.
+
+        Returns:
+            Tupla (matriz dispersa textos x vocabulario con el conteo de cada
+            n-grama conocido, totales por texto y orden según el modo)
+        """
+        n_texts = len(texts)
+        lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=n_texts)
+        codepoints = np.frombuffer(''.join(texts).encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+
+        text_of = np.repeat(np.arange(n_texts, dtype=np.int64), lengths)
+        starts = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(np.int64)
+        remaining = lengths[text_of] - (np.arange(len(codepoints), dtype=np.int64) - starts[text_of])
+
+        next_tmp = self._vocab_size
+        tmp_orders = []
+        rows, cols = [], []
+        prev_ids = codepoints
+        prev_idx = np.arange(len(codepoints), dtype=np.int64)
+
+        for order in range(1, self.n + 1):
+            # Posiciones donde cabe un n-grama de este orden dentro del texto
+            keep = remaining[prev_idx] >= order
+            idx = prev_idx[keep]
+            if len(idx) == 0:
+                break
+            if order == 1:
+                keys = codepoints[idx]
+            else:
+                keys = prev_ids[keep] * _CODEPOINT_SPACE + codepoints[idx + order - 1]
+            ids, next_tmp, new_orders = self._lookup(order, keys, persist, next_tmp)
+            tmp_orders.append(new_orders)
+            rows.append(text_of[idx])
+            cols.append(ids)
+            prev_ids, prev_idx = ids, idx
+
+        width = max(self._vocab_size, next_tmp, 1)
+        if rows:
+            combined = np.concatenate(rows) * width + np.concatenate(cols)
+            uniq, counts = np.unique(combined, return_counts=True)
+            u_rows, u_cols = uniq // width, uniq % width
+        else:
+            u_rows = u_cols = counts = np.empty(0, dtype=np.int64)
+
+        # Totales por texto y orden
+        order_of = np.concatenate([self._order_of] + tmp_orders)
+        if self.mode == "standard":
+            # Número de n-gramas (con repeticiones) = max(L - n + 1, 0)
+            sizes = np.arange(1, self.n + 1, dtype=np.int64)
+            totals = np.maximum(lengths[:, None] - sizes[None, :] + 1, 0).astype(np.float64)
+        else:
+            # Número de n-gramas distintos
+            groups = u_rows * self.n + order_of[u_cols] - 1
+            totals = np.bincount(groups, minlength=n_texts * self.n).reshape(n_texts, self.n).astype(np.float64)
+
+        # Sólo los n-gramas del vocabulario persistente pueden coincidir con una referencia
+        known = u_cols < self._vocab_size
+        u_rows, u_cols, counts = u_rows[known], u_cols[known], counts[known]
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(u_rows, minlength=n_texts))])
+        matrix = sparse.csr_matrix(
+            (counts.astype(np.float64), u_cols, indptr),
+            shape=(n_texts, max(self._vocab_size, 1))
+        )
+        return matrix, totals
+
+    def _reference_rows(self, referencias: List[str]) -> np.ndarray:
+        """Devuelve las filas cacheadas de las referencias, extrayendo sólo las nuevas."""
+        new_refs = []
+        for ref in referencias:
+            if ref not in self._ref_rows:
+                self._ref_rows[ref] = len(self._ref_rows)
+                new_refs.append(ref)
+
+        if new_refs:
+            matrix, totals = self._extract(new_refs, persist=True)
+            self._ref_chunks.append(matrix)
+            self._ref_totals_chunks.append(totals)
+            self._ref_matrix = None
+
+        return np.fromiter((self._ref_rows[ref] for ref in referencias), dtype=np.int64, count=len(referencias))
+
+    def _reference_matrix(self) -> sparse.csr_matrix:
+        """Matriz consolidada de perfiles de referencia con el vocabulario actual."""
+        if self._ref_matrix is None or self._ref_matrix.shape[1] != max(self._vocab_size, 1):
+            shape = (0, max(self._vocab_size, 1))
+            chunks = [
+                sparse.csr_matrix((m.data, m.indices, m.indptr), shape=(m.shape[0], shape[1]))
+                for m in self._ref_chunks
+            ]
+            self._ref_matrix = sparse.vstack(chunks, format='csr') if chunks else sparse.csr_matrix(shape)
+            self._ref_totals = np.vstack(self._ref_totals_chunks) if self._ref_totals_chunks else np.empty((0, self.n))
+        return self._ref_matrix
+
+    def score(self, candidatos: List[str], referencias: List[str], beta: int = 2) -> np.ndarray:
+        """
+        Calcula chrF para pares (candidato, referencia) alineados.
+
+        Args:
+            candidatos: Lista de textos generados por el modelo
+            referencias: Lista de textos de referencia (ground truth)
+            beta: Peso para el balance entre precisión y recall (default: 2)
+
+        Returns:
+            Array con chrF scores (rango: 0 a 1)
+        """
+        if len(candidatos) != len(referencias):
+            raise ValueError("candidatos y referencias deben tener la misma longitud")
+
+        cands = [self.normalize(c) for c in candidatos]
+        refs = [self.normalize(r) for r in referencias]
+        ref_rows = self._reference_rows(refs)
+        ref_matrix = self._reference_matrix()
+
+        scores = np.zeros(len(cands), dtype=np.float64)
+        for start in range(0, len(cands), self.chunk_size):
+            stop = min(start + self.chunk_size, len(cands))
+            scores[start:stop] = self._score_chunk(cands[start:stop], ref_rows[start:stop], ref_matrix, beta)
+        return scores
+
+    def _score_chunk(self, cands: List[str], ref_rows: np.ndarray, ref_matrix: sparse.csr_matrix, beta: int) -> np.ndarray:
+        """Calcula chrF para un bloque de pares."""
+        n_pairs = len(cands)
+        unique_cands: Dict[str, int] = {}
+        cand_rows = np.fromiter(
+            (unique_cands.setdefault(c, len(unique_cands)) for c in cands), dtype=np.int64, count=n_pairs
+        )
+        cand_matrix, cand_totals = self._extract(list(unique_cands), persist=False)
+        cand_matrix = cand_matrix[cand_rows]
+        cand_totals = cand_totals[cand_rows]
+        pair_refs = ref_matrix[ref_rows]
+        ref_totals = self._ref_totals[ref_rows]
+
+        # Coincidencias por par y orden: mínimo elemento a elemento de los perfiles
+        common = cand_matrix.minimum(pair_refs).tocoo()
+        weights = common.data if self.mode == "standard" else np.ones(len(common.data))
+        groups = common.row.astype(np.int64) * self.n + self._order_of[common.col] - 1
+        matches = np.bincount(groups, weights=weights, minlength=n_pairs * self.n).reshape(n_pairs, self.n)
+
+        # Promedio de precisión y recall sobre los órdenes válidos, acumulado en el
+        # mismo orden que compute_chrf_score para obtener resultados idénticos
+        total_precision = np.zeros(n_pairs)
+        total_recall = np.zeros(n_pairs)
+        num_ngrams = np.zeros(n_pairs)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for k in range(self.n):
+                valid = (cand_totals[:, k] > 0) & (ref_totals[:, k] > 0)
+                total_precision += np.where(valid, matches[:, k] / cand_totals[:, k], 0.0)
+                total_recall += np.where(valid, matches[:, k] / ref_totals[:, k], 0.0)
+                num_ngrams += valid
+
+            avg_precision = total_precision / num_ngrams
+            avg_recall = total_recall / num_ngrams
+            beta_squared = beta ** 2
+            chrf = (1 + beta_squared) * (avg_precision * avg_recall) / (beta_squared * avg_precision + avg_recall)
+
+        zero = (num_ngrams == 0) | (avg_precision + avg_recall == 0)
+        return np.where(zero, 0.0, chrf)
+
+    def clear(self):
+        """Libera el vocabulario y los perfiles de referencia cacheados."""
+        self.__init__(n=self.n, mode=self.mode, chunk_size=self.chunk_size)
+
+
+# Motores compartidos por (n, modo) para reutilizar la caché entre modelos
+_SCORERS: Dict[Tuple[int, str], ChrFScorer] = {}
+
+
+def get_chrf_scorer(n: int = 6, mode: str = "set") -> ChrFScorer:
+    """
+    Devuelve el motor chrF compartido para (n, modo), creándolo si no existe.
+
+    Args:
+        n: Tamaño máximo de n-gramas de caracteres (default: 6)
+        mode: "set" o "standard"
+
+    Returns:
+        Instancia de ChrFScorer con la caché de referencias de llamadas previas
+    """
+    key = (n, mode)
+    if key not in _SCORERS:
+        _SCORERS[key] = ChrFScorer(n=n, mode=mode)
+    return _SCORERS[key]
+
+
+def compute_chrf_batch(candidatos: List[str], referencias: List[str], n: int = 6, beta: int = 2, mode: str = "set") -> np.ndarray:
     """
     Calcula chrF score para múltiples pares de textos.
-    
+
+    Usa el motor vectorizado ChrFScorer compartido, por lo que las referencias
+    se procesan una sola vez aunque se evalúen varios modelos contra ellas.
+    Con mode="set" los resultados son idénticos a compute_chrf_score.
+
     Args:
         candidatos: Lista de textos generados por el modelo
         referencias: Lista de textos de referencia (ground truth)
         n: Tamaño máximo de n-gramas de caracteres (default: 6)
         beta: Peso para el balance entre precisión y recall (default: 2)
-        
+        mode: "set" (n-gramas únicos, default) o "standard" (chrF basado en conteos)
+
     Returns:
         Array con chrF scores (rango: 0 a 1)
     """
-    scores = []
-    for cand, ref in zip(candidatos, referencias):
-        score = compute_chrf_score(cand, ref, n=n, beta=beta)
-        scores.append(score)
-    
-    return np.array(scores)
+    return get_chrf_scorer(n=n, mode=mode).score(candidatos, referencias, beta=beta)
 
 
 def print_chrf_stats(scores: np.ndarray, model_name: str = ""):